@@ -5,7 +5,7 @@ from flask_migrate import Migrate
 from flask_restx import Api
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from config import Config
+from config import Config, ensure_sqlite_directory
 import logging
 
 # Configuration du logging
@@ -19,6 +19,7 @@ def create_app():
     """Crée et configure l'application Flask."""
     app = Flask(__name__)
     app.config.from_object(Config)
+    ensure_sqlite_directory(app.config["SQLALCHEMY_DATABASE_URI"])
     logger.info("Flask app created with config loaded")
 
     # Initialisation de CORS
@@ -51,6 +52,39 @@ def create_app():
     Migrate(app, db)
     logger.info("Extensions (DB, JWT, Migrate) initialized")
 
+    # Métriques du pool de connexions
+    from app.services.db_pool_service import init_pool_metrics, pool_prometheus_samples
+    init_pool_metrics(app, db)
+
+    # Mesure de latence par route, sections nommées et export Prometheus sur /metrics
+    from app.services.metrics_service import init_metrics, registry
+    init_metrics(app, service_name="api")
+    registry.register_collector(pool_prometheus_samples)
+
+    # Compression négociée des réponses et corps de requête compressés
+    from app.services.compression_service import init_compression
+    init_compression(app)
+
+    # Réception des uploads en streaming (fichier de transit, hash, limites de taille)
+    from app.services.upload_service import init_uploads
+    from app.services.blob_store import blob_store
+    blob_store.init_app(app)
+    init_uploads(app)
+
+    # Précalcul des extractions DXF à l'upload
+    from app.services.ingest_service import ingest_pipeline, ingest_prometheus_samples
+    ingest_pipeline.init_app(app)
+    registry.register_collector(ingest_prometheus_samples)
+
+    # Règles de sémantique des calques SDP, compilées une fois au démarrage
+    from app.services.layer_classifier import init_layer_rules
+    init_layer_rules(app)
+
+    # Synchronisation incrémentale du dossier Ressources avec la table folder
+    from app.services.folder_sync_service import folder_sync
+    folder_sync.init_app(app)
+    logger.info("Folder synchronizer initialized")
+
     # Initialisation de l'API avec Swagger
     api = Api(app, title="API Auth", version="1.0", description="API d'authentification")
     logger.info("API initialized with Swagger")
@@ -67,10 +101,12 @@ def create_app():
     from app.controllers.user_controller import ns as user_ns
     from app.controllers.auth_controller import auth_ns
     from app.controllers.folder_controller import ns as folder_ns
+    from app.controllers.monitoring_controller import ns as monitoring_ns
 
     api.add_namespace(user_ns, path="/api/users")
     api.add_namespace(auth_ns, path="/api/auth")
     api.add_namespace(folder_ns, path="/api/folders")
+    api.add_namespace(monitoring_ns, path="/api/monitoring")
     
     # Ne pas enregistrer le namespace user_folder_ns pour éviter les conflits
     # avec le blueprint user_folder_blueprint
@@ -3,6 +3,7 @@ from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_requir
 from datetime import datetime, timezone
 from app import db
 from app.models.user import User
+from app.services.folder_sync_service import folder_sync
 
 auth_ns = Namespace("auth", description="Gestion de l'authentification")
 
@@ -91,6 +92,7 @@ class Signup(Resource):
             # Sauvegarder dans la base de données
             db.session.add(new_user)
             db.session.commit()
+            folder_sync.mark_user_dirty(new_user.email)
             
             return {"message": "Inscription réussie"}, 201
             
@@ -1,15 +1,21 @@
-from flask import Blueprint, request, jsonify, send_from_directory, send_file
+from flask import Blueprint, request, jsonify, send_from_directory, send_file, current_app
 from flask_cors import cross_origin
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from app.services.file_service import extract_file_data
+from app.services.file_service import extract_file_data, get_file_data, parse_extraction_filters, get_file_summary, get_cached_summary_statistics, geometry_response
+from app.services.entity_query_service import parse_entity_query, query_entities
+from app.services.ingest_service import ingest_pipeline
+from app.services.tile_service import get_tile, parse_tile_request
+from app.services.upload_service import save_upload
+from app.services import resumable_upload_service as resumable
+from werkzeug.utils import secure_filename
+from app.services.metrics_service import span
+from app.services.folder_sync_service import folder_names_for_email
 import logging
 import os
 from app.models.user import User
 from datetime import datetime
 import shutil
 import json
-from werkzeug.datastructures import FileStorage
-import io
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -28,8 +34,12 @@ def get_user_folder_path():
             return None
         email = user.email
 
+    base_resource_path = current_app.config['RESSOURCES_FOLDER']
+    # Le dossier peut porter le nom brut de l'email (prenom.nom) ou sa forme normalisée (prenom_nom)
+    for folder_name in sorted(folder_names_for_email(email)):
+        if os.path.isdir(os.path.join(base_resource_path, folder_name)):
+            return os.path.join(base_resource_path, folder_name)
     folder_name = email.split('@')[0].replace('.', '_')
-    base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Ressources'))
     return os.path.join(base_resource_path, folder_name)
 
 def get_folder_structure(base_path, relative_path=""):
@@ -43,6 +53,8 @@ def get_folder_structure(base_path, relative_path=""):
             return folder_structure
 
         for item in os.listdir(full_path):
+            if item.startswith('.'):
+                continue  # Dossiers techniques (cache d'extraction)
             item_path = os.path.join(full_path, item)
             rel_item_path = os.path.join(relative_path, item) if relative_path else item
 
@@ -62,6 +74,12 @@ def get_folder_structure(base_path, relative_path=""):
                     "size": os.path.getsize(item_path),
                     "last_modified": datetime.fromtimestamp(os.path.getmtime(item_path)).isoformat()
                 }
+                # Statistiques déjà calculées (résumé en cache) : affichées sans relire le fichier
+                statistics = get_cached_summary_statistics(item_path)
+                if statistics is not None:
+                    file_info["statistics"] = statistics
+                elif ingest_pipeline.status(item_path):
+                    file_info["processing"] = True
                 folder_structure["files"].append(file_info)
 
         return folder_structure
@@ -93,10 +111,13 @@ def upload_file():
         return jsonify({"error": "Dossier utilisateur non trouvé"}), 400
 
     file_path = os.path.join(user_folder_path, file.filename)
-    file.save(file_path)
+    with span('disk_write'):
+        saved = save_upload(file, file_path)
     logger.debug(f"Fichier sauvegardé dans : {file_path}")
+    ingest_pipeline.submit(file_path)
 
-    return jsonify({"message": "Fichier .dxf reçu et sauvegardé", "filename": file.filename, "path": file_path}), 200
+    return jsonify({"message": "Fichier .dxf reçu et sauvegardé", "filename": file.filename, "path": file_path,
+                    "size": saved["size"], "sha256": saved["sha256"], "deduplicated": saved["deduplicated"]}), 200
 
 @file_blueprint.route("/api/extract-data", methods=["POST"])
 @cross_origin()
@@ -116,7 +137,13 @@ def extract_data():
         logger.error(f"Format non supporté : {file.filename}")
         return jsonify({"error": "Seuls les fichiers .dxf sont acceptés"}), 400
     
-    result = extract_file_data(file)
+    try:
+        filters = parse_extraction_filters(request.values.to_dict())
+    except ValueError as e:
+        logger.error(f"Filtres d'extraction invalides : {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    
+    result = extract_file_data(file, **filters)
     if "error" in result:
         logger.error(f"Erreur d'extraction : {result['error']}")
         return jsonify(result), 400
@@ -155,9 +182,12 @@ def transfer_files():
         file1_path = os.path.join(transfer_folder, filename1)
         file2_path = os.path.join(transfer_folder, filename2)
         
-        file1.save(file1_path)
-        file2.save(file2_path)
+        with span('disk_write'):
+            save_upload(file1, file1_path)
+            save_upload(file2, file2_path)
         logger.debug(f"Fichiers sauvegardés : {file1_path}, {file2_path}")
+        ingest_pipeline.submit(file1_path)
+        ingest_pipeline.submit(file2_path)
 
         return jsonify({"message": f"Fichiers transférés avec succès dans {custom_folder_name}"}), 200
 
@@ -165,6 +195,90 @@ def transfer_files():
         logger.error(f"Erreur lors du transfert : {str(e)}", exc_info=True)
         return jsonify({"error": f"Erreur lors du transfert : {str(e)}"}), 500
 
+def _upload_owner():
+    return str(get_jwt_identity())
+
+def _resumable_error(e):
+    if isinstance(e, resumable.UploadSessionNotFound):
+        return jsonify({"error": "Session d'upload introuvable ou expirée"}), 404
+    if isinstance(e, PermissionError):
+        return jsonify({"error": str(e)}), 403
+    return jsonify({"error": str(e)}), 400
+
+@file_blueprint.route("/api/uploads", methods=["POST"])
+@cross_origin()
+@jwt_required()
+def init_resumable_upload():
+    """Ouvre un upload reprenable : {filename, size, folder?, chunkSize?, sha256?}."""
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename or not filename.lower().endswith('.dxf'):
+        logger.error(f"Nom de fichier invalide pour un upload reprenable : {data.get('filename')}")
+        return jsonify({"error": "Seuls les fichiers .dxf sont acceptés"}), 400
+
+    user_folder_path = get_user_folder_path()
+    if not user_folder_path or not os.path.exists(user_folder_path):
+        logger.error("Dossier utilisateur non trouvé ou inaccessible")
+        return jsonify({"error": "Dossier utilisateur non trouvé"}), 400
+
+    folder = "/".join(secure_filename(part) for part in (data.get("folder") or "").split("/") if secure_filename(part))
+    try:
+        status = resumable.create_session(_upload_owner(), filename, data.get("size") or 0, folder,
+                                          os.path.join(user_folder_path, folder), data.get("chunkSize"),
+                                          data.get("sha256"))
+    except (ValueError, TypeError) as e:
+        return _resumable_error(e)
+    return jsonify(status), 201
+
+@file_blueprint.route("/api/uploads/<upload_id>", methods=["GET"])
+@cross_origin()
+@jwt_required()
+def resumable_upload_status(upload_id):
+    """Morceaux reçus et manquants : permet de reprendre un upload interrompu."""
+    try:
+        return jsonify(resumable.get_status(upload_id, _upload_owner())), 200
+    except (LookupError, PermissionError) as e:
+        return _resumable_error(e)
+
+@file_blueprint.route("/api/uploads/<upload_id>", methods=["PUT"])
+@cross_origin()
+@jwt_required()
+def put_resumable_chunk(upload_id):
+    """Reçoit un morceau brut (application/octet-stream) à la position ?offset=N ; idempotent."""
+    offset = request.args.get("offset")
+    if offset is None:
+        return jsonify({"error": "Paramètre offset requis"}), 400
+    try:
+        with span('disk_write'):
+            status = resumable.write_chunk(upload_id, _upload_owner(), offset, request.stream, request.content_length)
+    except (LookupError, PermissionError, ValueError) as e:
+        return _resumable_error(e)
+    return jsonify(status), 200
+
+@file_blueprint.route("/api/uploads/<upload_id>/complete", methods=["POST"])
+@cross_origin()
+@jwt_required()
+def complete_resumable_upload(upload_id):
+    """Vérifie l'upload, range le fichier dans le dossier utilisateur et lance son ingestion."""
+    try:
+        saved = resumable.finalize(upload_id, _upload_owner())
+    except (LookupError, PermissionError, ValueError) as e:
+        return _resumable_error(e)
+    ingest_pipeline.submit(saved["path"])
+    return jsonify({"message": "Fichier .dxf reçu et sauvegardé", "filename": os.path.basename(saved["path"]),
+                    "path": saved["path"], "size": saved["size"], "sha256": saved["sha256"],
+                    "deduplicated": saved["deduplicated"]}), 200
+
+@file_blueprint.route("/api/uploads/<upload_id>", methods=["DELETE"])
+@cross_origin()
+@jwt_required()
+def abort_resumable_upload(upload_id):
+    try:
+        resumable.abort_session(upload_id, _upload_owner())
+    except (LookupError, PermissionError) as e:
+        return _resumable_error(e)
+    return jsonify({"message": "Upload annulé"}), 200
+
 @file_blueprint.route("/api/user-folder/files", methods=["GET"])
 @cross_origin()
 @jwt_required()
@@ -274,12 +388,13 @@ def download_file():
         # Send the file directly
         try:
             logger.info(f"Attempting to send file: {file_path}")
-            response = send_file(
-                file_path,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/octet-stream'
-            )
+            with span('send_file'):
+                response = send_file(
+                    file_path,
+                    as_attachment=True,
+                    download_name=filename,
+                    mimetype='application/octet-stream'
+                )
             logger.info("File sending successful")
             return response
         except Exception as e:
@@ -349,6 +464,12 @@ def extract_data_from_file():
             logger.error("Nom de fichier manquant")
             return jsonify({"error": "Nom de fichier requis"}), 400
 
+        try:
+            filters = parse_extraction_filters(data)
+        except ValueError as e:
+            logger.error(f"Filtres d'extraction invalides : {str(e)}")
+            return jsonify({"error": str(e)}), 400
+
         user_folder_path = get_user_folder_path()
         if not user_folder_path or not os.path.exists(user_folder_path):
             logger.error("Dossier utilisateur non trouvé ou inaccessible")
@@ -362,23 +483,99 @@ def extract_data_from_file():
             logger.error(f"Fichier non trouvé : {file_path}")
             return jsonify({"error": f"Fichier non trouvé : {filename}"}), 404
 
-        # Open the file and wrap it as a FileStorage object
-        with open(file_path, 'rb') as f:
-            file_content = f.read()  # Read the entire file content
-            file_obj = FileStorage(
-                stream=io.BytesIO(file_content),  # Wrap in BytesIO for FileStorage
-                filename=filename,
-                content_type='application/octet-stream'  # Generic binary type
-            )
-            result = extract_file_data(file_obj)
+        # Binary GEXG geometry (typed arrays) instead of the JSON entity lists
+        if data.get("format") == "binary":
+            return geometry_response(file_path, **filters)
+
+        # The file is already on disk: extract it directly instead of copying it to a temp file
+        if data.get("mode") == "summary":
+            result = get_file_summary(file_path)
+        else:
+            result = get_file_data(file_path, **filters)
 
         if "error" in result:
             logger.error(f"Erreur d'extraction : {result['error']}")
             return jsonify(result), 400
 
         logger.debug(f"Données extraites pour : {filename}")
-        return jsonify(result), 200
+        with span('json_serialize'):
+            response = jsonify(result)
+        return response, 200
 
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction : {str(e)}", exc_info=True)
-        return jsonify({"error": f"Erreur serveur : {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Erreur serveur : {str(e)}"}), 500
+
+@file_blueprint.route("/api/user-folder/query-entities", methods=["POST"])
+@cross_origin()
+@jwt_required()
+def query_file_entities():
+    """Page d'entités d'un fichier du dossier utilisateur, filtrée et triée côté serveur."""
+    try:
+        data = request.get_json() or {}
+        filename = data.get("filename")
+        folder = data.get("folder", "")
+
+        if not filename:
+            logger.error("Nom de fichier manquant")
+            return jsonify({"error": "Nom de fichier requis"}), 400
+
+        try:
+            query = parse_entity_query(data)
+        except ValueError as e:
+            logger.error(f"Requête d'entités invalide : {str(e)}")
+            return jsonify({"error": str(e)}), 400
+
+        user_folder_path = get_user_folder_path()
+        if not user_folder_path or not os.path.exists(user_folder_path):
+            logger.error("Dossier utilisateur non trouvé ou inaccessible")
+            return jsonify({"error": "Dossier utilisateur non trouvé"}), 400
+
+        file_path = os.path.join(user_folder_path, folder, filename) if folder else os.path.join(user_folder_path, filename)
+        if not os.path.exists(file_path):
+            logger.error(f"Fichier non trouvé : {file_path}")
+            return jsonify({"error": f"Fichier non trouvé : {filename}"}), 404
+
+        result = query_entities(file_path, **query)
+        logger.debug(f"Requête d'entités sur {filename} : {result['matched']} entité(s), page {result['page']}")
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la requête d'entités : {str(e)}", exc_info=True)
+        return jsonify({"error": f"Erreur serveur : {str(e)}"}), 500
+
+@file_blueprint.route("/api/user-folder/tiles", methods=["POST"])
+@cross_origin()
+@jwt_required()
+def get_file_tile():
+    """Géométries d'une tuile z/x/y ou d'une vue (bbox + résolution), simplifiées selon le zoom."""
+    try:
+        data = request.get_json() or {}
+        filename = data.get("filename")
+        folder = data.get("folder", "")
+
+        if not filename:
+            logger.error("Nom de fichier manquant")
+            return jsonify({"error": "Nom de fichier requis"}), 400
+
+        try:
+            tile_request = parse_tile_request(data)
+        except ValueError as e:
+            logger.error(f"Requête de tuile invalide : {str(e)}")
+            return jsonify({"error": str(e)}), 400
+
+        user_folder_path = get_user_folder_path()
+        if not user_folder_path or not os.path.exists(user_folder_path):
+            logger.error("Dossier utilisateur non trouvé ou inaccessible")
+            return jsonify({"error": "Dossier utilisateur non trouvé"}), 400
+
+        file_path = os.path.join(user_folder_path, folder, filename) if folder else os.path.join(user_folder_path, filename)
+        if not os.path.exists(file_path):
+            logger.error(f"Fichier non trouvé : {file_path}")
+            return jsonify({"error": f"Fichier non trouvé : {filename}"}), 404
+
+        return jsonify(get_tile(file_path, **tile_request)), 200
+
+    except Exception as e:
+        logger.error(f"Erreur lors du rendu de la tuile : {str(e)}", exc_info=True)
+        return jsonify({"error": f"Erreur serveur : {str(e)}"}), 500
@@ -0,0 +1,41 @@
+from flask import current_app
+from flask_restx import Namespace, Resource, abort
+from flask_jwt_extended import jwt_required, get_jwt
+from app.services.db_pool_service import get_pool_metrics
+from app.services.blob_store import blob_store
+
+ns = Namespace("monitoring", description="Supervision de l'application")
+
+def _require_admin():
+    """Les métriques internes (pool, stockage) sont réservées aux administrateurs, comme le ramasse-miettes."""
+    if get_jwt().get("role") != "admin":
+        abort(403, "Réservé aux administrateurs")
+
+@ns.route("/db-pool")
+class DatabasePool(Resource):
+    @jwt_required()
+    def get(self):
+        """Retourne les métriques du pool de connexions à la base de données (admin)."""
+        _require_admin()
+        metrics = get_pool_metrics()
+        engine_options = current_app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        metrics["config"] = {
+            key: value for key, value in engine_options.items()
+            if key in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping")
+        }
+        return metrics
+
+@ns.route("/blob-store")
+class BlobStoreResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Retourne l'occupation du stockage dédupliqué des plans (blobs, références, octets économisés ; admin)."""
+        _require_admin()
+        return blob_store.stats()
+
+    @jwt_required()
+    def post(self):
+        """Supprime les blobs qui ne sont plus référencés par aucun dossier utilisateur (admin)."""
+        _require_admin()
+        removed = blob_store.collect_garbage()
+        return {"removed": removed, **blob_store.stats()}
@@ -1,10 +1,11 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_restx import Namespace, Resource, fields, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.user_service import create_user, get_users, get_user_by_id, update_user, delete_user, get_users_with_folders
-from app.services.folder_service import populate_folders_from_resources
+from app.services.user_service import create_user, get_users, get_user_by_id, update_user, delete_user, get_users_with_folders, LISTING_SORT_COLUMNS
 from app.models.user import User
 from app.models.folder import Folder
+from app.services.blob_store import blob_store
+from app.services.folder_sync_service import folder_sync
 from app import db
 import os
 import logging
@@ -149,223 +150,96 @@ class UserPasswordResource(Resource):
         db.session.commit()
         return {"message": "Mot de passe mis à jour avec succès"}, 200
 
+listing_params = {
+    "page": "Numéro de page (à partir de 1). Sans ce paramètre, la liste complète est retournée",
+    "per_page": "Nombre d'éléments par page (défaut 50)",
+    "role": "Filtre sur le rôle ('all' pour tous les rôles)",
+    "sort": "Colonne de tri : " + ", ".join(LISTING_SORT_COLUMNS),
+    "order": "Ordre de tri : asc ou desc",
+}
+
+def parse_listing_args(default_role):
+    """Lit les paramètres de pagination, filtre et tri du listing utilisateurs/dossiers."""
+    args = request.args
+    try:
+        page = int(args["page"]) if args.get("page") else None
+        per_page = int(args.get("per_page", 50))
+    except ValueError:
+        abort(400, "Paramètres de pagination invalides")
+    if page is not None and (page < 1 or per_page < 1):
+        abort(400, "Paramètres de pagination invalides")
+    per_page = min(per_page, current_app.config.get("USERS_LISTING_MAX_PER_PAGE", 500))
+
+    role = args.get("role", default_role)
+    if role == "all":
+        role = None
+    return {
+        "role": role,
+        "page": page,
+        "per_page": per_page if page else None,
+        "sort": args.get("sort", "user_id"),
+        "order": args.get("order", "asc").lower(),
+    }
+
 @ns.route("/users-with-folders")
 class UsersWithFolders(Resource):
+    @ns.doc(params=listing_params)
     @jwt_required(optional=True)
     def get(self):
-        """Récupère tous les utilisateurs avec leurs dossiers après synchronisation avec Ressources."""
+        """Récupère les utilisateurs avec leurs dossiers (paginé, filtrable et triable ; synchronisé en arrière-plan)."""
+        listing_args = parse_listing_args(default_role="user")
         try:
             # Vérifier l'authentification mais la rendre optionnelle
             jwt_identity = get_jwt_identity()
             logger.info(f"GET request received for users-with-folders by user ID: {jwt_identity}")
             
-            # Corriger le chemin pour pointer vers Backend/app/Ressources
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
-            logger.info(f"Chemin du dossier Ressources: {base_resource_path}")
-            
-            # Vérifier si le dossier Ressources existe, sinon le créer
-            if not os.path.exists(base_resource_path):
-                logger.info(f"Création du dossier Ressources: {base_resource_path}")
-                os.makedirs(base_resource_path)
-            
-            # Appeler la fonction de synchronisation des dossiers
-            logger.info(f"Appel de populate_folders_from_resources avec le chemin: {base_resource_path}")
-            populate_folders_from_resources(base_resource_path)
-            
-            # Récupérer les utilisateurs avec leurs dossiers
-            result = get_users_with_folders()
-            logger.info(f"Nombre d'utilisateurs avec dossiers retournés: {len(result)}")
+            # Récupérer les utilisateurs avec leurs dossiers en une seule requête
+            result = get_users_with_folders(**listing_args)
+            logger.info(f"Nombre d'utilisateurs avec dossiers retournés: {len(result['items'] if listing_args['page'] else result)}")
             return result
             
+        except ValueError as e:
+            abort(400, str(e))
         except Exception as e:
             logger.error(f"Erreur dans users-with-folders: {str(e)}")
             return {"error": f"Erreur lors de la récupération des utilisateurs et dossiers: {str(e)}"}, 500
 
 @ns.route("/simple-users-folders")
 class SimpleUsersFolders(Resource):
+    @ns.doc(params=listing_params)
     def get(self):
-        """Version simplifiée pour récupérer les utilisateurs et leurs dossiers avec synchronisation automatique."""
+        """Version simplifiée pour récupérer tous les utilisateurs et leurs dossiers (lecture seule, synchronisée en arrière-plan)."""
+        listing_args = parse_listing_args(default_role="all")
         try:
-            # Synchroniser automatiquement les dossiers physiques avec la base de données
-            self._synchronize_folders()
-            
-            # Récupérer tous les utilisateurs
-            users = User.query.all()
-            logger.info(f"Nombre d'utilisateurs trouvés: {len(users)}")
-            
-            # Récupérer les dossiers existants (après synchronisation)
-            folders = Folder.query.all()
-            logger.info(f"Nombre de dossiers trouvés après synchronisation: {len(folders)}")
-            
-            # Créer un dictionnaire pour associer les dossiers aux utilisateurs
-            user_folders = {}
-            for folder in folders:
-                user_folders[folder.id_user] = {
-                    "folder_id": folder.id,
-                    "nom_dossier": folder.nom_dossier,
-                    "date_creation": folder.date_creation.isoformat() if folder.date_creation else datetime.now().isoformat()
-                }
-            
-            # Créer la liste de résultats
-            result = []
-            for user in users:
-                folder_info = user_folders.get(user.id, {
-                    "folder_id": None,
-                    "nom_dossier": None,
-                    "date_creation": None
-                })
-                
-                result.append({
-                    "user_id": user.id,
-                    "nom": user.nom,
-                    "prenom": user.prenom,
-                    "email": user.email,
-                    "folder_id": folder_info["folder_id"],
-                    "nom_dossier": folder_info["nom_dossier"],
-                    "date_creation": folder_info["date_creation"]
-                })
-            
-            logger.info(f"Nombre d'entrées retournées: {len(result)}")
+            result = get_users_with_folders(**listing_args)
+            logger.info(f"Nombre d'entrées retournées: {len(result['items'] if listing_args['page'] else result)}")
             return result
             
+        except ValueError as e:
+            abort(400, str(e))
         except Exception as e:
             logger.error(f"Erreur dans simple-users-folders: {str(e)}")
             return {"error": f"Erreur lors de la récupération des utilisateurs et dossiers: {str(e)}"}, 500
-    
-    def _synchronize_folders(self):
-        """Synchronise automatiquement les dossiers physiques avec la base de données."""
-        try:
-            # Chemin du dossier Ressources
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
-            logger.info(f"Synchronisation automatique - Chemin du dossier Ressources: {base_resource_path}")
-            
-            # Vérifier si le dossier Ressources existe
-            if not os.path.exists(base_resource_path):
-                logger.info(f"Création du dossier Ressources: {base_resource_path}")
-                os.makedirs(base_resource_path)
-            
-            # Récupérer tous les utilisateurs
-            users = User.query.all()
-            
-            # Récupérer les dossiers existants dans la base de données
-            existing_folders = Folder.query.all()
-            existing_folder_names = {f.nom_dossier for f in existing_folders}
-            
-            # Récupérer les dossiers physiques
-            physical_folders = [d for d in os.listdir(base_resource_path) if os.path.isdir(os.path.join(base_resource_path, d))]
-            logger.info(f"Dossiers physiques trouvés: {physical_folders}")
-            
-            # Créer un dictionnaire pour associer les noms de dossiers aux utilisateurs
-            user_folder_names = {}
-            for user in users:
-                # Essayer les deux formats : avec point et avec underscore
-                user_folder_name_dot = user.email.split('@')[0]  # Format avec point (ex: raslen.2908)
-                user_folder_name_underscore = user_folder_name_dot.replace('.', '_')  # Format avec underscore (ex: raslen_2908)
-                
-                user_folder_names[user_folder_name_dot] = user.id
-                user_folder_names[user_folder_name_underscore] = user.id
-            
-            folders_added = 0
-            folders_removed = 0
-            
-            # Ajouter les dossiers physiques qui ne sont pas dans la base de données
-            for folder_name in physical_folders:
-                if folder_name not in existing_folder_names:
-                    # Trouver l'utilisateur correspondant
-                    user_id = user_folder_names.get(folder_name)
-                    if user_id:
-                        # Créer le dossier dans la base de données
-                        folder_path = os.path.join(base_resource_path, folder_name)
-                        creation_time = datetime.fromtimestamp(os.path.getctime(folder_path))
-                        new_folder = Folder(id_user=user_id, nom_dossier=folder_name, date_creation=creation_time)
-                        db.session.add(new_folder)
-                        folders_added += 1
-                        logger.info(f"Dossier {folder_name} ajouté à la base de données pour l'utilisateur ID {user_id}")
-            
-            # Supprimer les dossiers de la base de données qui n'existent plus physiquement
-            for folder in existing_folders:
-                if folder.nom_dossier not in physical_folders:
-                    logger.info(f"Suppression du dossier {folder.nom_dossier} de la base de données car il n'existe plus physiquement")
-                    db.session.delete(folder)
-                    folders_removed += 1
-            
-            # Enregistrer les modifications
-            if folders_added > 0 or folders_removed > 0:
-                db.session.commit()
-                logger.info(f"Synchronisation automatique terminée : {folders_added} dossier(s) ajouté(s), {folders_removed} dossier(s) supprimé(s)")
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la synchronisation automatique des dossiers: {str(e)}")
-            db.session.rollback()
 
 @ns.route("/sync-folders")
 class SyncFolders(Resource):
     def get(self):
-        """Synchronise les dossiers physiques avec la base de données."""
+        """Synchronise les dossiers physiques avec la base de données (réconciliation complète immédiate)."""
         try:
-            # Chemin du dossier Ressources
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
-            logger.info(f"Chemin du dossier Ressources: {base_resource_path}")
-            
-            # Vérifier si le dossier Ressources existe
-            if not os.path.exists(base_resource_path):
-                logger.info(f"Création du dossier Ressources: {base_resource_path}")
-                os.makedirs(base_resource_path)
-            
-            # Récupérer tous les utilisateurs
-            users = User.query.all()
-            logger.info(f"Nombre d'utilisateurs trouvés: {len(users)}")
-            
-            # Récupérer les dossiers existants dans la base de données
-            existing_folders = Folder.query.all()
-            existing_folder_names = {f.nom_dossier for f in existing_folders}
-            existing_folder_users = {f.id_user: f.nom_dossier for f in existing_folders}
-            logger.info(f"Dossiers existants dans la base de données: {existing_folder_names}")
-            
-            # Récupérer les dossiers physiques
-            physical_folders = [d for d in os.listdir(base_resource_path) if os.path.isdir(os.path.join(base_resource_path, d))]
+            database_folders = [name for (name,) in db.session.query(Folder.nom_dossier).all()]
+            # Même réconciliation que le synchroniseur de fond, exécutée dans la requête
+            folder_sync.mark_all_dirty()
+            folders_added, folders_removed = folder_sync.flush()
+            with os.scandir(folder_sync.base_resource_path) as entries:
+                physical_folders = sorted(e.name for e in entries if e.is_dir() and not e.name.startswith('.'))
             logger.info(f"Dossiers physiques trouvés: {physical_folders}")
-            
-            # Créer un dictionnaire pour associer les noms de dossiers aux utilisateurs
-            user_folder_names = {}
-            for user in users:
-                user_folder_name = user.email.split('@')[0].replace('.', '_')
-                user_folder_names[user_folder_name] = user.id
-            
-            # Synchroniser les dossiers physiques avec la base de données
-            folders_added = 0
-            folders_removed = 0
-            
-            # Ajouter les dossiers physiques qui ne sont pas dans la base de données
-            for folder_name in physical_folders:
-                if folder_name not in existing_folder_names:
-                    # Trouver l'utilisateur correspondant
-                    user_id = user_folder_names.get(folder_name)
-                    if user_id:
-                        # Créer le dossier dans la base de données
-                        folder_path = os.path.join(base_resource_path, folder_name)
-                        creation_time = datetime.fromtimestamp(os.path.getctime(folder_path))
-                        new_folder = Folder(id_user=user_id, nom_dossier=folder_name, date_creation=creation_time)
-                        db.session.add(new_folder)
-                        folders_added += 1
-                        logger.info(f"Dossier {folder_name} ajouté à la base de données pour l'utilisateur ID {user_id}")
-            
-            # Supprimer les dossiers de la base de données qui n'existent plus physiquement
-            for folder in existing_folders:
-                if folder.nom_dossier not in physical_folders:
-                    db.session.delete(folder)
-                    folders_removed += 1
-                    logger.info(f"Dossier {folder.nom_dossier} supprimé de la base de données")
-            
-            # Enregistrer les modifications
-            db.session.commit()
-            
+
             return {
                 "message": "Synchronisation terminée avec succès",
                 "folders_added": folders_added,
                 "folders_removed": folders_removed,
                 "physical_folders": physical_folders,
-                "database_folders": list(existing_folder_names)
+                "database_folders": database_folders
             }
             
         except Exception as e:
@@ -402,7 +276,7 @@ class RegisterFolder(Resource):
                 return {"message": "Le dossier existe déjà dans la base de données"}, 200
             
             # Créer le chemin du dossier Ressources
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
+            base_resource_path = current_app.config['RESSOURCES_FOLDER']
             folder_path = os.path.join(base_resource_path, folder_name)
             
             # Vérifier si le dossier existe physiquement
@@ -457,7 +331,7 @@ class DeleteFolder(Resource):
                 return {"error": "Vous n'avez pas les permissions nécessaires pour supprimer ce dossier"}, 403
             
             # Supprimer le dossier physiquement
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
+            base_resource_path = current_app.config['RESSOURCES_FOLDER']
             folder_path = os.path.join(base_resource_path, folder.nom_dossier)
             
             if os.path.exists(folder_path):
@@ -465,6 +339,7 @@ class DeleteFolder(Resource):
                     import shutil
                     shutil.rmtree(folder_path)
                     logger.info(f"Physical folder {folder_path} deleted successfully")
+                    blob_store.collect_garbage()
                 except Exception as e:
                     logger.error(f"Error deleting physical folder {folder_path}: {str(e)}")
                     return {"error": f"Erreur lors de la suppression du dossier physique: {str(e)}"}, 500
@@ -3,6 +3,7 @@ import logging
 from flask import jsonify, current_app, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.models.user import User
+from app.services.folder_sync_service import folder_sync
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -67,7 +68,7 @@ def check_user_folder():
     logger.info(f"Email de l'utilisateur: {email}")
     
     # Vérifier si le dossier Ressources existe, sinon le créer
-    resource_dir = os.path.join(current_app.root_path, 'Ressources')
+    resource_dir = current_app.config['RESSOURCES_FOLDER']
     if not os.path.exists(resource_dir):
         logger.info(f"Création du dossier Ressources: {resource_dir}")
         os.makedirs(resource_dir)
@@ -101,7 +102,7 @@ def create_user_folder():
     logger.info(f"Email de l'utilisateur: {email}")
     
     # Vérifier si le dossier Ressources existe, sinon le créer
-    resource_dir = os.path.join(current_app.root_path, 'Ressources')
+    resource_dir = current_app.config['RESSOURCES_FOLDER']
     if not os.path.exists(resource_dir):
         logger.info(f"Création du dossier Ressources: {resource_dir}")
         os.makedirs(resource_dir)
@@ -123,6 +124,7 @@ def create_user_folder():
     try:
         os.makedirs(resource_path)
         logger.info(f"Dossier créé avec succès: {resource_path}")
+        folder_sync.mark_dirty(folder_name)
         return jsonify({
             'message': 'Dossier créé avec succès', 
             'folderName': folder_name,
@@ -3,10 +3,13 @@ from datetime import datetime
 
 class Folder(db.Model):
     __tablename__ = 'folder'
+    __table_args__ = (
+        db.UniqueConstraint('id_user', 'nom_dossier', name='uq_folder_id_user_nom_dossier'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    id_user = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    nom_dossier = db.Column(db.String(100), nullable=False)
+    id_user = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    nom_dossier = db.Column(db.String(100), nullable=False, index=True)
     date_creation = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationship to User
@@ -14,7 +14,7 @@ class User(db.Model):
     prenom = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(50), nullable=False)
+    role = db.Column(db.String(50), nullable=False, index=True)
 
     def __init__(self, nom, prenom, email, password, role):
         self.nom = nom
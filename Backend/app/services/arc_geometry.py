@@ -0,0 +1,87 @@
+import numpy as np
+
+# Arcs des polylignes DXF : chaque sommet porte un "bulge" b = tan(θ/4), où θ est l'angle au centre
+# (signé, positif dans le sens antihoraire) de l'arc qui le relie au sommet suivant ; b = 0 pour un segment droit.
+
+# Écart maximal (flèche, en unités du dessin) entre un arc et les cordes qui le remplacent
+ARC_TOLERANCE = 1e-3
+# Nombre maximal de cordes par arc, quelle que soit la tolérance demandée
+MAX_ARC_SEGMENTS = 256
+
+
+def vertex_dict(x, y, bulge=0.0):
+    """Sommet du résultat JSON d'extraction ; la clé 'bulge' n'est présente que pour un arc."""
+    if bulge:
+        return {'x': x, 'y': y, 'bulge': bulge}
+    return {'x': x, 'y': y}
+
+
+def following_vertices(lengths, starts):
+    """Indice du sommet suivant de chaque sommet, le dernier de chaque contour rebouclant sur le premier."""
+    following = np.arange(1, int(lengths.sum()) + 1, dtype=np.intp)
+    nonempty = lengths > 0
+    following[(starts + lengths - 1)[nonempty]] = starts[nonempty]
+    return following
+
+
+def bulge_segment_areas(start, end, bulges):
+    """Aires signées (M,) des segments circulaires entre chaque corde start -> end (M, 2) et son arc.
+
+    Aire exacte r²/2 (θ - sin θ), du signe du bulge : à ajouter à l'aire signée (formule du lacet)
+    du contour des cordes pour obtenir l'aire exacte d'une polyligne à arcs.
+    """
+    bulges = np.asarray(bulges, dtype=np.float64)
+    chord = np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+    theta = 4.0 * np.arctan(np.abs(bulges))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = chord * (1.0 + bulges ** 2) / (4.0 * np.abs(bulges))
+        areas = np.sign(bulges) * radius ** 2 / 2.0 * (theta - np.sin(theta))
+    return np.where((bulges != 0) & (chord > 0), areas, 0.0)
+
+
+def tessellate_bulges(coords, bulges, owner, tolerance=ARC_TOLERANCE):
+    """Remplace les arcs des contours fermés par des cordes dont la flèche ne dépasse pas `tolerance`.
+
+    `coords` (N, 2), `bulges` (N,) et `owner` (N,) décrivent des contours consécutifs (owner croissant).
+    Le nombre de cordes de chaque arc est adapté à son rayon et à son angle. Retourne (coords, owner)
+    avec les sommets intermédiaires insérés ; sans arc, les tableaux sont retournés tels quels.
+    """
+    arcs = np.flatnonzero(bulges != 0)
+    if not len(arcs):
+        return coords, owner
+    counts = np.bincount(owner, minlength=int(owner.max()) + 1)
+    following = following_vertices(counts, np.cumsum(counts) - counts)
+    start, end, bulge = coords[arcs], coords[following[arcs]], bulges[arcs]
+    delta = end - start
+    chord = np.hypot(delta[:, 0], delta[:, 1])
+    valid = chord > 0
+    arcs, start, delta, chord, bulge = arcs[valid], start[valid], delta[valid], chord[valid], bulge[valid]
+    if not len(arcs):
+        return coords, owner
+
+    theta = 4.0 * np.arctan(bulge)
+    radius = chord * (1.0 + bulge ** 2) / (4.0 * np.abs(bulge))
+    # Centre : depuis le milieu de la corde, le long de sa normale à gauche
+    offset = (1.0 - bulge ** 2) / (4.0 * bulge)
+    center = start + delta / 2.0 + np.stack([-delta[:, 1], delta[:, 0]], axis=1) * offset[:, None]
+    step = 2.0 * np.arccos(np.clip(1.0 - tolerance / radius, -1.0, 1.0))
+    with np.errstate(divide='ignore'):
+        segments = np.clip(np.ceil(np.abs(theta) / step), 1, MAX_ARC_SEGMENTS).astype(np.int64)
+
+    # Sommets intermédiaires de chaque arc, insérés juste après son sommet de départ
+    inserted = segments - 1
+    arc_of_point = np.repeat(np.arange(len(arcs)), inserted)
+    rank = np.arange(inserted.sum()) - np.repeat(np.cumsum(inserted) - inserted, inserted) + 1
+    origin = np.arctan2(start[:, 1] - center[:, 1], start[:, 0] - center[:, 0])
+    angle = origin[arc_of_point] + theta[arc_of_point] * rank / segments[arc_of_point]
+    points = center[arc_of_point] + radius[arc_of_point, None] * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+    extra = np.zeros(len(coords), dtype=np.int64)
+    extra[arcs] = inserted
+    position = np.arange(len(coords)) + np.cumsum(extra) - extra
+    result = np.empty((len(coords) + len(points), 2))
+    result_owner = np.empty(len(result), dtype=owner.dtype)
+    result[position], result_owner[position] = coords, owner
+    target = position[arcs[arc_of_point]] + rank
+    result[target], result_owner[target] = points, owner[arcs[arc_of_point]]
+    return result, result_owner
@@ -0,0 +1,177 @@
+from contextlib import contextmanager
+import os
+import shutil
+import tempfile
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Verrou inter-processus (API et folder_service partagent .blobs) ; indisponible hors POSIX
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - dépend de la plateforme
+    fcntl = None
+
+# Dossier caché du dossier Ressources contenant un exemplaire de chaque contenu, nommé par son hash
+BLOB_DIR_NAME = ".blobs"
+# Suffixe du dossier d'artefacts d'extraction partagé par toutes les copies d'un même contenu
+BLOB_CACHE_SUFFIX = ".cache"
+# Fichier verrouillé (flock) pendant l'ajout d'un blob et le ramasse-miettes, par tous les processus
+LOCK_FILE_NAME = ".lock"
+
+
+class BlobStore:
+    """Stockage des plans adressé par contenu, avec déduplication par liens physiques.
+
+    Chaque contenu est conservé une seule fois sous .blobs/<2 premiers caractères>/<sha256> ;
+    les fichiers des dossiers utilisateurs sont des liens physiques vers ce blob. Le nombre de
+    références d'un blob est son nombre de liens moins un : supprimer un fichier ou un dossier
+    utilisateur le décrémente, et collect_garbage() supprime les blobs qui ne sont plus référencés.
+    Les artefacts d'extraction sont rangés à côté du blob et servent à toutes ses copies.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.root = os.path.join(app.config['RESSOURCES_FOLDER'], BLOB_DIR_NAME)
+        self.enabled = app.config.get('DEDUP_ENABLED', True)
+        app.extensions['blob_store'] = self
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def cache_dir(self, digest):
+        """Dossier d'artefacts d'extraction partagé par toutes les copies du contenu `digest`."""
+        return self.blob_path(digest) + BLOB_CACHE_SUFFIX
+
+    @contextmanager
+    def _locked(self):
+        """Exclusion entre threads et entre processus (flock sur .blobs/.lock) pour add et collect_garbage."""
+        with self._lock:
+            if fcntl is None or self.root is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, LOCK_FILE_NAME), "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def add(self, source, digest, destination):
+        """Place le fichier reçu `source` à `destination` sous forme de lien vers le blob `digest`.
+
+        `source` est consommé (déplacé dans le stockage, ou supprimé une fois le lien créé si le contenu y est déjà).
+        Retourne True si le contenu était déjà stocké. Sans stockage configuré ou si le système de
+        fichiers ne permet pas les liens physiques, le fichier est simplement déplacé à `destination`.
+        """
+        if not self.enabled or self.root is None:
+            _move(source, destination)
+            return False
+
+        blob = self.blob_path(digest)
+        with self._locked():
+            deduplicated = os.path.exists(blob)
+            if not deduplicated:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                _move(source, blob)
+            try:
+                _link_replace(blob, destination)
+            except OSError as e:
+                logger.warning(f"Liens physiques indisponibles, copie de {digest} vers {destination}: {str(e)}")
+                _copy_replace(source if deduplicated else blob, destination)
+            # Le fichier reçu n'est supprimé qu'une fois `destination` en place
+            if deduplicated:
+                os.unlink(source)
+        if deduplicated:
+            logger.info(f"Contenu déjà stocké ({digest}), lien créé : {destination}")
+        return deduplicated
+
+    def _blobs(self):
+        if self.root is None or not os.path.isdir(self.root):
+            return
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    yield entry
+
+    def stats(self):
+        """Nombre de blobs, de références et octets stockés / économisés par la déduplication."""
+        blobs = references = stored_bytes = logical_bytes = 0
+        for entry in self._blobs():
+            stat = entry.stat()
+            refs = stat.st_nlink - 1
+            blobs += 1
+            references += refs
+            stored_bytes += stat.st_size
+            logical_bytes += stat.st_size * refs
+        return {
+            "blobs": blobs,
+            "references": references,
+            "stored_bytes": stored_bytes,
+            "logical_bytes": logical_bytes,
+            "saved_bytes": max(logical_bytes - stored_bytes, 0),
+        }
+
+    def collect_garbage(self):
+        """Supprime les blobs qui ne sont plus référencés par aucun fichier utilisateur ; retourne leur nombre."""
+        removed = 0
+        with self._locked():
+            for entry in list(self._blobs()):
+                if entry.stat().st_nlink > 1:
+                    continue
+                os.unlink(entry.path)
+                shutil.rmtree(entry.path + BLOB_CACHE_SUFFIX, ignore_errors=True)
+                removed += 1
+                try:
+                    os.rmdir(os.path.dirname(entry.path))
+                except OSError:
+                    pass  # Le dossier de préfixe contient encore d'autres blobs
+        if removed:
+            logger.info(f"{removed} blob(s) non référencé(s) supprimé(s) de {self.root}")
+        return removed
+
+
+def _link_replace(source, destination):
+    """Crée `destination` comme lien physique vers `source`, en remplaçant atomiquement un fichier existant."""
+    tmp_path = os.path.join(os.path.dirname(destination) or ".", f".{os.path.basename(destination)}.{os.getpid()}.link")
+    if os.path.lexists(tmp_path):
+        os.unlink(tmp_path)
+    os.link(source, tmp_path)
+    try:
+        os.replace(tmp_path, destination)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+
+def _move(source, destination):
+    try:
+        os.replace(source, destination)
+    except OSError:
+        # Destination sur un autre système de fichiers : copie puis renommage dans le dossier cible
+        _copy_replace(source, destination)
+        os.unlink(source)
+
+
+def _copy_replace(source, destination):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination) or ".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as target, open(source, "rb") as src:
+            shutil.copyfileobj(src, target)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+blob_store = BlobStore()
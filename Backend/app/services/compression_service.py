@@ -0,0 +1,252 @@
+from flask import jsonify, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.wsgi import LimitedStream
+from app.services.metrics_service import span
+import io
+import zlib
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# zstd et brotli sont optionnels : sans les paquets, seul gzip est négocié
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+_DECODE_ERRORS = (zlib.error, ValueError) + ((zstandard.ZstdError,) if zstandard is not None else ()) \
+    + ((brotli.error,) if brotli is not None else ())
+
+# Types de contenu compressés : JSON d'extraction, géométries GEXG, arborescences, textes visa
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/javascript", "application/xml", "image/svg+xml",
+                          "application/vnd.gex.geometry"}
+DECOMPRESS_BLOCK_SIZE = 64 * 1024
+
+
+class _GzipEncoder:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.finish()
+
+
+def available_encodings():
+    """Encodages utilisables dans cet environnement, avec leur compresseur."""
+    encoders = {"gzip": _GzipEncoder}
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    return encoders
+
+
+class InvalidRequestEncoding(BadRequest):
+    """Corps de requête compressé illisible ou encodage non pris en charge."""
+
+
+def _read_blocks(source):
+    return iter(lambda: source.read(DECOMPRESS_BLOCK_SIZE), b"")
+
+
+def _gzip_chunks(source):
+    # wbits=47 : détection automatique des en-têtes gzip et zlib
+    obj = zlib.decompressobj(47)
+    for block in _read_blocks(source):
+        while block:
+            yield obj.decompress(block, DECOMPRESS_BLOCK_SIZE)
+            block = obj.unconsumed_tail
+
+
+def _zstd_chunks(source):
+    yield from zstandard.ZstdDecompressor().read_to_iter(
+        source, read_size=DECOMPRESS_BLOCK_SIZE, write_size=DECOMPRESS_BLOCK_SIZE)
+
+
+def _brotli_chunks(source):
+    obj = brotli.Decompressor()
+    for block in _read_blocks(source):
+        yield obj.process(block, output_buffer_limit=DECOMPRESS_BLOCK_SIZE)
+        while not obj.can_accept_more_data():
+            yield obj.process(b"", output_buffer_limit=DECOMPRESS_BLOCK_SIZE)
+
+
+def _decoder(encoding):
+    """Décompresseur incrémental : fonction source -> blocs décompressés de l'ordre de DECOMPRESS_BLOCK_SIZE octets.
+
+    La taille de chaque bloc produit est bornée pendant la décompression, pour que la limite de taille
+    du corps s'applique avant qu'un bloc piégé ne soit entièrement décompressé en mémoire.
+    """
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        return _gzip_chunks
+    if encoding == "zstd" and zstandard is not None:
+        return _zstd_chunks
+    # Brotli >= 1.1 : seules ces versions savent plafonner la sortie (output_buffer_limit)
+    if encoding == "br" and brotli is not None and hasattr(brotli.Decompressor, "can_accept_more_data"):
+        return _brotli_chunks
+    return None
+
+
+def negotiate_encoding(accept_encodings, preferences):
+    """Choisit l'encodage accepté de plus haute qualité, à égalité dans l'ordre des préférences."""
+    encoders = available_encodings()
+    best, best_quality = None, 0
+    for encoding in preferences:
+        if encoding not in encoders:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _levels(config):
+    return {
+        "gzip": config.get("COMPRESSION_GZIP_LEVEL", 6),
+        "zstd": config.get("COMPRESSION_ZSTD_LEVEL", 3),
+        "br": config.get("COMPRESSION_BROTLI_LEVEL", 4),
+    }
+
+
+def _is_compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _stream(iterable, encoder):
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = encoder.compress(chunk)
+            if data:
+                yield data
+        yield encoder.flush()
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, config):
+    """Compresse la réponse si le client l'accepte et qu'elle dépasse le seuil configuré.
+
+    Les réponses de taille connue sont compressées d'un bloc ; les réponses en flux (générateurs,
+    send_file) sont compressées au fil de l'eau, sans être chargées en mémoire.
+    """
+    if (request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers or not _is_compressible(response)):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    streamed = response.is_streamed or response.direct_passthrough
+    length = response.content_length if streamed else response.calculate_content_length()
+    if length is not None and length < config.get("COMPRESSION_MIN_SIZE", 1024):
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings, config.get("COMPRESSION_ALGORITHMS", ["gzip"]))
+    if encoding is None:
+        return response
+    encoder = available_encodings()[encoding](_levels(config)[encoding])
+
+    if streamed:
+        response.direct_passthrough = False
+        response.response = _stream(response.response, encoder)
+        response.headers.pop("Content-Length", None)
+    else:
+        with span("compress"):
+            response.set_data(encoder.compress(response.get_data()) + encoder.flush())
+    response.headers["Content-Encoding"] = encoding
+    # Une ETag forte ne décrit plus la représentation compressée
+    if response.headers.get("ETag") and not response.headers["ETag"].startswith("W/"):
+        response.headers["ETag"] = "W/" + response.headers["ETag"]
+    return response
+
+
+def decompress_request_body(config):
+    """Remplace un corps de requête compressé (Content-Encoding) par sa version décompressée.
+
+    La taille décompressée est plafonnée par MAX_CONTENT_LENGTH pour se prémunir des archives
+    piégées ; un encodage inconnu est refusé (400).
+    """
+    encoding = request.headers.get("Content-Encoding", "").strip().lower()
+    if not encoding or encoding == "identity":
+        return
+    decode = _decoder(encoding)
+    if decode is None:
+        raise InvalidRequestEncoding(f"Encodage de requête non pris en charge : {encoding}")
+
+    limit = config.get("MAX_CONTENT_LENGTH")
+    output = io.BytesIO()
+    compressed_length = request.content_length
+    stream = request.environ["wsgi.input"]
+    if compressed_length is not None:
+        stream = LimitedStream(stream, compressed_length)
+    with span("decompress"):
+        try:
+            for data in decode(stream):
+                output.write(data)
+                if limit and output.tell() > limit:
+                    raise RequestEntityTooLarge()
+        except _DECODE_ERRORS as e:
+            raise InvalidRequestEncoding(f"Corps de requête {encoding} invalide : {str(e)}")
+
+    body = output.getvalue()
+    request.environ["wsgi.input"] = io.BytesIO(body)
+    request.environ["CONTENT_LENGTH"] = str(len(body))
+    request.environ.pop("HTTP_CONTENT_ENCODING", None)
+    logger.debug(f"Corps de requête {encoding} décompressé : {compressed_length} -> {len(body)} octets")
+
+
+def init_compression(app):
+    """Active la compression négociée des réponses et l'acceptation des corps de requête compressés."""
+    preferences = app.config.get("COMPRESSION_ALGORITHMS", "zstd,br,gzip")
+    if isinstance(preferences, str):
+        preferences = [p.strip() for p in preferences.split(",") if p.strip()]
+    app.config["COMPRESSION_ALGORITHMS"] = preferences
+    logger.info(f"Compression des réponses : {', '.join(e for e in preferences if e in available_encodings())}")
+
+    @app.before_request
+    def _decompress_request():
+        decompress_request_body(app.config)
+
+    @app.errorhandler(InvalidRequestEncoding)
+    def _invalid_encoding(e):
+        logger.error(e.description)
+        return jsonify({"error": e.description}), 400
+
+    if app.config.get("COMPRESSION_ENABLED", True):
+        @app.after_request
+        def _compress_response(response):
+            return compress_response(response, app.config)
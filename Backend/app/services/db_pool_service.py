@@ -0,0 +1,102 @@
+from sqlalchemy import event
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Compteurs du pool de connexions alimentés par les événements SQLAlchemy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engine = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.max_checked_out = 0
+        self.checked_out = 0
+        self.total_checkout_seconds = 0.0
+
+    def instrument(self, engine):
+        """Attache les listeners au pool du moteur donné."""
+        self.engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        logger.info(f"Métriques du pool activées ({type(engine.pool).__name__})")
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_time"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop("checkout_time", None)
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+            if started is not None:
+                self.total_checkout_seconds += time.perf_counter() - started
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        """Retourne l'état courant du pool et les compteurs cumulés."""
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            metrics = {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "connects_total": self.connects,
+                "checkouts_total": self.checkouts,
+                "checkins_total": self.checkins,
+                "invalidations_total": self.invalidations,
+                "checked_out_max": self.max_checked_out,
+                "checkout_seconds_total": round(self.total_checkout_seconds, 6),
+            }
+
+        # Les pools QueuePool exposent leur taille et leur débordement courant
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                metrics[f"pool_{name}"] = method()
+        if pool is not None and hasattr(pool, "_max_overflow"):
+            metrics["pool_max_overflow"] = pool._max_overflow
+        return metrics
+
+
+pool_metrics = PoolMetrics()
+
+
+def init_pool_metrics(app, db):
+    """Instrumente le moteur de l'application (à appeler après db.init_app)."""
+    with app.app_context():
+        pool_metrics.instrument(db.engine)
+
+
+def get_pool_metrics():
+    return pool_metrics.snapshot()
+
+
+def pool_prometheus_samples():
+    """Collecteur pour /metrics : compteurs et jauges du pool au format (nom, type, aide, échantillons)."""
+    snapshot = pool_metrics.snapshot()
+    samples = []
+    for key, value in snapshot.items():
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        metric_type = "counter" if key.endswith("_total") else "gauge"
+        samples.append((f"gex_db_{key}", metric_type, f"Pool de connexions : {key}", {(): value}))
+    return samples
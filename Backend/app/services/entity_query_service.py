@@ -0,0 +1,222 @@
+from app.services.file_service import get_file_geometry
+from app.services.geometry_format import COLLECTIONS, FLAG_CLOSED, TYPE_CODES, TYPE_NAMES, GeometryFile, open_geometry
+from app.services.metrics_service import span
+from app.services.spatial_index import get_spatial_index
+import fnmatch
+import functools
+import os
+import re
+import threading
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+# Nombre de plans dont les colonnes (emprises, aires, rangs de tri) restent en mémoire
+INDEX_CACHE_SIZE = 16
+SORT_FIELDS = ('index', 'type', 'layer', 'area', 'vertices')
+
+
+class EntityIndex:
+    """Colonnes numpy d'un plan pour filtrer et trier ses entités sans construire de dict."""
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+        with span('entity_index'):
+            self.bounds = geometry.entity_bounds()
+            self.areas = geometry.entity_areas()
+            self.vertex_counts = np.diff(geometry.vertex_start).astype(np.int64)
+            # Rangs de tri des calques (insensible à la casse) et des types (ordre alphabétique)
+            layer_order = sorted(range(len(geometry.layers)), key=lambda i: geometry.layers[i].upper())
+            layer_rank = np.empty(len(geometry.layers), dtype=np.int64)
+            layer_rank[layer_order] = np.arange(len(layer_order))
+            self.layer_ranks = layer_rank[geometry.layer_index]
+            type_rank = np.zeros(max(TYPE_NAMES) + 1, dtype=np.int64)
+            for rank, code in enumerate(sorted(TYPE_NAMES, key=TYPE_NAMES.get)):
+                type_rank[code] = rank
+            self.type_ranks = type_rank[geometry.types]
+
+    def sort_key(self, field):
+        return {
+            'index': np.arange(self.geometry.entity_count),
+            'type': self.type_ranks,
+            'layer': self.layer_ranks,
+            'area': self.areas,
+            'vertices': self.vertex_counts,
+        }[field]
+
+
+_index_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _cached_index(geometry_path, size, mtime_ns):
+    return EntityIndex(open_geometry(geometry_path))
+
+
+def entity_index(file_path):
+    """Index des entités d'un plan, construit depuis la géométrie GEXG du cache d'extraction.
+
+    Les index sont gardés en mémoire par fichier GEXG (chemin, taille, date) : un plan modifié
+    produit un nouveau fichier en cache et donc un nouvel index.
+    """
+    geometry = get_file_geometry(file_path)
+    if not isinstance(geometry, str):
+        # Cache d'extraction inaccessible : index construit pour cette requête uniquement
+        return EntityIndex(GeometryFile(geometry))
+    stat = os.stat(geometry)
+    with _index_cache_lock:
+        return _cached_index(geometry, stat.st_size, stat.st_mtime_ns)
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    items = [str(v).strip() for v in value if str(v).strip()]
+    return items or None
+
+
+def _as_float(params, name):
+    value = params.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Valeur numérique invalide pour {name} : {value}")
+
+
+def parse_entity_query(params):
+    """Lit les paramètres d'une requête d'entités (JSON ou query string).
+
+    types (types DXF ou noms de listes : polylines, lines...), layers (motifs glob, un préfixe nu
+    est complété par "*"), bbox ("minx,miny,maxx,maxy", entités qui l'intersectent), minArea,
+    maxArea, closedOnly, sort (champ de SORT_FIELDS, préfixé par "-" pour un tri décroissant),
+    page (à partir de 1) et pageSize. Lève ValueError si une valeur est invalide.
+    """
+    params = params or {}
+    query = {}
+
+    types = _as_list(params.get('types'))
+    if types is not None:
+        codes = set()
+        for value in types:
+            names = [name for name, collection in COLLECTIONS.items() if collection == value.lower()] or [value.upper()]
+            unknown = [name for name in names if name not in COLLECTIONS]
+            if unknown:
+                raise ValueError(f"Type d'entité non pris en charge : {value}")
+            codes.update(TYPE_CODES[name] for name in names)
+        query['types'] = sorted(codes)
+
+    layers = _as_list(params.get('layers'))
+    if layers is not None:
+        query['layers'] = [layer if any(c in layer for c in '*?[') else layer + '*' for layer in layers]
+
+    bbox = _as_list(params.get('bbox'))
+    if bbox is not None:
+        try:
+            bbox = [float(v) for v in bbox]
+        except ValueError:
+            raise ValueError("bbox doit contenir quatre nombres : minx,miny,maxx,maxy")
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError("bbox doit contenir quatre nombres : minx,miny,maxx,maxy")
+        query['bbox'] = bbox
+
+    query['min_area'] = _as_float(params, 'minArea')
+    query['max_area'] = _as_float(params, 'maxArea')
+    closed_only = params.get('closedOnly')
+    query['closed_only'] = closed_only is not None and str(closed_only).lower() in ('1', 'true', 'yes', 'on')
+
+    sort = str(params.get('sort') or 'index').strip()
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-+')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Tri non pris en charge : {sort} (valeurs possibles : {', '.join(SORT_FIELDS)})")
+    query['sort'], query['descending'] = sort, descending
+
+    try:
+        query['page'] = max(int(params.get('page') or 1), 1)
+        query['page_size'] = min(max(int(params.get('pageSize') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("page et pageSize doivent être des entiers")
+    return query
+
+
+def _layer_mask(geometry, patterns):
+    regex = re.compile('|'.join(fnmatch.translate(p) for p in patterns), re.IGNORECASE)
+    # Un test par calque puis une indexation numpy, plutôt qu'un test par entité
+    matching = np.array([bool(regex.match(name)) for name in geometry.layers], dtype=bool)
+    return matching[geometry.layer_index] if len(matching) else np.zeros(geometry.entity_count, dtype=bool)
+
+
+def _counts(geometry, mask):
+    types = geometry.types[mask]
+    counts = {collection: 0 for collection in dict.fromkeys(COLLECTIONS.values())}
+    for code, count in zip(*np.unique(types, return_counts=True)):
+        counts[COLLECTIONS[TYPE_NAMES[int(code)]]] += int(count)
+    layer_counts = np.bincount(geometry.layer_index[mask], minlength=len(geometry.layers))
+    return counts, {geometry.layers[i]: int(c) for i, c in enumerate(layer_counts) if c}
+
+
+def query_entities(file_path, page=1, page_size=DEFAULT_PAGE_SIZE, types=None, layers=None, bbox=None,
+                   min_area=None, max_area=None, closed_only=False, sort='index', descending=False):
+    """Filtre, trie et pagine les entités d'un plan à partir de son index en cache.
+
+    Retourne les comptes des entités retenues (par liste et par calque) et une page de lignes :
+    l'entité complète (même forme que extract_dxf_data) accompagnée de son indice, son emprise,
+    son aire et son nombre de sommets. Seules les entités de la page sont converties en dict.
+    """
+    index = entity_index(file_path)
+    geometry = index.geometry
+
+    with span('entity_query'):
+        mask = np.ones(geometry.entity_count, dtype=bool)
+        if types is not None:
+            mask &= np.isin(geometry.types, types)
+        if layers:
+            mask &= _layer_mask(geometry, layers)
+        if bbox is not None:
+            in_bbox = np.zeros(geometry.entity_count, dtype=bool)
+            in_bbox[get_spatial_index(file_path).query_bbox(bbox)] = True
+            mask &= in_bbox
+        if min_area is not None:
+            mask &= index.areas >= min_area
+        if max_area is not None:
+            mask &= index.areas <= max_area
+        if closed_only:
+            mask &= (geometry.flags & FLAG_CLOSED) != 0
+
+        matched = np.flatnonzero(mask)
+        key = index.sort_key(sort)[matched]
+        # Tri stable : à valeur égale, les entités restent dans l'ordre du fichier
+        order = np.argsort(-key if descending else key, kind='stable')
+        start = (page - 1) * page_size
+        selected = matched[order[start:start + page_size]]
+        counts, layer_counts = _counts(geometry, mask)
+
+    rows = []
+    for i in selected.tolist():
+        bounds = index.bounds[i]
+        rows.append({
+            "id": i,
+            "bbox": None if np.isnan(bounds[0]) else bounds.tolist(),
+            "area": float(index.areas[i]),
+            "vertex_count": int(index.vertex_counts[i]),
+            **geometry.entity(i),
+        })
+    return {
+        "total_entities": geometry.entity_count,
+        "matched": int(len(matched)),
+        "counts": counts,
+        "layer_counts": layer_counts,
+        "page": page,
+        "page_size": page_size,
+        "pages": (len(matched) + page_size - 1) // page_size,
+        "sort": ('-' if descending else '') + sort,
+        "items": rows,
+    }
@@ -0,0 +1,230 @@
+import json
+import os
+import shutil
+import threading
+import logging
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dossier caché créé à côté des fichiers DXF ; ignoré par les listings et la synchronisation
+CACHE_DIR_NAME = ".gex_cache"
+META_FILE = "meta.json"
+# Attente maximale d'un calcul déjà en cours (ingestion) avant de relancer l'analyse soi-même
+INFLIGHT_WAIT_TIMEOUT = 60.0
+# Version du contenu des artefacts : l'incrémenter invalide les caches existants
+# (2 : bulges des polylignes ; 3 : calques GEXG à la casse des entités, POLYLINE fermées)
+CACHE_FORMAT = 3
+# Nombre fixe de verrous d'écriture, partagés entre dossiers de cache : la table ne grandit pas avec les fichiers
+LOCK_STRIPES = 64
+
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_locks_guard = threading.Lock()
+_inflight = {}
+
+
+def _lock_for(path):
+    return _locks[hash(path) % LOCK_STRIPES]
+
+
+def cache_dir_for(file_path):
+    """Dossier de cache d'un fichier : <dossier>/.gex_cache/<nom du fichier>/."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, CACHE_DIR_NAME, name)
+
+
+def file_signature(file_path):
+    """État du fichier (taille, date de modification) et version des artefacts auxquels le cache est rattaché."""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "format": CACHE_FORMAT}
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    """Écriture atomique : fichier temporaire puis os.replace, pour ne jamais exposer un JSON partiel."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _write_bytes(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _artifact_file(artifact, data=None):
+    # Les artefacts binaires (bytes, ex. géométries GEXG) sont stockés tels quels, les autres en JSON
+    return f"{artifact}.bin" if isinstance(data, (bytes, bytearray)) else f"{artifact}.json"
+
+
+def _fresh_meta(file_path, cache_dir, signature=None):
+    """Métadonnées du cache si elles correspondent encore au fichier, sinon None."""
+    meta = _read_json(os.path.join(cache_dir, META_FILE))
+    signature = signature or file_signature(file_path)
+    if meta is None or {k: meta.get(k) for k in signature} != signature:
+        return None
+    return meta
+
+
+def _artifact_dir(cache_dir, meta):
+    # Contenu dédupliqué : les artefacts sont partagés par toutes les copies (voir blob_store).
+    # Le chemin est relatif au dossier de cache pour survivre à un déplacement du dossier Ressources ;
+    # un sous-dossier par version (CACHE_FORMAT) évite de resservir des artefacts partagés obsolètes.
+    shared_cache = (meta or {}).get("shared_cache")
+    if not shared_cache:
+        return cache_dir
+    return os.path.join(os.path.normpath(os.path.join(cache_dir, shared_cache)), f"format-{CACHE_FORMAT}")
+
+
+def get_cached(file_path, artifact):
+    """Retourne l'artefact en cache s'il correspond encore au fichier (taille et date), sinon None."""
+    cache_dir = cache_dir_for(file_path)
+    try:
+        meta = _fresh_meta(file_path, cache_dir)
+    except OSError:
+        return None
+    if meta is None:
+        return None
+    return _read_json(os.path.join(_artifact_dir(cache_dir, meta), f"{artifact}.json"))
+
+
+def get_cached_path(file_path, artifact):
+    """Chemin de l'artefact en cache (JSON ou binaire) s'il correspond encore au fichier, sinon None.
+
+    Permet de servir ou de mmapper un artefact binaire sans le charger en mémoire.
+    """
+    cache_dir = cache_dir_for(file_path)
+    try:
+        meta = _fresh_meta(file_path, cache_dir)
+    except OSError:
+        return None
+    if meta is None:
+        return None
+    artifact_dir = _artifact_dir(cache_dir, meta)
+    for name in (f"{artifact}.bin", f"{artifact}.json"):
+        path = os.path.join(artifact_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def store(file_path, artifact, data, signature=None):
+    """Enregistre un artefact (JSON, ou binaire si `data` est de type bytes) ; le cache est vidé si le fichier source a changé depuis les artefacts précédents.
+
+    `signature` est l'état du fichier relevé avant le calcul : si le fichier a été modifié
+    pendant le calcul, l'artefact (obsolète) n'est pas enregistré.
+    """
+    cache_dir = cache_dir_for(file_path)
+    with _lock_for(cache_dir):
+        current = file_signature(file_path)
+        if signature is not None and signature != current:
+            logger.info(f"Fichier modifié pendant le calcul, cache {artifact} ignoré: {file_path}")
+            return False
+        meta = _fresh_meta(file_path, cache_dir, current) if os.path.isdir(cache_dir) else None
+        if meta is None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_json(os.path.join(cache_dir, META_FILE), current)
+        artifact_dir = _artifact_dir(cache_dir, meta)
+        path = os.path.join(artifact_dir, _artifact_file(artifact, data))
+        # Les artefacts peuvent être rangés en sous-dossiers (ex. tuiles : "tiles/<z>/<x>/<y>")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, (bytes, bytearray)):
+            _write_bytes(path, data)
+        else:
+            _write_json(path, data)
+        return True
+
+
+@contextmanager
+def computing(file_path):
+    """Signale qu'un calcul d'artefacts est en cours pour ce fichier.
+
+    Pendant ce temps, get_or_compute attend la fin du calcul plutôt que d'analyser le fichier une seconde fois.
+    """
+    cache_dir = cache_dir_for(file_path)
+    event = threading.Event()
+    with _locks_guard:
+        _inflight[cache_dir] = event
+    try:
+        yield
+    finally:
+        with _locks_guard:
+            if _inflight.get(cache_dir) is event:
+                del _inflight[cache_dir]
+        event.set()
+
+
+def wait_inflight(file_path, timeout=INFLIGHT_WAIT_TIMEOUT):
+    """Attend la fin d'un calcul en cours pour ce fichier ; retourne False si le délai est dépassé."""
+    with _locks_guard:
+        event = _inflight.get(cache_dir_for(file_path))
+    return event.wait(timeout) if event is not None else True
+
+
+def record_content_hash(file_path, digest, shared_cache=None):
+    """Associe le hash du contenu (calculé à l'upload) à l'état courant du fichier.
+
+    `shared_cache` désigne le dossier d'artefacts commun à toutes les copies de ce contenu ;
+    les artefacts propres au chemin sont alors abandonnés.
+    """
+    cache_dir = cache_dir_for(file_path)
+    with _lock_for(cache_dir):
+        current = file_signature(file_path)
+        meta = _fresh_meta(file_path, cache_dir, current) if os.path.isdir(cache_dir) else None
+        if meta is None or shared_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            meta = None
+        os.makedirs(cache_dir, exist_ok=True)
+        meta = {**(meta or current), "sha256": digest}
+        if shared_cache:
+            meta["shared_cache"] = os.path.relpath(shared_cache, cache_dir)
+        _write_json(os.path.join(cache_dir, META_FILE), meta)
+
+
+def content_hash(file_path):
+    """Hash du contenu enregistré à l'upload, s'il correspond encore au fichier, sinon None."""
+    try:
+        meta = _fresh_meta(file_path, cache_dir_for(file_path))
+    except OSError:
+        return None
+    return meta.get("sha256") if meta else None
+
+
+def get_or_compute(file_path, artifact, compute):
+    """Lit l'artefact en cache ou le calcule avec compute(file_path) puis le met en cache.
+
+    Les résultats contenant une clé "error" ne sont pas mis en cache.
+    """
+    cached = get_cached(file_path, artifact)
+    if cached is None and wait_inflight(file_path):
+        cached = get_cached(file_path, artifact)
+    if cached is not None:
+        logger.debug(f"Cache hit {artifact} pour {file_path}")
+        return cached
+
+    signature = file_signature(file_path)
+    result = compute(file_path)
+    if isinstance(result, dict) and "error" not in result:
+        try:
+            store(file_path, artifact, result, signature)
+        except OSError as e:
+            # Dossier en lecture seule ou disque plein : le résultat reste valable sans cache
+            logger.warning(f"Impossible d'écrire le cache {artifact} pour {file_path}: {str(e)}")
+    return result
+
+
+def invalidate(file_path):
+    """Supprime tous les artefacts en cache d'un fichier (suppression, remplacement)."""
+    shutil.rmtree(cache_dir_for(file_path), ignore_errors=True)
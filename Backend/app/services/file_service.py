@@ -1,136 +1,491 @@
 import ezdxf
+import fnmatch
+import functools
+import io
+import numpy as np
 import tempfile
 import os
 import logging
 from ezdxf.entities import Polyline, Line, Circle, Arc, Text
+from flask import send_file
+from app.services.arc_geometry import bulge_segment_areas, vertex_dict
+from app.services.metrics_service import span
+from app.services import extraction_cache
+from app.services.geometry_format import MIME_TYPE as GEOMETRY_MIME_TYPE, encode_entities
+from app.services.upload_service import staged_path
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def extract_file_data(file):
+# Types d'entités pris en charge et liste du résultat dans laquelle ils sont rangés
+ENTITY_COLLECTIONS = {
+    'POLYLINE': 'polylines',
+    'LWPOLYLINE': 'polylines',
+    'LINE': 'lines',
+    'CIRCLE': 'circles',
+    'ARC': 'arcs',
+    'TEXT': 'texts',
+}
+
+# Profils de filtres prédéfinis ; "surface" ne garde que ce qu'utilise le calcul des surfaces (CalculTA)
+EXTRACTION_PROFILES = {
+    'full': {'entity_types': None, 'layers': None, 'closed_only': False},
+    'surface': {'entity_types': ('LWPOLYLINE', 'POLYLINE'), 'layers': ('GEX_EDS_*',), 'closed_only': True},
+}
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    items = [str(v).strip() for v in value if str(v).strip()]
+    return items or None
+
+
+def parse_extraction_filters(params):
+    """Lit les filtres d'extraction d'une requête (JSON, formulaire ou query string).
+
+    Paramètres acceptés : profile ("full" ou "surface"), entityTypes, layers (motifs glob,
+    un préfixe nu est complété par "*") et closedOnly. Lève ValueError si une valeur est invalide.
+    """
+    params = params or {}
+    profile = params.get('profile') or 'full'
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f"Profil d'extraction inconnu : {profile}")
+    filters = dict(EXTRACTION_PROFILES[profile])
+
+    entity_types = _as_list(params.get('entityTypes'))
+    if entity_types is not None:
+        entity_types = tuple(t.upper() for t in entity_types)
+        unknown = [t for t in entity_types if t not in ENTITY_COLLECTIONS]
+        if unknown:
+            raise ValueError(f"Types d'entités non pris en charge : {', '.join(unknown)}")
+        filters['entity_types'] = entity_types
+
+    layers = _as_list(params.get('layers'))
+    if layers is not None:
+        filters['layers'] = tuple(layers)
+
+    closed_only = params.get('closedOnly')
+    if closed_only is not None:
+        filters['closed_only'] = str(closed_only).lower() in ('1', 'true', 'yes', 'on')
+    return filters
+
+
+def build_entity_query(entity_types=None, layers=None):
+    """Construit la requête ezdxf correspondant aux filtres, évaluée avant toute conversion en dict.
+
+    Exemple : build_entity_query(['LWPOLYLINE'], ['GEX_EDS_*']) -> 'LWPOLYLINE[layer ? "(?:(?s:GEX_EDS_.*)\\Z)"]i'
+    """
+    types = ' '.join(entity_types) if entity_types else ' '.join(sorted(set(ENTITY_COLLECTIONS)))
+    if not layers:
+        return types
+    patterns = []
+    for layer in layers:
+        if not any(c in layer for c in '*?['):
+            layer = layer + '*'
+        # Les guillemets délimitent la valeur dans la requête ezdxf : on les remplace par un joker
+        patterns.append(fnmatch.translate(layer).replace('"', '.'))
+    # Les noms de calques DXF ne sont pas sensibles à la casse
+    return f'{types}[layer ? "(?:{"|".join(patterns)})"]i'
+
+
+def _is_closed(entity, dxftype):
+    """Contour fermé : LWPOLYLINE (closed) ou POLYLINE (is_closed) ; les autres entités ne le sont jamais."""
+    if dxftype == 'LWPOLYLINE':
+        return entity.closed
+    if dxftype == 'POLYLINE':
+        return entity.is_closed
+    return False
+
+
+def _entity_to_dict(entity, dxftype):
+    if dxftype == 'POLYLINE':
+        return {
+            'type': dxftype,
+            'layer': entity.dxf.layer,
+            'vertices': [vertex_dict(v.dxf.location[0], v.dxf.location[1], v.dxf.bulge) for v in entity.vertices],
+            'closed': _is_closed(entity, dxftype),
+            'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+            'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+        }
+    if dxftype == 'LWPOLYLINE':
+        return {
+            'type': dxftype,
+            'layer': entity.dxf.layer,
+            'vertices': [vertex_dict(x, y, bulge) for x, y, bulge in entity.get_points('xyb')],
+            'closed': _is_closed(entity, dxftype),
+            'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+            'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+        }
+    if dxftype == 'LINE':
+        return {
+            'type': dxftype,
+            'layer': entity.dxf.layer,
+            'start': {'x': entity.dxf.start[0], 'y': entity.dxf.start[1]},  # Use dict for consistency
+            'end': {'x': entity.dxf.end[0], 'y': entity.dxf.end[1]},
+            'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+            'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+        }
+    if dxftype == 'CIRCLE':
+        return {
+            'type': dxftype,
+            'layer': entity.dxf.layer,
+            'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},  # Use dict for consistency
+            'radius': entity.dxf.radius,
+            'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+            'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+        }
+    if dxftype == 'ARC':
+        return {
+            'type': dxftype,
+            'layer': entity.dxf.layer,
+            'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},  # Use dict for consistency
+            'radius': entity.dxf.radius,
+            'start_angle': entity.dxf.start_angle,
+            'end_angle': entity.dxf.end_angle,
+            'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+            'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+        }
+    return {
+        'type': dxftype,
+        'layer': entity.dxf.layer,
+        'text': entity.dxf.text,
+        'position': {'x': entity.dxf.insert[0], 'y': entity.dxf.insert[1]},  # Use dict for consistency
+        'height': entity.dxf.height,
+        'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
+        'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
+    }
+
+
+def _read_document(file_path):
+    logger.debug(f"Lecture du fichier DXF : {file_path}")
+    with span('parse'):
+        return ezdxf.readfile(file_path)
+
+
+def _layers_table(doc):
+    return [
+        {
+            "name": layer.dxf.name,
+            "color": layer.dxf.color if layer.dxf.color != 0 else 'N/A',  # Align with user_folder_controller.py
+            "lineweight": layer.dxf.lineweight if hasattr(layer.dxf, 'lineweight') else None
+        }
+        for layer in doc.layers
+        if not layer.dxf.name.startswith('*')  # Exclure les calques système
+    ]
+
+
+def _extract_document(doc, entity_types=None, layers=None, closed_only=False):
+    """Extraction des calques et entités d'un document ezdxf déjà chargé."""
+    # Extraire les calques (layers)
+    layers_table = _layers_table(doc)
+
+    # Extraire les entités (polylignes, lignes, cercles, arcs, texte, etc.)
+    modelspace = doc.modelspace()
+    collections = {name: [] for name in set(ENTITY_COLLECTIONS.values())}
+
+    # Le filtrage par type et par calque est fait par la requête ezdxf, avant toute conversion
+    query = build_entity_query(entity_types, layers)
+    logger.debug(f"Requête d'extraction : {query} (fermées uniquement : {closed_only})")
+    with span('entities'):
+        for entity in modelspace.query(query):
+            dxftype = entity.dxftype()
+            if closed_only and not _is_closed(entity, dxftype):
+                continue
+            collections[ENTITY_COLLECTIONS[dxftype]].append(_entity_to_dict(entity, dxftype))
+
+    # Statistiques globales
+    total_entities = len(modelspace)  # Align with user_folder_controller.py
+    statistics = {
+        "layer_count": len(layers_table),
+        "polyline_count": len(collections['polylines']),
+        "line_count": len(collections['lines']),
+        "circle_count": len(collections['circles']),
+        "arc_count": len(collections['arcs']),
+        "text_count": len(collections['texts']),
+        "total_entities": total_entities
+    }
+
+    return {
+        "layers": layers_table,
+        "polylines": collections['polylines'],
+        "lines": collections['lines'],
+        "circles": collections['circles'],
+        "arcs": collections['arcs'],
+        "texts": collections['texts'],
+        "statistics": statistics
+    }
+
+
+def extract_dxf_data(file_path, entity_types=None, layers=None, closed_only=False):
+    """Extrait les calques et entités d'un fichier DXF sur disque.
+
+    entity_types, layers et closed_only limitent les entités converties (voir parse_extraction_filters) ;
+    sans filtre, toutes les entités prises en charge sont extraites.
+    """
+    try:
+        doc = _read_document(file_path)
+        result = _extract_document(doc, entity_types, layers, closed_only)
+        logger.debug("Données extraites avec succès")
+        return result
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction des données : {str(e)}", exc_info=True)
+        return {"error": f"Erreur lors de l'extraction des données : {str(e)}"}
+
+
+def _geometry_document(doc, entity_types=None, layers=None, closed_only=False):
+    """Géométries d'un document ezdxf déjà chargé, encodées au format binaire GEXG (voir geometry_format)."""
+    modelspace = doc.modelspace()
+    entities = modelspace.query(build_entity_query(entity_types, layers))
+    if closed_only:
+        entities = [entity for entity in entities if _is_closed(entity, entity.dxftype())]
+    with span('geometry_encode'):
+        return encode_entities(_layers_table(doc), entities, len(modelspace))
+
+
+def _polygon_area(points, bulges=None):
+    """Aire exacte d'un contour fermé donné par ses points (x, y) : formule de Shoelace plus les segments circulaires des arcs."""
+    xy = np.asarray(points, dtype=np.float64)[:, :2]
+    following = np.roll(xy, -1, axis=0)
+    area = (np.dot(xy[:, 0], following[:, 1]) - np.dot(xy[:, 1], following[:, 0])) / 2.0
+    if bulges is not None and np.any(bulges):
+        area += bulge_segment_areas(xy, following, bulges).sum()
+    return abs(float(area))
+
+
+# Erreurs d'une entité mal formée (coordonnées absentes ou invalides) : l'entité est exclue de l'emprise
+EXTENT_ERRORS = (ezdxf.DXFError, ValueError, TypeError, IndexError)
+
+
+def _entity_extent(entity, dxftype):
+    """Emprise (min_x, min_y, max_x, max_y) et aire si contour fermé, sans construire de liste de sommets.
+
+    Les LWPOLYLINE sont lues directement dans leur tableau numpy de sommets.
+    """
+    if dxftype == 'LWPOLYLINE':
+        values = entity.lwpoints.values if len(entity.lwpoints) else None
+        if values is None:
+            return None, None
+        xy = values[:, :2]
+        low, high = xy.min(axis=0), xy.max(axis=0)
+        # Colonnes des sommets LWPOLYLINE : x, y, largeur de début, largeur de fin, bulge
+        area = _polygon_area(xy, values[:, 4]) if _is_closed(entity, dxftype) and len(xy) >= 3 else None
+        return (float(low[0]), float(low[1]), float(high[0]), float(high[1])), area
+    if dxftype == 'POLYLINE':
+        points = [(v.dxf.location[0], v.dxf.location[1]) for v in entity.vertices]
+        if not points:
+            return None, None
+        bulges = [v.dxf.bulge for v in entity.vertices]
+        area = _polygon_area(points, bulges) if _is_closed(entity, dxftype) and len(points) >= 3 else None
+    elif dxftype == 'LINE':
+        points = [entity.dxf.start, entity.dxf.end]
+        area = None
+    elif dxftype in ('CIRCLE', 'ARC'):
+        cx, cy, r = entity.dxf.center[0], entity.dxf.center[1], entity.dxf.radius
+        return (cx - r, cy - r, cx + r, cy + r), None
+    else:
+        location = entity.dxf.get('insert') or entity.dxf.get('location')
+        if location is None:
+            return None, None
+        return (location[0], location[1], location[0], location[1]), None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys)), area
+
+
+def _summarize_document(doc):
+    """Résumé d'un document ezdxf déjà chargé (voir summarize_dxf)."""
+    layers_table = _layers_table(doc)
+
+    modelspace = doc.modelspace()
+    per_layer = {}
+    type_counts = {}
+    closed_count = 0
+    total_area = 0.0
+
+    with span('summary'):
+        for entity in modelspace:
+            dxftype = entity.dxftype()
+            layer_name = entity.dxf.layer
+            stats = per_layer.get(layer_name)
+            if stats is None:
+                stats = per_layer[layer_name] = {"counts": {}, "bbox": None, "closed_polyline_count": 0,
+                                                 "closed_polyline_area": 0.0}
+            stats["counts"][dxftype] = stats["counts"].get(dxftype, 0) + 1
+            type_counts[dxftype] = type_counts.get(dxftype, 0) + 1
+
+            try:
+                extent, area = _entity_extent(entity, dxftype)
+            except EXTENT_ERRORS as e:
+                logger.warning(f"Emprise de l'entité {dxftype} ({entity.dxf.handle}) ignorée : {str(e)}")
+                extent, area = None, None
+            if extent is not None:
+                bbox = stats["bbox"]
+                if bbox is None:
+                    stats["bbox"] = list(extent)
+                else:
+                    bbox[0], bbox[1] = min(bbox[0], extent[0]), min(bbox[1], extent[1])
+                    bbox[2], bbox[3] = max(bbox[2], extent[2]), max(bbox[3], extent[3])
+
+            if area is not None:
+                stats["closed_polyline_count"] += 1
+                stats["closed_polyline_area"] += area
+                closed_count += 1
+                total_area += area
+
+    boxes = [s["bbox"] for s in per_layer.values() if s["bbox"] is not None]
+    extents = [min(b[0] for b in boxes), min(b[1] for b in boxes),
+               max(b[2] for b in boxes), max(b[3] for b in boxes)] if boxes else None
+
+    statistics = {
+        "layer_count": len(layers_table),
+        "polyline_count": type_counts.get('POLYLINE', 0) + type_counts.get('LWPOLYLINE', 0),
+        "line_count": type_counts.get('LINE', 0),
+        "circle_count": type_counts.get('CIRCLE', 0),
+        "arc_count": type_counts.get('ARC', 0),
+        "text_count": type_counts.get('TEXT', 0),
+        "total_entities": len(modelspace),
+        "closed_polyline_count": closed_count,
+        "closed_polyline_area": total_area,
+    }
+    return {
+        "layers": layers_table,
+        "statistics": statistics,
+        "type_counts": type_counts,
+        "layer_statistics": per_layer,
+        "bbox": extents,
+    }
+
+
+def summarize_dxf(file_path):
+    """Résumé d'un fichier DXF : calques, comptes par type et par calque, emprises et aire des polylignes fermées.
+
+    Parcourt les entités une seule fois sans construire de listes de sommets pour le résultat ;
+    beaucoup plus léger que extract_dxf_data quand seules les statistiques sont affichées.
+    """
+    try:
+        return _summarize_document(_read_document(file_path))
+
+    except Exception as e:
+        logger.error(f"Erreur lors du résumé du fichier : {str(e)}", exc_info=True)
+        return {"error": f"Erreur lors du résumé du fichier : {str(e)}"}
+
+
+# Artefacts mis en cache par fichier : le résumé, puis une extraction JSON et une géométrie GEXG
+# par profil prédéfini. L'ingestion à l'upload les calcule tous à partir d'une seule lecture du fichier.
+CACHED_ARTIFACTS = {
+    'summary': _summarize_document,
+    **{f'extract_{name}': functools.partial(_extract_document, **filters)
+       for name, filters in EXTRACTION_PROFILES.items()},
+    **{f'geometry_{name}': functools.partial(_geometry_document, **filters)
+       for name, filters in EXTRACTION_PROFILES.items()},
+}
+
+
+def get_file_summary(file_path):
+    """Résumé d'un fichier DXF, mis en cache à côté du fichier (voir extraction_cache)."""
+    return extraction_cache.get_or_compute(file_path, 'summary', summarize_dxf)
+
+
+def _profile_for(filters):
+    filters = {**EXTRACTION_PROFILES['full'], **filters}
+    profile = next((name for name, profile_filters in EXTRACTION_PROFILES.items() if profile_filters == filters), None)
+    return profile, filters
+
+
+def get_file_data(file_path, **filters):
+    """extract_dxf_data avec cache : les filtres correspondant à un profil prédéfini sont servis depuis le cache."""
+    profile, filters = _profile_for(filters)
+    if profile is None:
+        return extract_dxf_data(file_path, **filters)
+    return extraction_cache.get_or_compute(file_path, f'extract_{profile}',
+                                           lambda path: extract_dxf_data(path, **filters))
+
+
+def get_file_geometry(file_path, **filters):
+    """Géométries d'un fichier DXF au format binaire GEXG.
+
+    Pour un profil prédéfini, retourne le chemin du fichier GEXG en cache (calculé si besoin) ;
+    pour d'autres filtres, ou si le cache est inaccessible, retourne directement les octets encodés.
+    """
+    profile, filters = _profile_for(filters)
+    if profile is None:
+        return _geometry_document(_read_document(file_path), **filters)
+
+    artifact = f'geometry_{profile}'
+    path = extraction_cache.get_cached_path(file_path, artifact)
+    if path is None and extraction_cache.wait_inflight(file_path):
+        path = extraction_cache.get_cached_path(file_path, artifact)
+    if path is not None:
+        return path
+
+    signature = extraction_cache.file_signature(file_path)
+    data = _geometry_document(_read_document(file_path), **filters)
+    try:
+        extraction_cache.store(file_path, artifact, data, signature)
+    except OSError as e:
+        logger.warning(f"Impossible d'écrire le cache {artifact} pour {file_path}: {str(e)}")
+    return extraction_cache.get_cached_path(file_path, artifact) or data
+
+
+def geometry_response(file_path, **filters):
+    """Réponse des endpoints d'extraction pour format="binary" : le fichier GEXG, servi sans conversion."""
+    geometry = get_file_geometry(file_path, **filters)
+    with span('send_file'):
+        if isinstance(geometry, str):
+            return send_file(geometry, mimetype=GEOMETRY_MIME_TYPE, conditional=True)
+        return send_file(io.BytesIO(geometry), mimetype=GEOMETRY_MIME_TYPE)
+
+
+def precompute_artifacts(file_path, artifacts=None):
+    """Calcule et met en cache les artefacts manquants d'un fichier en une seule lecture du DXF.
+
+    Retourne la liste des artefacts calculés (vide si tout était déjà en cache).
+    """
+    artifacts = [a for a in (artifacts or CACHED_ARTIFACTS) if extraction_cache.get_cached_path(file_path, a) is None]
+    if not artifacts:
+        return []
+    with extraction_cache.computing(file_path):
+        signature = extraction_cache.file_signature(file_path)
+        doc = _read_document(file_path)
+        for artifact in artifacts:
+            extraction_cache.store(file_path, artifact, CACHED_ARTIFACTS[artifact](doc), signature)
+    return artifacts
+
+
+def get_cached_summary_statistics(file_path):
+    """Statistiques du résumé si elles sont déjà en cache, sans jamais analyser le fichier (listings)."""
+    summary = extraction_cache.get_cached(file_path, 'summary')
+    return summary.get('statistics') if summary else None
+
+
+def extract_file_data(file, **filters):
+    """Extrait les données d'un fichier DXF uploadé (FileStorage) via un fichier temporaire."""
     temp_file_path = None
     try:
         logger.debug(f"Début de l'extraction pour le fichier : {file.filename}")
-        
+
+        # Upload reçu en streaming : le fichier de transit est lu directement, sans recopie
+        staged = staged_path(file)
+        if staged:
+            return extract_dxf_data(staged, **filters)
+
         # Créer un fichier temporaire avec un chemin explicite et mode binaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dxf', mode='wb') as temp_file:
+        with span('disk_write'), tempfile.NamedTemporaryFile(delete=False, suffix='.dxf', mode='wb') as temp_file:
             # Sauvegarder directement le contenu du fichier uploadé dans le fichier temporaire
             file.save(temp_file)
             temp_file_path = temp_file.name
             logger.debug(f"Fichier temporaire sauvegardé : {temp_file_path}")
-        
-        # Charger le fichier DXF à partir du chemin temporaire
-        logger.debug(f"Lecture du fichier DXF : {temp_file_path}")
-        doc = ezdxf.readfile(temp_file_path)
-        
-        # Extraire les calques (layers)
-        layers = [
-            {
-                "name": layer.dxf.name,
-                "color": layer.dxf.color if layer.dxf.color != 0 else 'N/A',  # Align with user_folder_controller.py
-                "lineweight": layer.dxf.lineweight if hasattr(layer.dxf, 'lineweight') else None
-            }
-            for layer in doc.layers 
-            if not layer.dxf.name.startswith('*')  # Exclure les calques système
-        ]
-        
-        # Extraire les entités (polylignes, lignes, cercles, arcs, texte, etc.)
-        modelspace = doc.modelspace()
-        
-        polylines = []
-        lines = []
-        circles = []
-        arcs = []
-        texts = []
-        
-        # Utiliser modelspace.query('*') pour itérer sur toutes les entités
-        for entity in modelspace.query('*'):
-            dxftype = entity.dxftype()
-            if dxftype == 'POLYLINE':
-                polylines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'vertices': [{'x': v[0], 'y': v[1]} for v in entity.points()],  # Already matches frontend expectation
-                    'closed': entity.closed,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'LWPOLYLINE':
-                polylines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'vertices': [{'x': v[0], 'y': v[1]} for v in entity.get_points()],  # Already matches frontend expectation
-                    'closed': entity.closed,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'LINE':
-                lines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'start': {'x': entity.dxf.start[0], 'y': entity.dxf.start[1]},  # Use dict for consistency
-                    'end': {'x': entity.dxf.end[0], 'y': entity.dxf.end[1]},
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'CIRCLE':
-                circles.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},  # Use dict for consistency
-                    'radius': entity.dxf.radius,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'ARC':
-                arcs.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},  # Use dict for consistency
-                    'radius': entity.dxf.radius,
-                    'start_angle': entity.dxf.start_angle,
-                    'end_angle': entity.dxf.end_angle,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'TEXT':
-                texts.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'text': entity.dxf.text,
-                    'position': {'x': entity.dxf.insert[0], 'y': entity.dxf.insert[1]},  # Use dict for consistency
-                    'height': entity.dxf.height,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-        
-        # Statistiques globales
-        total_entities = len(modelspace)  # Align with user_folder_controller.py
-        statistics = {
-            "layer_count": len(layers),
-            "polyline_count": len(polylines),
-            "line_count": len(lines),
-            "circle_count": len(circles),
-            "arc_count": len(arcs),
-            "text_count": len(texts),
-            "total_entities": total_entities
-        }
-        
-        logger.debug("Données extraites avec succès")
-        return {
-            "layers": layers,
-            "polylines": polylines,
-            "lines": lines,
-            "circles": circles,
-            "arcs": arcs,
-            "texts": texts,
-            "statistics": statistics
-        }
-    
+
+        return extract_dxf_data(temp_file_path, **filters)
+
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction des données : {str(e)}", exc_info=True)
         return {"error": f"Erreur lors de l'extraction des données : {str(e)}"}
-    
+
     finally:
         # Nettoyer le fichier temporaire même en cas d'erreur
         if temp_file_path and os.path.exists(temp_file_path):
@@ -138,4 +493,4 @@ def extract_file_data(file):
                 os.unlink(temp_file_path)
                 logger.debug(f"Fichier temporaire supprimé : {temp_file_path}")
             except Exception as e:
-                logger.error(f"Erreur lors de la suppression du fichier temporaire : {str(e)}")
\ No newline at end of file
+                logger.error(f"Erreur lors de la suppression du fichier temporaire : {str(e)}")
@@ -0,0 +1,271 @@
+from app import db
+from app.models.folder import Folder
+from collections import defaultdict
+from datetime import datetime
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constantes inotify (voir <sys/inotify.h>)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def folder_names_for_email(email):
+    """Retourne les noms de dossier possibles pour un email (avec point et avec underscore)."""
+    if not email:
+        return set()
+    base_name = email.split('@')[0]
+    return {base_name, base_name.replace('.', '_')}
+
+
+class FolderSynchronizer:
+    """Synchronise la table folder avec le dossier Ressources de manière incrémentale.
+
+    Les noms de dossiers modifiés sont accumulés dans un ensemble "dirty", alimenté
+    par un watcher du système de fichiers (inotify sous Linux, scrutation sinon) et
+    par les hooks d'écriture des services. Un thread de fond ne réconcilie que ces
+    entrées, les lectures (listing admin) n'ont donc plus besoin de synchroniser.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.base_resource_path = None
+        self._dirty = set()
+        self._full_scan = False
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def init_app(self, app):
+        """Initialise le synchroniseur et démarre les threads de fond si activé."""
+        self.app = app
+        self.base_resource_path = os.path.abspath(app.config['RESSOURCES_FOLDER'])
+        os.makedirs(self.base_resource_path, exist_ok=True)
+        app.extensions['folder_sync'] = self
+
+        if not app.config.get('FOLDER_SYNC_ENABLED', True):
+            logger.info("Synchronisation incrémentale des dossiers désactivée")
+            return
+
+        # Une passe complète au démarrage, ensuite uniquement les entrées modifiées
+        self.mark_all_dirty()
+        self.start()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for target, name in ((self._worker_loop, 'folder-sync-worker'),
+                             (self._watch_loop, 'folder-sync-watcher')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Synchronisation incrémentale démarrée sur {self.base_resource_path}")
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Alimentation de l'ensemble dirty
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, *folder_names):
+        """Signale que les dossiers donnés doivent être réconciliés."""
+        names = {name for name in folder_names if name and not name.startswith('.')}
+        if not names:
+            return
+        with self._lock:
+            self._dirty.update(names)
+        self._wakeup.set()
+
+    def mark_user_dirty(self, email):
+        """Signale les dossiers potentiellement associés à un utilisateur (création, changement d'email)."""
+        self.mark_dirty(*folder_names_for_email(email))
+
+    def mark_all_dirty(self):
+        """Demande une réconciliation complète (démarrage, débordement de la file inotify)."""
+        with self._lock:
+            self._full_scan = True
+        self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Réconciliation
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Réconcilie immédiatement les entrées en attente dans le thread appelant."""
+        with self._lock:
+            names = self._dirty
+            full_scan = self._full_scan
+            self._dirty = set()
+            self._full_scan = False
+
+        if not names and not full_scan:
+            return 0, 0
+
+        with self._reconcile_lock:
+            if full_scan:
+                names |= self._list_physical_folders()
+                names |= {name for (name,) in db.session.query(Folder.nom_dossier).all()}
+            return self._reconcile(names)
+
+    def _list_physical_folders(self):
+        if not os.path.isdir(self.base_resource_path):
+            return set()
+        with os.scandir(self.base_resource_path) as entries:
+            return {e.name for e in entries if e.is_dir() and not e.name.startswith('.')}
+
+    def _find_owners(self, folder_names):
+        """Associe des noms de dossiers aux utilisateurs propriétaires en une requête par lot."""
+        from app.models.user import User
+
+        owners = {}
+        folder_names = list(folder_names)
+        for start in range(0, len(folder_names), 100):
+            chunk = folder_names[start:start + 100]
+            # '_' est un joker LIKE : "raslen_2908@%" couvre aussi "raslen.2908@..."
+            patterns = [User.email.like(f"{name.replace('%', '')}@%") for name in chunk]
+            for user in User.query.filter(db.or_(*patterns)).all():
+                for name in folder_names_for_email(user.email):
+                    if name in chunk:
+                        owners.setdefault(name, user.id)
+        return owners
+
+    def _reconcile(self, folder_names):
+        rows_by_name = defaultdict(list)
+        for folder in Folder.query.filter(Folder.nom_dossier.in_(list(folder_names))).all():
+            rows_by_name[folder.nom_dossier].append(folder)
+
+        existing = {name for name in folder_names
+                    if os.path.isdir(os.path.join(self.base_resource_path, name))}
+        owners = self._find_owners(name for name in existing if not rows_by_name.get(name))
+
+        folders_added = 0
+        folders_removed = 0
+        for name in folder_names:
+            if name not in existing:
+                for folder in rows_by_name.get(name, []):
+                    logger.info(f"Suppression du dossier {name} de la base de données car il n'existe plus physiquement")
+                    db.session.delete(folder)
+                    folders_removed += 1
+            elif not rows_by_name.get(name) and name in owners:
+                folder_path = os.path.join(self.base_resource_path, name)
+                creation_time = datetime.fromtimestamp(os.path.getctime(folder_path))
+                db.session.add(Folder(id_user=owners[name], nom_dossier=name, date_creation=creation_time))
+                folders_added += 1
+                logger.info(f"Dossier {name} ajouté à la base de données pour l'utilisateur ID {owners[name]}")
+
+        if folders_added or folders_removed:
+            db.session.commit()
+            logger.info(f"Synchronisation incrémentale : {folders_added} dossier(s) ajouté(s), {folders_removed} dossier(s) supprimé(s)")
+        return folders_added, folders_removed
+
+    def _worker_loop(self):
+        debounce = self.app.config.get('FOLDER_SYNC_DEBOUNCE', 0.2)
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            if self._stop.is_set():
+                break
+            # Regrouper les rafales d'événements (copie de plusieurs fichiers, renommages...)
+            time.sleep(debounce)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Erreur lors de la synchronisation incrémentale des dossiers: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    # ------------------------------------------------------------------
+    # Surveillance du système de fichiers
+    # ------------------------------------------------------------------
+
+    def _watch_loop(self):
+        if sys.platform.startswith('linux'):
+            try:
+                self._watch_inotify()
+                return
+            except OSError as e:
+                logger.warning(f"inotify indisponible ({str(e)}), bascule sur la scrutation périodique")
+        self._watch_polling()
+
+    def _watch_inotify(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        try:
+            mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+            wd = libc.inotify_add_watch(fd, self.base_resource_path.encode(), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_add_watch")
+            logger.info(f"Surveillance inotify active sur {self.base_resource_path}")
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 1.0)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+
+                offset = 0
+                while offset + _EVENT_HEADER.size <= len(data):
+                    _, event_mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+                    offset += name_len
+
+                    if event_mask & IN_Q_OVERFLOW:
+                        self.mark_all_dirty()
+                    elif event_mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        # Le dossier Ressources lui-même a disparu : repli sur la scrutation
+                        self.mark_all_dirty()
+                        raise OSError("Dossier Ressources supprimé ou déplacé")
+                    elif event_mask & IN_ISDIR:
+                        self.mark_dirty(name)
+        finally:
+            os.close(fd)
+
+    def _watch_polling(self):
+        interval = self.app.config.get('FOLDER_SYNC_POLL_INTERVAL', 2.0)
+        snapshot = self._list_physical_folders()
+        while not self._stop.wait(interval):
+            current = self._list_physical_folders()
+            changed = current ^ snapshot
+            if changed:
+                self.mark_dirty(*changed)
+            snapshot = current
+
+
+folder_sync = FolderSynchronizer()
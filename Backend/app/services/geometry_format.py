@@ -0,0 +1,408 @@
+"""Format binaire GEXG des géométries extraites d'un plan DXF.
+
+Alternative compacte au JSON d'extraction, lisible sans désérialisation : chaque section est un
+tableau typé little-endian aligné sur 8 octets, directement exploitable par numpy.frombuffer
+sur un fichier mmappé. C'est le format serveur de l'index spatial, des tuiles et des requêtes
+d'entités, et la réponse des endpoints d'extraction pour format="binary" ; les calculs de
+surfaces reçoivent toujours les polylignes JSON envoyées par le frontend.
+
+Disposition (version 2), dans l'ordre :
+  en-tête (64 octets)   magic "GEXG", version u16, taille d'en-tête u16, nombre d'entités u32,
+                        nombre de sommets u32, nombre de calques u32, nombre de textes u32,
+                        nombre total d'entités du modelspace u32, nombre de calques de la
+                        table du document u32 (les suivants ne sont référencés que par des
+                        entités), puis réservé
+  calques               offsets u32[L+1] + noms UTF-8, couleurs i16[L], épaisseurs i16[L]
+  textes                offsets u32[T+1] + contenus UTF-8
+  entités               type u8[N], drapeaux u8[N] (bit 0 : fermée), calque u32[N],
+                        couleur i16[N], épaisseur i16[N], début des sommets u32[N+1],
+                        paramètres f64[N*3], auxiliaire u32[N]
+  sommets               f64[V*2] (x, y entrelacés)
+  bulges                f64[V] (arc vers le sommet suivant, 0 pour un segment droit ; absent en version 1)
+
+Types : 1 LWPOLYLINE, 2 POLYLINE, 3 LINE, 4 CIRCLE, 5 ARC, 6 TEXT. Les paramètres portent
+rayon / angle de début / angle de fin (cercles, arcs) ou la hauteur (textes) ; l'auxiliaire
+est l'indice du texte dans la table des textes. Une couleur 0 correspond à "N/A" et une
+épaisseur -32768 à une épaisseur absente.
+"""
+import mmap
+import struct
+
+import numpy as np
+
+from app.services.arc_geometry import bulge_segment_areas, following_vertices, vertex_dict
+
+MAGIC = b"GEXG"
+VERSION = 2
+# Versions lisibles : un fichier de version 1 (cache antérieur) n'a pas de section bulges
+SUPPORTED_VERSIONS = (1, 2)
+HEADER = struct.Struct("<4sHHIIIIII32x")
+MIME_TYPE = "application/vnd.gex.geometry"
+
+TYPE_CODES = {'LWPOLYLINE': 1, 'POLYLINE': 2, 'LINE': 3, 'CIRCLE': 4, 'ARC': 5, 'TEXT': 6}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+# Liste du résultat JSON d'extraction dans laquelle chaque type est rangé
+COLLECTIONS = {'LWPOLYLINE': 'polylines', 'POLYLINE': 'polylines', 'LINE': 'lines', 'CIRCLE': 'circles',
+               'ARC': 'arcs', 'TEXT': 'texts'}
+FLAG_CLOSED = 1
+PARAMS_PER_ENTITY = 3
+NO_LINEWEIGHT = -32768
+
+# Sections dans l'ordre du fichier : (nom, type numpy, longueur en fonction des comptes)
+_SECTIONS = (
+    ("layer_offsets", "<u4", lambda c: c["layers"] + 1),
+    ("layer_names", "u1", lambda c: c["layer_bytes"]),
+    ("layer_colors", "<i2", lambda c: c["layers"]),
+    ("layer_lineweights", "<i2", lambda c: c["layers"]),
+    ("text_offsets", "<u4", lambda c: c["texts"] + 1),
+    ("text_values", "u1", lambda c: c["text_bytes"]),
+    ("types", "u1", lambda c: c["entities"]),
+    ("flags", "u1", lambda c: c["entities"]),
+    ("layer_index", "<u4", lambda c: c["entities"]),
+    ("colors", "<i2", lambda c: c["entities"]),
+    ("lineweights", "<i2", lambda c: c["entities"]),
+    ("vertex_start", "<u4", lambda c: c["entities"] + 1),
+    ("params", "<f8", lambda c: c["entities"] * PARAMS_PER_ENTITY),
+    ("aux", "<u4", lambda c: c["entities"]),
+    ("vertices", "<f8", lambda c: c["vertices"] * 2),
+    ("bulges", "<f8", lambda c: c["bulges"]),
+)
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _string_table(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+    return offsets, np.frombuffer(b"".join(encoded), dtype="u1")
+
+
+def _layout(counts):
+    """Offsets de chaque section, identiques pour l'encodeur et les décodeurs."""
+    offset = HEADER.size
+    layout = {}
+    for name, dtype, length in _SECTIONS:
+        offset = _align(offset)
+        size = length(counts) * np.dtype(dtype).itemsize
+        layout[name] = (offset, dtype, length(counts))
+        offset += size
+    return layout, offset
+
+
+def _lineweight(value):
+    return NO_LINEWEIGHT if value is None else value
+
+
+def encode_entities(layers_table, entities, total_entities):
+    """Encode des entités ezdxf déjà filtrées au format GEXG, sans passer par des dict Python.
+
+    `layers_table` est la table des calques du document ({"name", "color", "lineweight"}) ;
+    les calques d'entités absents de la table y sont ajoutés. Les noms sont comparés à la casse près :
+    chaque entité garde le nom de calque qu'elle porte, comme dans le JSON d'extraction.
+    """
+    layer_names = [layer["name"] for layer in layers_table]
+    layer_colors = [layer["color"] if layer["color"] != 'N/A' else 0 for layer in layers_table]
+    layer_lineweights = [_lineweight(layer["lineweight"]) for layer in layers_table]
+    table_layers = len(layer_names)
+    layer_lookup = {name: i for i, name in enumerate(layer_names)}
+
+    types, flags, layer_index, colors, lineweights, params, aux = [], [], [], [], [], [], []
+    vertex_blocks, bulge_blocks, vertex_counts, texts = [], [], [], []
+    for entity in entities:
+        dxftype = entity.dxftype()
+        layer = entity.dxf.layer
+        index = layer_lookup.get(layer)
+        if index is None:
+            index = layer_lookup[layer] = len(layer_names)
+            layer_names.append(layer)
+            layer_colors.append(0)
+            layer_lineweights.append(NO_LINEWEIGHT)
+
+        entity_params = (0.0, 0.0, 0.0)
+        entity_aux = 0
+        closed = False
+        bulges = None
+        if dxftype == 'LWPOLYLINE':
+            values = entity.lwpoints.values if len(entity.lwpoints) else np.empty((0, 5))
+            block, bulges = values[:, :2], values[:, 4]
+            closed = entity.closed
+        elif dxftype == 'POLYLINE':
+            block = np.array([(v.dxf.location[0], v.dxf.location[1]) for v in entity.vertices],
+                             dtype=np.float64).reshape(-1, 2)
+            bulges = np.array([v.dxf.bulge for v in entity.vertices], dtype=np.float64)
+            closed = entity.is_closed
+        elif dxftype == 'LINE':
+            block = np.array([(entity.dxf.start[0], entity.dxf.start[1]), (entity.dxf.end[0], entity.dxf.end[1])])
+        elif dxftype in ('CIRCLE', 'ARC'):
+            block = np.array([(entity.dxf.center[0], entity.dxf.center[1])])
+            if dxftype == 'ARC':
+                entity_params = (entity.dxf.radius, entity.dxf.start_angle, entity.dxf.end_angle)
+            else:
+                entity_params = (entity.dxf.radius, 0.0, 0.0)
+        else:
+            block = np.array([(entity.dxf.insert[0], entity.dxf.insert[1])])
+            entity_params = (entity.dxf.height, 0.0, 0.0)
+            entity_aux = len(texts)
+            texts.append(entity.dxf.text)
+
+        types.append(TYPE_CODES[dxftype])
+        flags.append(FLAG_CLOSED if closed else 0)
+        layer_index.append(index)
+        colors.append(entity.dxf.color)
+        lineweights.append(_lineweight(entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None))
+        params.append(entity_params)
+        aux.append(entity_aux)
+        vertex_blocks.append(block)
+        bulge_blocks.append(bulges if bulges is not None else np.zeros(len(block)))
+        vertex_counts.append(len(block))
+
+    vertex_start = np.zeros(len(types) + 1, dtype="<u4")
+    vertex_start[1:] = np.cumsum(vertex_counts, dtype=np.int64)
+    vertices = np.concatenate(vertex_blocks).astype("<f8") if vertex_blocks else np.empty((0, 2), dtype="<f8")
+    bulges = np.concatenate(bulge_blocks).astype("<f8") if bulge_blocks else np.empty(0, dtype="<f8")
+    layer_offsets, layer_bytes = _string_table(layer_names)
+    text_offsets, text_bytes = _string_table(texts)
+
+    arrays = {
+        "layer_offsets": layer_offsets,
+        "layer_names": layer_bytes,
+        "layer_colors": np.asarray(layer_colors, dtype="<i2"),
+        "layer_lineweights": np.asarray(layer_lineweights, dtype="<i2"),
+        "text_offsets": text_offsets,
+        "text_values": text_bytes,
+        "types": np.asarray(types, dtype="u1"),
+        "flags": np.asarray(flags, dtype="u1"),
+        "layer_index": np.asarray(layer_index, dtype="<u4"),
+        "colors": np.asarray(colors, dtype="<i2"),
+        "lineweights": np.asarray(lineweights, dtype="<i2"),
+        "vertex_start": vertex_start,
+        "params": np.asarray(params, dtype="<f8").reshape(-1),
+        "aux": np.asarray(aux, dtype="<u4"),
+        "vertices": vertices.reshape(-1),
+        "bulges": bulges,
+    }
+    counts = {"entities": len(types), "vertices": len(vertices), "layers": len(layer_names), "texts": len(texts),
+              "layer_bytes": len(layer_bytes), "text_bytes": len(text_bytes), "bulges": len(vertices)}
+    layout, size = _layout(counts)
+
+    buffer = bytearray(size)
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, HEADER.size, counts["entities"], counts["vertices"],
+                     counts["layers"], counts["texts"], total_entities, table_layers)
+    for name, (offset, dtype, length) in layout.items():
+        data = arrays[name].astype(dtype, copy=False).tobytes()
+        buffer[offset:offset + len(data)] = data
+    # Les longueurs des tables de chaînes sont déduites de leurs offsets à la lecture
+    return bytes(buffer)
+
+
+class GeometryFile:
+    """Vue en lecture seule d'un fichier GEXG : chaque section est un tableau numpy sans copie."""
+
+    def __init__(self, buffer):
+        magic, version, header_size, entities, vertices, layers, texts, total, table_layers = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Fichier de géométrie invalide (signature GEXG absente)")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Version de géométrie non prise en charge : {version}")
+        self.buffer = buffer
+        self.total_entities = total
+        self.table_layers = table_layers
+        self.entity_count = entities
+        self.vertex_count = vertices
+
+        # Les tailles des tables de chaînes sont lues dans leurs offsets avant de calculer la disposition
+        counts = {"entities": entities, "vertices": vertices, "layers": layers, "texts": texts,
+                  "layer_bytes": 0, "text_bytes": 0, "bulges": vertices if version >= 2 else 0}
+        layout, _ = _layout(counts)
+        offset, dtype, length = layout["layer_offsets"]
+        counts["layer_bytes"] = int(np.frombuffer(buffer, dtype, length, offset)[-1])
+        layout, _ = _layout(counts)
+        offset, dtype, length = layout["text_offsets"]
+        counts["text_bytes"] = int(np.frombuffer(buffer, dtype, length, offset)[-1])
+        layout, _ = _layout(counts)
+
+        for name, (offset, dtype, length) in layout.items():
+            setattr(self, name, np.frombuffer(buffer, dtype, length, offset))
+        self.vertices = self.vertices.reshape(-1, 2)
+        if version < 2:
+            self.bulges = np.zeros(vertices)
+        self.params = self.params.reshape(-1, PARAMS_PER_ENTITY)
+        self.layers = self._strings(self.layer_offsets, self.layer_names)
+        self.texts = self._strings(self.text_offsets, self.text_values)
+
+    @staticmethod
+    def _strings(offsets, blob):
+        data = blob.tobytes()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def entity_vertices(self, index):
+        """Sommets (n, 2) de l'entité `index`, vue sur le tampon de sommets."""
+        return self.vertices[self.vertex_start[index]:self.vertex_start[index + 1]]
+
+    def entity_bulges(self, index):
+        """Bulges (n,) des sommets de l'entité `index`."""
+        return self.bulges[self.vertex_start[index]:self.vertex_start[index + 1]]
+
+    def entity_bounds(self):
+        """Emprises (N, 4) minx, miny, maxx, maxy de toutes les entités, calculées par numpy.
+
+        Cercles et arcs : carré englobant du cercle complet ; entités sans sommet : NaN.
+        """
+        bounds = np.full((self.entity_count, 4), np.nan)
+        counts = np.diff(self.vertex_start)
+        has_vertices = counts > 0
+        if has_vertices.any():
+            starts = self.vertex_start[:-1][has_vertices].astype(np.intp)
+            xs, ys = self.vertices[:, 0], self.vertices[:, 1]
+            # Les entités vides sont exclues : les débuts restent strictement croissants pour reduceat
+            bounds[has_vertices, 0] = np.minimum.reduceat(xs, starts)
+            bounds[has_vertices, 1] = np.minimum.reduceat(ys, starts)
+            bounds[has_vertices, 2] = np.maximum.reduceat(xs, starts)
+            bounds[has_vertices, 3] = np.maximum.reduceat(ys, starts)
+        is_round = (self.types == TYPE_CODES['CIRCLE']) | (self.types == TYPE_CODES['ARC'])
+        radius = self.params[is_round, 0]
+        bounds[is_round] += np.stack([-radius, -radius, radius, radius], axis=1)
+        return bounds
+
+    def entity_areas(self):
+        """Aires exactes (N,) : polylignes fermées (formule de Shoelace vectorisée plus segments circulaires
+        des arcs) et cercles ; 0 pour le reste."""
+        areas = np.zeros(self.entity_count)
+        closed = (((self.types == TYPE_CODES['LWPOLYLINE']) | (self.types == TYPE_CODES['POLYLINE']))
+                  & ((self.flags & FLAG_CLOSED) != 0) & (np.diff(self.vertex_start) >= 3))
+        if closed.any():
+            # Sommet suivant de chaque sommet, en rebouclant sur le premier sommet de son entité
+            starts = self.vertex_start[:-1].astype(np.intp)
+            lengths = np.diff(self.vertex_start).astype(np.intp)
+            following = following_vertices(lengths, starts)
+            nonempty = lengths > 0
+            xs, ys = self.vertices[:, 0], self.vertices[:, 1]
+            cross = (xs * ys[following] - xs[following] * ys) / 2.0
+            if self.bulges.any():
+                cross += bulge_segment_areas(self.vertices, self.vertices[following], self.bulges)
+            # Les entités vides sont exclues : les débuts restent strictement croissants pour reduceat
+            sums = np.zeros(self.entity_count)
+            sums[nonempty] = np.add.reduceat(cross, starts[nonempty])
+            areas[closed] = np.abs(sums[closed])
+        is_circle = self.types == TYPE_CODES['CIRCLE']
+        areas[is_circle] = np.pi * self.params[is_circle, 0] ** 2
+        return areas
+
+    def _style(self, index):
+        color = int(self.colors[index])
+        lineweight = int(self.lineweights[index])
+        return {'color': color if color != 0 else 'N/A', 'lineweight': lineweight if lineweight != NO_LINEWEIGHT else None}
+
+    def entity(self, index):
+        """Entité `index` sous la forme du dict produit par extract_dxf_data."""
+        return _entity_dict(TYPE_NAMES[int(self.types[index])], self.layers[self.layer_index[index]],
+                            self.entity_vertices(index).tolist(), self.entity_bulges(index).tolist(),
+                            self.params[index].tolist(),
+                            self.texts[self.aux[index]] if self.types[index] == TYPE_CODES['TEXT'] else None,
+                            bool(self.flags[index] & FLAG_CLOSED), self._style(index))
+
+    def to_extraction(self):
+        """Reconstruit le résultat JSON de extract_dxf_data (compatibilité avec les clients existants)."""
+        def color(value):
+            return int(value) if value != 0 else 'N/A'
+
+        def lineweight(value):
+            return int(value) if value != NO_LINEWEIGHT else None
+
+        collections = {"polylines": [], "lines": [], "circles": [], "arcs": [], "texts": []}
+        types, layer_index, colors, lineweights = (self.types.tolist(), self.layer_index.tolist(),
+                                                   self.colors.tolist(), self.lineweights.tolist())
+        flags = self.flags.tolist()
+        vertices = self.vertices.tolist()
+        bulges = self.bulges.tolist()
+        starts = self.vertex_start.tolist()
+        params = self.params.tolist()
+        aux = self.aux.tolist()
+        for i, code in enumerate(types):
+            dxftype = TYPE_NAMES[code]
+            text = self.texts[aux[i]] if code == TYPE_CODES['TEXT'] else None
+            style = {'color': color(colors[i]), 'lineweight': lineweight(lineweights[i])}
+            collections[COLLECTIONS[dxftype]].append(
+                _entity_dict(dxftype, self.layers[layer_index[i]], vertices[starts[i]:starts[i + 1]],
+                             bulges[starts[i]:starts[i + 1]], params[i], text, bool(flags[i] & FLAG_CLOSED), style))
+
+        layer_colors, layer_lineweights = self.layer_colors.tolist(), self.layer_lineweights.tolist()
+        layers = [{"name": self.layers[i], "color": color(layer_colors[i]), "lineweight": lineweight(layer_lineweights[i])}
+                  for i in range(self.table_layers)]
+        return {
+            "layers": layers,
+            **collections,
+            "statistics": {
+                "layer_count": len(layers),
+                "polyline_count": len(collections["polylines"]),
+                "line_count": len(collections["lines"]),
+                "circle_count": len(collections["circles"]),
+                "arc_count": len(collections["arcs"]),
+                "text_count": len(collections["texts"]),
+                "total_entities": self.total_entities,
+            },
+        }
+
+
+def _entity_dict(dxftype, layer, points, bulges, params, text, closed, style):
+    base = {'type': dxftype, 'layer': layer}
+    if dxftype in ('LWPOLYLINE', 'POLYLINE'):
+        return {**base, 'vertices': [vertex_dict(x, y, bulge) for (x, y), bulge in zip(points, bulges)],
+                'closed': closed, **style}
+    if dxftype == 'LINE':
+        return {**base, 'start': {'x': points[0][0], 'y': points[0][1]},
+                'end': {'x': points[1][0], 'y': points[1][1]}, **style}
+    if dxftype == 'CIRCLE':
+        return {**base, 'center': {'x': points[0][0], 'y': points[0][1]}, 'radius': params[0], **style}
+    if dxftype == 'ARC':
+        return {**base, 'center': {'x': points[0][0], 'y': points[0][1]}, 'radius': params[0],
+                'start_angle': params[1], 'end_angle': params[2], **style}
+    return {**base, 'text': text, 'position': {'x': points[0][0], 'y': points[0][1]}, 'height': params[0], **style}
+
+
+def simplify(points, tolerance, closed=False):
+    """Simplification de Douglas–Peucker d'une suite de sommets (n, 2) à `tolerance` près.
+
+    Version itérative vectorisée : chaque segment en attente est traité avec un seul calcul numpy
+    des distances. Un contour fermé garde au moins trois sommets, sinon il est retourné tel quel.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    work = np.vstack([points, points[:1]]) if closed else points
+    keep = np.zeros(len(work), dtype=bool)
+    keep[0] = keep[-1] = True
+    pending = [(0, len(work) - 1)]
+    while pending:
+        start, end = pending.pop()
+        if end - start < 2:
+            continue
+        segment = work[end] - work[start]
+        relative = work[start + 1:end] - work[start]
+        length = np.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(relative[:, 0], relative[:, 1])
+        else:
+            distances = np.abs(segment[0] * relative[:, 1] - segment[1] * relative[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            pending.append((start, split))
+            pending.append((split, end))
+    simplified = work[keep]
+    if closed:
+        simplified = simplified[:-1]
+        if len(simplified) < 3:
+            return points
+    return simplified
+
+
+def open_geometry(path):
+    """Ouvre un fichier GEXG en mémoire partagée (mmap) ; les tableaux restent adossés au fichier."""
+    with open(path, "rb") as f:
+        return GeometryFile(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+import os
+import threading
+import time
+import logging
+
+from app.services.file_service import CACHED_ARTIFACTS, precompute_artifacts
+from app.services.spatial_index import build_file_spatial_index
+from app.services.tile_service import PYRAMID_MAX_ZOOM, PYRAMID_MIN_ENTITIES, precompute_tile_pyramid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class IngestPipeline:
+    """Précalcule en arrière-plan les artefacts d'extraction des plans DXF dès leur enregistrement.
+
+    Après un upload ou un transfert, les services appellent submit(chemin) : un pool de workers
+    lit le fichier une seule fois et remplit le cache d'extraction (résumé, extraction complète,
+    profil "surface"). La première ouverture du plan est alors servie depuis le cache ; une
+    ouverture pendant le calcul attend sa fin au lieu de relancer l'analyse. L'index spatial par
+    calque est construit dans la foulée ; pour les gros plans, les premiers niveaux de la pyramide
+    de tuiles sont aussi précalculés (voir spatial_index et tile_service).
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.workers = 2
+        self.artifacts = list(CACHED_ARTIFACTS)
+        self.tile_pyramid_max_zoom = PYRAMID_MAX_ZOOM
+        self.tile_pyramid_min_entities = PYRAMID_MIN_ENTITIES
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._counters = {"submitted_total": 0, "completed_total": 0, "failed_total": 0, "skipped_total": 0}
+        self._durations = []
+
+    def init_app(self, app):
+        """Lit la configuration INGEST_* de l'application."""
+        self.enabled = app.config.get('INGEST_ENABLED', True)
+        self.workers = max(int(app.config.get('INGEST_WORKERS', 2)), 1)
+        artifacts = app.config.get('INGEST_ARTIFACTS') or list(CACHED_ARTIFACTS)
+        if isinstance(artifacts, str):
+            artifacts = [a.strip() for a in artifacts.split(',') if a.strip()]
+        unknown = [a for a in artifacts if a not in CACHED_ARTIFACTS]
+        if unknown:
+            raise ValueError(f"Artefacts d'ingestion inconnus : {', '.join(unknown)}")
+        self.artifacts = artifacts
+        self.tile_pyramid_max_zoom = int(app.config.get('TILE_PYRAMID_MAX_ZOOM', PYRAMID_MAX_ZOOM))
+        self.tile_pyramid_min_entities = int(app.config.get('TILE_PYRAMID_MIN_ENTITIES', PYRAMID_MIN_ENTITIES))
+        app.extensions['ingest'] = self
+        logger.info(f"Ingestion à l'upload {'activée' if self.enabled else 'désactivée'} "
+                    f"({self.workers} workers, artefacts : {', '.join(self.artifacts)})")
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dxf-ingest')
+        return self._executor
+
+    def submit(self, file_path):
+        """Planifie le précalcul des artefacts d'un fichier DXF ; retourne le Future ou None si ignoré."""
+        if not self.enabled or not file_path or not file_path.lower().endswith('.dxf'):
+            return None
+        path = os.path.abspath(file_path)
+        with self._lock:
+            future = self._futures.get(path)
+            # Un calcul pas encore démarré couvrira aussi cette version du fichier
+            if future is not None and not future.running() and not future.done():
+                return future
+            future = self._get_executor().submit(self._process, path)
+            self._futures[path] = future
+            self._counters["submitted_total"] += 1
+        future.add_done_callback(lambda f: self._forget(path, f))
+        return future
+
+    def _process(self, path):
+        started = time.perf_counter()
+        try:
+            computed = precompute_artifacts(path, self.artifacts)
+            if build_file_spatial_index(path):
+                computed.append('spatial_index')
+            # Un niveau maximal négatif désactive le précalcul des tuiles
+            if self.tile_pyramid_max_zoom >= 0 and precompute_tile_pyramid(
+                    path, self.tile_pyramid_max_zoom, self.tile_pyramid_min_entities):
+                computed.append('tiles')
+        except Exception as e:
+            with self._lock:
+                self._counters["failed_total"] += 1
+            logger.error(f"Échec de l'ingestion de {path} : {str(e)}", exc_info=True)
+            return []
+        duration = time.perf_counter() - started
+        with self._lock:
+            self._counters["completed_total" if computed else "skipped_total"] += 1
+            self._durations = (self._durations + [duration])[-100:]
+        if computed:
+            logger.info(f"Ingestion de {path} terminée en {duration:.2f}s ({', '.join(computed)})")
+        return computed
+
+    def _forget(self, path, future):
+        with self._lock:
+            if self._futures.get(path) is future:
+                del self._futures[path]
+
+    def status(self, file_path):
+        """"pending" ou "running" si le fichier est en cours d'ingestion, sinon None."""
+        with self._lock:
+            future = self._futures.get(os.path.abspath(file_path))
+        if future is None or future.done():
+            return None
+        return "running" if future.running() else "pending"
+
+    def wait(self, timeout=None):
+        """Attend la fin des ingestions en cours (benchmarks, arrêt propre)."""
+        with self._lock:
+            futures = list(self._futures.values())
+        return not wait(futures, timeout=timeout).not_done
+
+    def snapshot(self):
+        with self._lock:
+            durations = sorted(self._durations)
+            snapshot = dict(self._counters)
+            snapshot["queue_depth"] = sum(1 for f in self._futures.values() if not f.done())
+        snapshot["last_duration_p50_seconds"] = durations[len(durations) // 2] if durations else 0.0
+        return snapshot
+
+    def shutdown(self, wait_for_jobs=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait_for_jobs)
+            self._executor = None
+
+
+ingest_pipeline = IngestPipeline()
+
+
+def ingest_prometheus_samples():
+    """Collecteur pour /metrics : compteurs de l'ingestion et profondeur de la file."""
+    samples = []
+    for key, value in ingest_pipeline.snapshot().items():
+        metric_type = "counter" if key.endswith("_total") else "gauge"
+        samples.append((f"gex_ingest_{key}", metric_type, f"Ingestion des plans DXF : {key}", {(): value}))
+    return samples
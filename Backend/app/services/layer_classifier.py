@@ -0,0 +1,209 @@
+from collections import namedtuple
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Règles par défaut : sémantique des calques SDP et libellés des destinations (app/rules/layer_rules.json)
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rules', 'layer_rules.json')
+CATEGORIES = ('main', 'special', 'demolition', 'other')
+# Nombre de noms de calques distincts dont la classification reste en mémoire
+LAYER_CACHE_SIZE = 4096
+
+_SDP_NAME = re.compile(r'(?:GEX_EDS_)?SDP_\d+-([A-Z_]+)')
+_HEIGHT_NAME = re.compile(r'H-(\d+)')
+_PREFIX = re.compile(r'^(?:GEX_EDS_)?(?:SDP_)?\d*')
+
+# YAML accepté pour le fichier de règles si PyYAML est installé ; JSON sinon
+try:
+    import yaml
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    yaml = None
+
+# Classification d'un calque : category ('main', 'special', 'demolition' ou 'other'), destination
+# (calques principaux uniquement), special (nature d'un calque spécial), rdv (surface RDV), name (nom
+# court de destination utilisé par la feuille SDP détaillée) et display_name (libellé affiché de ce nom)
+LayerClass = namedtuple('LayerClass', ['category', 'destination', 'special', 'rdv', 'name', 'display_name'])
+
+
+class LayerRules:
+    """Règles de calques compilées : table motif -> règle et expression unique de recherche des motifs.
+
+    Tous les motifs (catégories et RDV) sont recherchés en un seul passage d'une expression compilée
+    (avec chevauchements) ; la règle retenue est celle de plus haute priorité parmi les motifs trouvés.
+    """
+
+    def __init__(self, rules, source=None):
+        self.source = source
+        # Empreinte du contenu des règles : version des résultats calculés avec elles (graphe des surfaces)
+        self.digest = hashlib.blake2b(json.dumps(rules, sort_keys=True, default=str).encode('utf-8'),
+                                      digest_size=8).hexdigest()
+        main = rules.get('main') or {}
+        self.main_prefix = main.get('prefix', 'GEX_EDS_SDP_1-')
+        # Feuille SDP détaillée : calques principaux retenus par préfixe, et non par motif contenu
+        self.detail_prefix = main.get('detail_prefix', 'GEX_EDS_SDP_1')
+        self.aliases = dict(main.get('aliases') or {})
+        self.labels = dict(rules.get('destinations') or {})
+        self.rules = []
+        for rule in rules.get('layers') or []:
+            if not rule.get('contains') or rule.get('category') not in CATEGORIES:
+                raise ValueError(f"Règle de calque invalide : {rule}")
+            self.rules.append((rule['contains'], rule['category'], rule.get('special')))
+        self.rdv = frozenset(rules.get('rdv') or ())
+        # Motif -> indice de la première règle qui l'utilise (priorité), None pour un motif RDV seul
+        self.priorities = {}
+        for index, (token, _, _) in enumerate(self.rules):
+            self.priorities.setdefault(token, index)
+        for token in self.rdv:
+            self.priorities.setdefault(token, None)
+        # À une position donnée l'expression retient le motif le plus long : ses préfixes sont ajoutés d'office
+        tokens = sorted(self.priorities, key=len, reverse=True)
+        self.covers = {token: [t for t in tokens if token.startswith(t)] for token in tokens}
+        self.scanner = re.compile('(?=(' + '|'.join(re.escape(t) for t in tokens) + '))') if tokens else None
+
+    def match(self, layer):
+        """(motif, catégorie, nature spéciale) de la règle retenue ou None, et indicateur RDV, pour un nom de calque."""
+        if self.scanner is None:
+            return None, False
+        found = set()
+        for m in self.scanner.finditer(layer):
+            found.update(self.covers[m.group(1)])
+        indices = [self.priorities[t] for t in found if self.priorities[t] is not None]
+        rule = self.rules[min(indices)] if indices else None
+        return rule, not self.rdv.isdisjoint(found)
+
+
+def load_layer_rules(path=DEFAULT_RULES_FILE):
+    """Lit et compile un fichier de règles JSON (ou YAML si PyYAML est installé). Lève ValueError si invalide."""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yml', '.yaml')):
+            if yaml is None:
+                raise ValueError(f"PyYAML est requis pour lire les règles de calques {path}")
+            rules = yaml.safe_load(f)
+        else:
+            rules = json.load(f)
+    if not isinstance(rules, dict):
+        raise ValueError(f"Fichier de règles de calques invalide : {path}")
+    return LayerRules(rules, source=path)
+
+
+_rules = load_layer_rules()
+_rules_lock = threading.Lock()
+
+
+def install_layer_rules(rules):
+    """Remplace les règles actives ; les classifications mémorisées sont invalidées."""
+    global _rules
+    with _rules_lock:
+        _rules = rules
+        classify_layer.cache_clear()
+    logger.info(f"Règles de calques chargées depuis {rules.source} : {len(rules.rules)} règle(s), "
+                f"{len(rules.labels)} destination(s)")
+
+
+def init_layer_rules(app):
+    """Compile au démarrage le fichier de règles LAYER_RULES_FILE (règles par défaut si absent)."""
+    path = app.config.get('LAYER_RULES_FILE') or DEFAULT_RULES_FILE
+    if os.path.abspath(path) != os.path.abspath(_rules.source or ''):
+        install_layer_rules(load_layer_rules(path))
+
+
+def current_rules():
+    return _rules
+
+
+def _destination(layer, rules):
+    """Destination d'un calque principal rapprochée des destinations connues (correspondance exacte puis partielle)."""
+    try:
+        parts = layer.split(rules.main_prefix)
+        if len(parts) < 2:
+            return None
+        raw_destination = parts[1]
+        # Nettoyer le nom de la destination de tout caractère indésirable à la fin
+        if raw_destination.endswith('_'):
+            raw_destination = raw_destination[:-1]
+        # Alias des noms tronqués rencontrés dans certains fichiers (ex. EXPLOITATIO0)
+        for alias, destination in rules.aliases.items():
+            if alias in raw_destination:
+                raw_destination = destination
+                break
+        if raw_destination in rules.labels:
+            return raw_destination
+        for key in rules.labels:
+            if key in raw_destination or raw_destination in key:
+                return key
+        return raw_destination
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction de la destination: {str(e)}")
+        return None
+
+
+def _name(layer):
+    """Nom court de destination d'un calque quelconque (SDP_X-CATEGORIE, H-180, PK...)."""
+    # Format standard: GEX_EDS_SDP_X-CATEGORIE_SOUSCATEGORIE, ex. GEX_EDS_SDP_1-COMMERCE_CIN -> COMMERCE_CIN
+    match = _SDP_NAME.search(layer)
+    if match:
+        return match.group(1)
+    # Format spécifique pour hauteur sous plafond (H-180)
+    if "H-" in layer:
+        match = _HEIGHT_NAME.search(layer)
+        if match:
+            return f"H-{match.group(1)}"
+    # Format spécifique pour stationnement
+    if "PK" in layer:
+        return "PK"
+    # Si le calque contient un tiret, prendre la partie après le tiret
+    if "-" in layer:
+        return layer.split('-')[-1]
+    # Enlever les préfixes communs
+    clean_layer = _PREFIX.sub('', layer)
+    if clean_layer.startswith('-'):
+        clean_layer = clean_layer[1:]
+    return clean_layer or layer
+
+
+def destination_label(destination):
+    """Libellé connu d'une destination, sinon la destination elle-même."""
+    return _rules.labels.get(destination, destination)
+
+
+def format_destination(destination):
+    """Libellé affiché d'une destination : libellé connu, sinon nom avec espaces et majuscule initiale."""
+    if destination in _rules.labels:
+        return _rules.labels[destination]
+    return destination.replace('_', ' ').lower().capitalize()
+
+
+@functools.lru_cache(maxsize=LAYER_CACHE_SIZE)
+def classify_layer(layer):
+    """Classe un nom de calque selon les règles actives ; calculé une fois par calque distinct puis servi depuis le cache."""
+    if not isinstance(layer, str) or not layer:
+        return LayerClass('other', None, None, False, None, None)
+    rules = _rules
+    rule, rdv = rules.match(layer)
+    name = _name(layer)
+    category, special = (rule[1], rule[2]) if rule else ('other', None)
+    destination = None
+    if category == 'main':
+        destination = _destination(layer, rules)
+        logger.info(f"Calque {layer} : destination {destination}")
+    return LayerClass(category, destination, special, rdv, name, format_destination(name))
+
+
+def is_detail_main_layer(layer):
+    """Calque principal de la feuille SDP détaillée : nom commençant par le préfixe detail_prefix des règles."""
+    return isinstance(layer, str) and layer.startswith(_rules.detail_prefix)
+
+
+def destination_name(polyline):
+    """Nom court de destination d'une polyligne ; à défaut de calque, son type ou NON_SPECIFIE."""
+    name = classify_layer(polyline.get('layer', '')).name
+    if name is None:
+        return polyline.get('type', '') or "NON_SPECIFIE"
+    return name
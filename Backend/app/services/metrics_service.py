@@ -0,0 +1,270 @@
+from flask import Response, current_app, g, has_request_context, request
+from contextlib import contextmanager
+import cProfile
+import ipaddress
+import os
+import random
+import threading
+import time
+import logging
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Réglages du profilage lus une seule fois dans l'environnement ; valeurs par défaut de init_metrics
+PROFILING_DEFAULTS = {
+    "PROFILING_ENABLED": os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes", "on"),
+    "PROFILING_SAMPLE_RATE": float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+    "PROFILING_BACKEND": os.getenv("PROFILING_BACKEND", "auto"),
+    "PROFILING_OUTPUT_DIR": os.getenv(
+        "PROFILING_OUTPUT_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "profiles"))),
+}
+
+# Clients autorisés à lire /metrics sans configuration METRICS_ALLOWED_NETWORKS : la machine locale
+DEFAULT_METRICS_NETWORKS = "127.0.0.0/8,::1"
+
+# Bornes (en secondes) des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus, une série par combinaison de labels."""
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, labels, value):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            base_labels = ",".join(f'{k}="{_escape_label(v)}"' for k, v in key)
+            separator = "," if base_labels else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base_labels}{separator}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{base_labels}{separator}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base_labels}}} {total}")
+            lines.append(f"{self.name}_count{{{base_labels}}} {count}")
+        return lines
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Registre des métriques du processus, exposé sur /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            "gex_http_request_duration_seconds", "Durée de traitement des requêtes HTTP par route.")
+        self.span_duration = Histogram(
+            "gex_span_duration_seconds", "Durée des sections nommées (parse, geometry, excel_write...).")
+        self._collectors = []
+
+    def observe_request(self, labels, value):
+        with self._lock:
+            self.request_duration.observe(labels, value)
+
+    def observe_span(self, labels, value):
+        with self._lock:
+            self.span_duration.observe(labels, value)
+
+    def register_collector(self, collector):
+        """Ajoute une fonction retournant des (nom, type, aide, {labels: valeur}) évaluée à chaque export."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render_prometheus(self):
+        with self._lock:
+            lines = self.request_duration.render() + self.span_duration.render()
+        for collector in self._collectors:
+            try:
+                for name, metric_type, documentation, samples in collector():
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    for labels, value in samples.items():
+                        label_str = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                        lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+            except Exception as e:
+                logger.error(f"Erreur dans un collecteur de métriques: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class Span:
+    """Section nommée en cours de chronométrage (voir span)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def stop(self):
+        if self.duration is not None:
+            return self.duration
+        self.duration = time.perf_counter() - self.started
+        service = current_app.config.get("METRICS_SERVICE_NAME", "api") if has_request_context() else "offline"
+        registry.observe_span({"service": service, "span": self.name}, self.duration)
+        if has_request_context():
+            spans = g.get("_metrics_spans")
+            if spans is not None:
+                spans.append((self.name, self.duration))
+        return self.duration
+
+
+@contextmanager
+def span(name):
+    """Chronomètre une section nommée ; alimente l'histogramme et l'en-tête Server-Timing.
+
+    La section est close même si le bloc lève une exception : seul point d'entrée des sections.
+    """
+    current = Span(name)
+    try:
+        yield current
+    finally:
+        current.stop()
+
+
+# Un seul profilage à la fois : cProfile ne supporte pas plusieurs profileurs actifs simultanément
+_profiler_lock = threading.Lock()
+
+
+def _should_profile(app):
+    if not app.config.get("PROFILING_ENABLED"):
+        return False
+    if request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1":
+        return True
+    return random.random() < app.config.get("PROFILING_SAMPLE_RATE", 0.0)
+
+
+def _start_profiler(app):
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    try:
+        if PyinstrumentProfiler is not None and app.config.get("PROFILING_BACKEND", "auto") != "cprofile":
+            profiler = PyinstrumentProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception:
+        _profiler_lock.release()
+        raise
+
+
+def _stop_profiler(app, profiler, route):
+    try:
+        output_dir = app.config.get("PROFILING_OUTPUT_DIR")
+        os.makedirs(output_dir, exist_ok=True)
+        safe_route = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            file_name = f"{stamp}_{safe_route}_{threading.get_ident()}.prof"
+            profiler.dump_stats(os.path.join(output_dir, file_name))
+        else:
+            profiler.stop()
+            file_name = f"{stamp}_{safe_route}_{threading.get_ident()}.html"
+            with open(os.path.join(output_dir, file_name), "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        logger.info(f"Profil enregistré: {file_name}")
+        return file_name
+    finally:
+        _profiler_lock.release()
+
+
+def parse_networks(value):
+    """Réseaux IP d'une liste séparée par des virgules ("127.0.0.0/8,::1,10.0.0.0/8") ; lève ValueError si invalide."""
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip())
+
+
+def _client_in(networks):
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    if getattr(address, "ipv4_mapped", None) is not None:
+        address = address.ipv4_mapped
+    return any(address in network for network in networks)
+
+
+def init_metrics(app, service_name="api"):
+    """Installe le middleware de mesure de latence et la route /metrics sur une application Flask.
+
+    /metrics n'est servie qu'aux adresses des réseaux METRICS_ALLOWED_NETWORKS (machine locale par
+    défaut) : le scraper Prometheus n'a pas de jeton JWT, mais les métriques exposent le pool de
+    connexions, les files d'ingestion et les durées des étapes.
+    """
+    app.config.setdefault("METRICS_SERVICE_NAME", service_name)
+    for key, value in PROFILING_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    metrics_networks = parse_networks(app.config.setdefault("METRICS_ALLOWED_NETWORKS", DEFAULT_METRICS_NETWORKS))
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_spans = []
+        g._metrics_profiler = _start_profiler(app) if _should_profile(app) else None
+
+    @app.after_request
+    def record_request_timing(response):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+        profiler = g.pop("_metrics_profiler", None)
+        if profiler is not None:
+            response.headers["X-Profile-File"] = _stop_profiler(app, profiler, route)
+
+        registry.observe_request({
+            "service": app.config["METRICS_SERVICE_NAME"],
+            "method": request.method,
+            "route": route,
+            "status": str(response.status_code),
+        }, duration)
+
+        timings = [f"{name};dur={value * 1000:.1f}" for name, value in g.pop("_metrics_spans", [])]
+        timings.append(f"total;dur={duration * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    def metrics():
+        if not _client_in(metrics_networks):
+            logger.warning(f"Accès à /metrics refusé pour {request.remote_addr}")
+            return Response("Accès refusé\n", status=403, mimetype="text/plain")
+        return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.teardown_request
+    def release_profiler(exception):
+        # La requête a échoué avant after_request : libérer le profileur quand même
+        profiler = g.pop("_metrics_profiler", None)
+        if profiler is not None:
+            _stop_profiler(app, profiler, request.url_rule.rule if request.url_rule is not None else "unmatched")
+
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
+    logger.info(f"Instrumentation des requêtes activée pour {service_name}")
@@ -0,0 +1,142 @@
+from app.services.metrics_service import span
+from app.services.polygon_repair import repair_polygons
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shapely est requis pour les opérations booléennes ; sans lui, la comparaison est désactivée
+try:
+    import shapely
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    shapely = None
+
+# Tolérance de comparaison des sommets (unités du dessin) ; les intersections d'aire inférieure
+# à son carré (contours qui se touchent) sont ignorées
+DIFF_TOLERANCE = 1e-3
+STATUSES = ('unchanged', 'modified', 'added', 'removed')
+
+
+def _polygons(polylines, destination_of, geometries):
+    """Polygones réparés des polylignes rattachées à une destination, avec leur calque et destination."""
+    selected, layers, destinations, sources = [], [], [], []
+    for index, polyline in enumerate(polylines):
+        destination = destination_of(polyline)
+        if not destination or geometries[index] is None:
+            continue
+        selected.append(geometries[index])
+        layers.append(str(polyline.get('layer', '')).upper())
+        destinations.append(destination)
+        sources.append(index)
+    return np.array(selected, dtype=object), np.array(layers, dtype=object), \
+        np.array(destinations, dtype=object), np.array(sources, dtype=np.int64)
+
+
+def _add_by(target, keys, values):
+    for key, value in zip(keys.tolist(), values.tolist()):
+        if value > 0:
+            target[key] = target.get(key, 0.0) + value
+
+
+def diff_plans(existant_polylines, projet_polylines, destination_of, tolerance=DIFF_TOLERANCE, geometries=None):
+    """Compare géométriquement les polylignes de l'existant et du projet.
+
+    Les polylignes sont appariées par calque et par recouvrement (STRtree) puis classées :
+    inchangée (même contour à `tolerance` près), modifiée (même calque, contour différent qui
+    recouvre l'ancien), ajoutée ou supprimée. Les surfaces sont calculées par intersections
+    vectorisées, uniquement pour les polylignes qui ont changé :
+      - cree[d]                  : surface projet de d qui ne recouvre aucune surface existante (B)
+      - cree_changement[d]       : surface projet de d qui recouvre une surface existante d'une autre destination (C)
+      - supprimee[d]             : surface existante de d qui n'est plus recouverte par le projet (D)
+      - supprimee_changement[d]  : surface existante de d recouverte par le projet d'une autre destination
+    Les polylignes d'un même fichier sont supposées ne pas se chevaucher (règle de dessin des
+    calques GEX_EDS_SDP_1) : une polyligne inchangée ne contribue alors à aucune de ces surfaces.
+    `geometries` (polygones réparés de l'existant et du projet) évite de les reconstruire.
+    """
+    if shapely is None:
+        raise RuntimeError("La comparaison géométrique des plans nécessite la bibliothèque shapely")
+
+    with span('plan_diff'):
+        if geometries is None:
+            geometries = (repair_polygons(existant_polylines), repair_polygons(projet_polylines))
+        existant, existant_layers, existant_destinations, existant_sources = \
+            _polygons(existant_polylines, destination_of, geometries[0])
+        projet, projet_layers, projet_destinations, projet_sources = \
+            _polygons(projet_polylines, destination_of, geometries[1])
+        existant_status = np.full(len(existant), 'removed', dtype=object)
+        projet_status = np.full(len(projet), 'added', dtype=object)
+        existant_match = np.full(len(existant), -1, dtype=np.int64)
+
+        # Paires (projet, existant) qui se recouvrent, en une seule requête vectorisée sur l'arbre
+        tree = shapely.STRtree(existant)
+        pairs = tree.query(projet, predicate='intersects') if len(projet) else np.zeros((2, 0), dtype=np.int64)
+        pair_projet, pair_existant = pairs[0], pairs[1]
+        same_layer = projet_layers[pair_projet] == existant_layers[pair_existant]
+
+        # Appariement : d'abord les contours identiques, puis les contours modifiés du même calque
+        candidates = np.flatnonzero(same_layer)
+        equal = shapely.equals_exact(shapely.normalize(projet[pair_projet[candidates]]),
+                                     shapely.normalize(existant[pair_existant[candidates]]), tolerance) \
+            if len(candidates) else np.zeros(0, dtype=bool)
+        for status, selected in (('unchanged', candidates[equal]), ('modified', candidates[~equal])):
+            for pair in selected.tolist():
+                p, e = pair_projet[pair], pair_existant[pair]
+                if projet_status[p] == 'added' and existant_status[e] == 'removed':
+                    projet_status[p], existant_status[e] = status, status
+                    existant_match[e] = p
+
+        # Surfaces : intersections des seules paires dont au moins une polyligne a changé
+        changed = (projet_status[pair_projet] != 'unchanged') | (existant_status[pair_existant] != 'unchanged')
+        pair_projet, pair_existant = pair_projet[changed], pair_existant[changed]
+        overlap = shapely.area(shapely.intersection(projet[pair_projet], existant[pair_existant])) \
+            if len(pair_projet) else np.zeros(0)
+        significant = overlap > tolerance ** 2
+        pair_projet, pair_existant, overlap = pair_projet[significant], pair_existant[significant], overlap[significant]
+        other_destination = projet_destinations[pair_projet] != existant_destinations[pair_existant]
+
+        projet_covered = np.zeros(len(projet))
+        np.add.at(projet_covered, pair_projet, overlap)
+        existant_covered = np.zeros(len(existant))
+        np.add.at(existant_covered, pair_existant, overlap)
+        projet_changed = projet_status != 'unchanged'
+        existant_changed = existant_status != 'unchanged'
+        projet_area = shapely.area(projet) if len(projet) else np.zeros(0)
+        existant_area = shapely.area(existant) if len(existant) else np.zeros(0)
+
+        results = {'cree': {}, 'cree_changement': {}, 'supprimee': {}, 'supprimee_changement': {}}
+        _add_by(results['cree'], projet_destinations[projet_changed],
+                np.maximum(projet_area[projet_changed] - projet_covered[projet_changed], 0.0))
+        _add_by(results['supprimee'], existant_destinations[existant_changed],
+                np.maximum(existant_area[existant_changed] - existant_covered[existant_changed], 0.0))
+        _add_by(results['cree_changement'], projet_destinations[pair_projet[other_destination]], overlap[other_destination])
+        _add_by(results['supprimee_changement'], existant_destinations[pair_existant[other_destination]],
+                overlap[other_destination])
+
+    changes = []
+    for e in np.flatnonzero(existant_status != 'unchanged').tolist():
+        p = existant_match[e]
+        changes.append({
+            'status': existant_status[e],
+            'layer': existant_polylines[existant_sources[e]].get('layer'),
+            'destination': existant_destinations[e],
+            'existant_index': int(existant_sources[e]),
+            'projet_index': int(projet_sources[p]) if p >= 0 else None,
+            'area_delta': float((projet_area[p] if p >= 0 else 0.0) - existant_area[e]),
+        })
+    for p in np.flatnonzero(projet_status == 'added').tolist():
+        changes.append({
+            'status': 'added',
+            'layer': projet_polylines[projet_sources[p]].get('layer'),
+            'destination': projet_destinations[p],
+            'existant_index': None,
+            'projet_index': int(projet_sources[p]),
+            'area_delta': float(projet_area[p]),
+        })
+
+    counts = {status: 0 for status in STATUSES}
+    for status in existant_status.tolist() + projet_status[projet_status == 'added'].tolist():
+        counts[status] += 1
+    logger.info(f"Comparaison existant/projet : {counts['unchanged']} inchangée(s), {counts['modified']} modifiée(s), "
+                f"{counts['added']} ajoutée(s), {counts['removed']} supprimée(s)")
+    return {**results, 'elements': counts, 'changes': changes}
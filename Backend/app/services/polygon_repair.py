@@ -0,0 +1,94 @@
+from app.services.arc_geometry import ARC_TOLERANCE, tessellate_bulges
+from app.services.metrics_service import span
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shapely est requis pour construire les polygones ; sans lui, aucune géométrie n'est préparée
+try:
+    import shapely
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    shapely = None
+
+# Deux sommets consécutifs plus proches que cette distance (par coordonnée) sont confondus
+REPAIR_TOLERANCE = 1e-9
+# Identifiants shapely des types surfaciques (Polygon, MultiPolygon)
+POLYGONAL_TYPES = (3, 6)
+
+
+def _polygonal(geometry):
+    """Partie surfacique d'une géométrie réparée (make_valid peut produire des lignes ou des points)."""
+    if geometry is None or shapely.is_empty(geometry):
+        return None
+    if shapely.get_type_id(geometry) in POLYGONAL_TYPES:
+        return geometry
+    parts = shapely.get_parts(geometry)
+    parts = parts[np.isin(shapely.get_type_id(parts), POLYGONAL_TYPES)]
+    if not len(parts):
+        return None
+    return shapely.union_all(parts)
+
+
+def repair_polygons(polylines, tolerance=REPAIR_TOLERANCE, arc_tolerance=ARC_TOLERANCE):
+    """Polygones valides des polylignes, dans l'ordre de la liste ; None pour une polyligne sans surface.
+
+    Préparation vectorisée sur l'ensemble des polylignes : arcs (sommets à bulge) remplacés par des
+    cordes à `arc_tolerance` près (cordes simples si None), suppression des sommets consécutifs
+    dupliqués et du sommet de fermeture répété, anneaux fermés, orientation extérieure
+    antihoraire, puis make_valid (ou buffer(0) à défaut) sur les seuls polygones invalides.
+    Un contour auto-sécant devient ainsi un polygone multiple au lieu d'être ignoré.
+    """
+    if shapely is None:
+        raise RuntimeError("La préparation des polygones nécessite la bibliothèque shapely")
+    count = len(polylines)
+    result = np.full(count, None, dtype=object)
+    lengths = np.array([len(p.get('vertices') or []) for p in polylines], dtype=np.int64)
+    if not lengths.sum():
+        return result
+
+    with span('polygon_repair'):
+        coords = np.array([(v['x'], v['y']) for p in polylines for v in (p.get('vertices') or [])],
+                          dtype=np.float64).reshape(-1, 2)
+        owner = np.repeat(np.arange(count), lengths)
+        if arc_tolerance is not None:
+            bulges = np.array([v.get('bulge', 0.0) for p in polylines for v in (p.get('vertices') or [])],
+                              dtype=np.float64)
+            coords, owner = tessellate_bulges(coords, bulges, owner, arc_tolerance)
+
+        # Sommets consécutifs confondus (à l'intérieur d'une même polyligne)
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = ~(np.all(np.abs(coords[1:] - coords[:-1]) <= tolerance, axis=1) & (owner[1:] == owner[:-1]))
+        coords, owner = coords[keep], owner[keep]
+
+        # Dernier sommet identique au premier : l'anneau est refermé par shapely
+        counts = np.bincount(owner, minlength=count)
+        present = np.flatnonzero(counts > 1)
+        starts = np.cumsum(counts) - counts
+        first, last = starts[present], starts[present] + counts[present] - 1
+        closing = np.all(np.abs(coords[last] - coords[first]) <= tolerance, axis=1)
+        keep = np.ones(len(coords), dtype=bool)
+        keep[last[closing]] = False
+        coords, owner = coords[keep], owner[keep]
+
+        counts = np.bincount(owner, minlength=count)
+        surfaces = np.flatnonzero(counts >= 3)
+        if not len(surfaces):
+            return result
+        selected = np.isin(owner, surfaces)
+        rank = np.searchsorted(surfaces, owner[selected])
+        rings = shapely.linearrings(coords[selected], indices=rank)
+        rings = np.where(shapely.is_ccw(rings), rings, shapely.reverse(rings))
+        polygons = shapely.polygons(rings)
+
+        invalid = np.flatnonzero(~shapely.is_valid(polygons))
+        if len(invalid):
+            repaired = shapely.make_valid(polygons[invalid]) if hasattr(shapely, 'make_valid') \
+                else shapely.buffer(polygons[invalid], 0)
+            still_invalid = ~shapely.is_valid(repaired)
+            repaired[still_invalid] = shapely.buffer(repaired[still_invalid], 0)
+            polygons[invalid] = [_polygonal(g) for g in repaired]
+            logger.info(f"{len(invalid)} polygone(s) invalide(s) réparé(s) sur {len(polygons)}")
+        result[surfaces] = polygons
+    return result
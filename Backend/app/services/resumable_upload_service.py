@@ -0,0 +1,197 @@
+from flask import current_app
+from app.services.upload_service import HASH_ALGORITHM, COPY_BUFFER_SIZE, place_file, staging_dir
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SESSION_FILE = "session.json"
+DATA_FILE = "data.part"
+RECEIVED_DIR = "received"
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+
+
+class UploadSessionNotFound(LookupError):
+    pass
+
+
+def _sessions_dir():
+    path = os.path.join(staging_dir(), "sessions")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _session_dir(upload_id):
+    # L'identifiant vient de l'URL : seuls des identifiants hexadécimaux générés ici sont acceptés
+    if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+        raise UploadSessionNotFound(upload_id)
+    path = os.path.join(_sessions_dir(), upload_id)
+    if not os.path.isdir(path):
+        raise UploadSessionNotFound(upload_id)
+    return path
+
+
+def _load(upload_id, owner):
+    path = _session_dir(upload_id)
+    with open(os.path.join(path, SESSION_FILE), "r", encoding="utf-8") as f:
+        session = json.load(f)
+    if session["owner"] != owner:
+        raise PermissionError("Cette session d'upload appartient à un autre utilisateur")
+    return path, session
+
+
+def _received_chunks(path):
+    return sorted(int(name) for name in os.listdir(os.path.join(path, RECEIVED_DIR)))
+
+
+def _status(path, session):
+    received = _received_chunks(path)
+    received_set = set(received)
+    missing = [i for i in range(session["total_chunks"]) if i not in received_set]
+    return {
+        "upload_id": session["upload_id"],
+        "filename": session["filename"],
+        "folder": session["folder"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "received_chunks": len(received),
+        "received_bytes": sum(_chunk_length(session, i) for i in received),
+        "missing_chunks": missing,
+    }
+
+
+def _chunk_length(session, index):
+    return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+
+def purge_expired_sessions(ttl=None):
+    """Supprime les sessions d'upload inactives depuis plus de UPLOAD_SESSION_TTL secondes."""
+    ttl = ttl if ttl is not None else current_app.config.get("UPLOAD_SESSION_TTL", 24 * 3600)
+    now = time.time()
+    removed = 0
+    for entry in os.scandir(_sessions_dir()):
+        if entry.is_dir() and now - entry.stat().st_mtime > ttl:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"{removed} session(s) d'upload expirée(s) supprimée(s)")
+    return removed
+
+
+def create_session(owner, filename, size, folder="", destination_dir=None, chunk_size=None, sha256=None):
+    """Ouvre une session d'upload reprenable et réserve le fichier de données à sa taille finale.
+
+    Les morceaux sont écrits directement à leur position dans ce fichier : ils peuvent arriver
+    dans n'importe quel ordre, en parallèle, et aucune concaténation n'est nécessaire à la fin.
+    """
+    max_size = current_app.config.get("UPLOAD_MAX_FILE_SIZE")
+    size = int(size)
+    if size <= 0:
+        raise ValueError("Taille de fichier invalide")
+    if max_size and size > max_size:
+        raise ValueError(f"Fichier trop volumineux (limite : {max_size} octets)")
+    chunk_size = int(chunk_size or current_app.config.get("UPLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    if chunk_size < MIN_CHUNK_SIZE:
+        raise ValueError(f"Taille de morceau trop petite (minimum : {MIN_CHUNK_SIZE} octets)")
+
+    purge_expired_sessions()
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(_sessions_dir(), upload_id)
+    os.makedirs(os.path.join(path, RECEIVED_DIR))
+    with open(os.path.join(path, DATA_FILE), "wb") as f:
+        f.truncate(size)
+    session = {
+        "upload_id": upload_id,
+        "owner": owner,
+        "filename": filename,
+        "folder": folder,
+        "destination_dir": destination_dir,
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": (size + chunk_size - 1) // chunk_size,
+        "sha256": sha256,
+        "created": time.time(),
+    }
+    with open(os.path.join(path, SESSION_FILE), "w", encoding="utf-8") as f:
+        json.dump(session, f)
+    logger.info(f"Session d'upload {upload_id} ouverte : {filename} ({size} octets, {session['total_chunks']} morceaux)")
+    return _status(path, session)
+
+
+def write_chunk(upload_id, owner, offset, stream, content_length):
+    """Écrit un morceau reçu à la position `offset` ; un morceau déjà reçu est simplement réécrit."""
+    path, session = _load(upload_id, owner)
+    offset = int(offset)
+    if offset < 0 or offset % session["chunk_size"] or offset >= session["size"]:
+        raise ValueError(f"Position de morceau invalide : {offset}")
+    index = offset // session["chunk_size"]
+    expected = _chunk_length(session, index)
+    if content_length is not None and int(content_length) != expected:
+        raise ValueError(f"Le morceau {index} doit faire {expected} octets")
+
+    written = 0
+    fd = os.open(os.path.join(path, DATA_FILE), os.O_WRONLY)
+    try:
+        while written < expected:
+            block = stream.read(min(COPY_BUFFER_SIZE, expected - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            written += len(block)
+    finally:
+        os.close(fd)
+    if written != expected:
+        raise ValueError(f"Morceau {index} incomplet : {written} octets reçus sur {expected}")
+
+    # Un fichier marqueur par morceau : sûr avec des PUT parallèles, y compris entre processus
+    open(os.path.join(path, RECEIVED_DIR, str(index)), "w").close()
+    os.utime(path)
+    return _status(path, session)
+
+
+def get_status(upload_id, owner):
+    """État de la session : morceaux reçus et manquants, pour reprendre un upload interrompu."""
+    path, session = _load(upload_id, owner)
+    return _status(path, session)
+
+
+def finalize(upload_id, owner):
+    """Vérifie que tous les morceaux sont reçus, calcule le hash et range le fichier à sa destination.
+
+    Retourne {"path", "size", "sha256", "deduplicated"} comme upload_service.save_upload.
+    """
+    path, session = _load(upload_id, owner)
+    status = _status(path, session)
+    if status["missing_chunks"]:
+        raise ValueError(f"{len(status['missing_chunks'])} morceau(x) manquant(s)")
+
+    data_path = os.path.join(path, DATA_FILE)
+    digest_state = hashlib.new(HASH_ALGORITHM)
+    with open(data_path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            digest_state.update(block)
+    digest = digest_state.hexdigest()
+    if session.get("sha256") and session["sha256"].lower() != digest:
+        raise ValueError("Le hash du fichier reçu ne correspond pas au hash annoncé")
+
+    destination_dir = session["destination_dir"]
+    os.makedirs(destination_dir, exist_ok=True)
+    destination = os.path.join(destination_dir, session["filename"])
+    deduplicated = place_file(data_path, digest, destination)
+    shutil.rmtree(path, ignore_errors=True)
+    logger.info(f"Session d'upload {upload_id} finalisée : {destination} ({session['size']} octets)")
+    return {"path": destination, "size": session["size"], HASH_ALGORITHM: digest, "deduplicated": deduplicated}
+
+
+def abort_session(upload_id, owner):
+    path, _ = _load(upload_id, owner)
+    shutil.rmtree(path, ignore_errors=True)
+    logger.info(f"Session d'upload {upload_id} annulée")
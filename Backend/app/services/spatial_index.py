@@ -0,0 +1,273 @@
+"""Index spatial par calque des entités d'un plan, au format binaire GEXI.
+
+Chaque calque a sa propre grille régulière sur son emprise, dimensionnée pour environ
+TARGET_PER_CELL entités par cellule. Les cellules sont stockées en CSR : début des références
+de chaque cellule, puis indices d'entités (ceux du fichier GEXG) triés par cellule. Une entité
+couvrant plus de MAX_CELLS_PER_ENTITY cellules est rangée dans une cellule "hors grille" du
+calque, toujours examinée. Le fichier est mmappé : aucune reconstruction au chargement.
+
+Disposition (version 1) : en-tête de 64 octets (magic "GEXI", version u16, taille d'en-tête u16,
+nombre de calques u32, nombre d'entités u32, nombre de cellules u32, nombre de références u32),
+puis, alignés sur 8 octets : grille f64[L*4] (minx, miny, largeur et hauteur de cellule),
+dimensions u32[L*2] (nx, ny), première cellule u32[L+1], début des cellules u32[C+1],
+références u32[R], emprises des entités f64[N*4].
+"""
+from app.services import extraction_cache
+from app.services.file_service import get_file_geometry
+from app.services.geometry_format import FLAG_CLOSED, TYPE_CODES, GeometryFile, open_geometry
+from app.services.metrics_service import span
+import functools
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GEXI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII44x")
+ARTIFACT = "spatial_index"
+TARGET_PER_CELL = 8
+MAX_GRID_SIDE = 1024
+MAX_CELLS_PER_ENTITY = 64
+INDEX_CACHE_SIZE = 16
+
+_SECTIONS = (
+    ("grids", "<f8", lambda c: c["layers"] * 4),
+    ("dims", "<u4", lambda c: c["layers"] * 2),
+    ("layer_cells", "<u4", lambda c: c["layers"] + 1),
+    ("cell_start", "<u4", lambda c: c["cells"] + 1),
+    ("refs", "<u4", lambda c: c["refs"]),
+    ("bounds", "<f8", lambda c: c["entities"] * 4),
+)
+
+
+def _layout(counts):
+    offset = HEADER.size
+    layout = {}
+    for name, dtype, length in _SECTIONS:
+        offset = (offset + 7) & ~7
+        layout[name] = (offset, dtype, length(counts))
+        offset += length(counts) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+def _cell_ranges(bounds, grid, nx, ny):
+    """Plages de cellules [x0, x1] x [y0, y1] couvertes par des emprises, bornées à la grille."""
+    minx, miny, width, height = grid
+    x0 = np.clip(np.floor((bounds[:, 0] - minx) / width), 0, nx - 1).astype(np.int64)
+    x1 = np.clip(np.floor((bounds[:, 2] - minx) / width), 0, nx - 1).astype(np.int64)
+    y0 = np.clip(np.floor((bounds[:, 1] - miny) / height), 0, ny - 1).astype(np.int64)
+    y1 = np.clip(np.floor((bounds[:, 3] - miny) / height), 0, ny - 1).astype(np.int64)
+    return x0, x1, y0, y1
+
+
+def _expand(x0, x1, y0, y1):
+    """Pour chaque plage, toutes ses cellules (ordre de la plage, cellule x, cellule y), sans boucle Python."""
+    widths = x1 - x0 + 1
+    spans = widths * (y1 - y0 + 1)
+    owner = np.repeat(np.arange(len(spans)), spans)
+    local = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    return owner, x0[owner] + local % widths[owner], y0[owner] + local // widths[owner]
+
+
+def build_spatial_index(geometry, bounds=None):
+    """Construit l'index GEXI d'une géométrie GEXG ; retourne les octets du fichier."""
+    bounds = geometry.entity_bounds() if bounds is None else bounds
+    layer_count = len(geometry.layers)
+    grids = np.zeros((layer_count, 4))
+    dims = np.ones((layer_count, 2), dtype=np.int64)
+    layer_cells = np.zeros(layer_count + 1, dtype=np.int64)
+    cell_parts, ref_parts = [], []
+
+    valid = ~np.isnan(bounds[:, 0])
+    for layer in range(layer_count):
+        ids = np.flatnonzero((geometry.layer_index == layer) & valid)
+        if len(ids):
+            layer_bounds = bounds[ids]
+            minx, miny = layer_bounds[:, 0].min(), layer_bounds[:, 1].min()
+            side = int(min(max(np.ceil(np.sqrt(len(ids) / TARGET_PER_CELL)), 1), MAX_GRID_SIDE))
+            width = (layer_bounds[:, 2].max() - minx) / side or 1.0
+            height = (layer_bounds[:, 3].max() - miny) / side or 1.0
+            grids[layer] = (minx, miny, width, height)
+            dims[layer] = (side, side)
+            x0, x1, y0, y1 = _cell_ranges(layer_bounds, grids[layer], side, side)
+            oversize = (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_ENTITY
+            owner, cx, cy = _expand(x0[~oversize], x1[~oversize], y0[~oversize], y1[~oversize])
+            cells = np.concatenate([cy * side + cx, np.full(oversize.sum(), side * side)])
+            refs = np.concatenate([ids[~oversize][owner], ids[oversize]])
+        else:
+            cells = refs = np.zeros(0, dtype=np.int64)
+        # Cellules du calque : nx * ny cellules de grille puis la cellule "hors grille"
+        cell_count = int(dims[layer].prod()) + 1
+        order = np.argsort(cells, kind='stable')
+        cell_parts.append(np.bincount(cells, minlength=cell_count))
+        ref_parts.append(refs[order])
+        layer_cells[layer + 1] = layer_cells[layer] + cell_count
+
+    counts_per_cell = np.concatenate(cell_parts) if cell_parts else np.zeros(0, dtype=np.int64)
+    cell_start = np.zeros(len(counts_per_cell) + 1, dtype=np.int64)
+    cell_start[1:] = np.cumsum(counts_per_cell)
+    refs = np.concatenate(ref_parts) if ref_parts else np.zeros(0, dtype=np.int64)
+
+    arrays = {"grids": grids.reshape(-1), "dims": dims.reshape(-1), "layer_cells": layer_cells,
+              "cell_start": cell_start, "refs": refs, "bounds": bounds.reshape(-1)}
+    counts = {"layers": layer_count, "entities": geometry.entity_count, "cells": len(counts_per_cell), "refs": len(refs)}
+    layout, size = _layout(counts)
+    buffer = bytearray(size)
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, HEADER.size, layer_count, geometry.entity_count,
+                     counts["cells"], counts["refs"])
+    for name, (offset, dtype, length) in layout.items():
+        data = np.asarray(arrays[name]).astype(dtype).tobytes()
+        buffer[offset:offset + len(data)] = data
+    return bytes(buffer)
+
+
+class SpatialIndex:
+    """Index GEXI en lecture seule, associé à la géométrie GEXG dont il indexe les entités."""
+
+    def __init__(self, buffer, geometry):
+        magic, version, header_size, layers, entities, cells, refs = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Index spatial invalide (signature GEXI absente)")
+        if version != VERSION:
+            raise ValueError(f"Version d'index spatial non prise en charge : {version}")
+        if entities != geometry.entity_count or layers != len(geometry.layers):
+            raise ValueError("Index spatial incohérent avec la géométrie du plan")
+        self.buffer = buffer
+        self.geometry = geometry
+        layout, _ = _layout({"layers": layers, "entities": entities, "cells": cells, "refs": refs})
+        for name, (offset, dtype, length) in layout.items():
+            setattr(self, name, np.frombuffer(buffer, dtype, length, offset))
+        self.grids = self.grids.reshape(-1, 4)
+        self.dims = self.dims.reshape(-1, 2)
+        self.bounds = self.bounds.reshape(-1, 4)
+        # Calques dont les noms ne diffèrent que par la casse (table du document et entités) : tous interrogés
+        self._layer_ids = {}
+        for i, name in enumerate(geometry.layers):
+            self._layer_ids.setdefault(name.upper(), []).append(i)
+
+    def layer_ids(self, layers=None):
+        """Indices des calques à interroger (tous si `layers` est None ; noms insensibles à la casse)."""
+        if layers is None:
+            return range(len(self.geometry.layers))
+        return sorted({i for name in layers for i in self._layer_ids.get(name.upper(), ())})
+
+    def _layer_candidates(self, layer, bbox):
+        first, last = int(self.layer_cells[layer]), int(self.layer_cells[layer + 1])
+        nx, ny = (int(v) for v in self.dims[layer])
+        grid = self.grids[layer]
+        # Calque vide, ou requête hors de l'emprise du calque (qui contient toutes ses entités)
+        if self.cell_start[first] == self.cell_start[last] or bbox[2] < grid[0] or bbox[3] < grid[1] \
+                or bbox[0] > grid[0] + grid[2] * nx or bbox[1] > grid[1] + grid[3] * ny:
+            return np.zeros(0, dtype=np.int64)
+        x0, x1, y0, y1 = _cell_ranges(np.array([bbox], dtype=np.float64), grid, nx, ny)
+        _, cx, cy = _expand(x0, x1, y0, y1)
+        cells = np.append(first + cy * nx + cx, first + nx * ny)  # plus la cellule "hors grille"
+        starts, ends = self.cell_start[cells].astype(np.int64), self.cell_start[cells + 1].astype(np.int64)
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64)
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.refs[positions]
+
+    def query_bbox(self, bbox, layers=None):
+        """Indices triés des entités dont l'emprise intersecte `bbox` [minx, miny, maxx, maxy]."""
+        with span('spatial_query'):
+            parts = [self._layer_candidates(layer, bbox) for layer in self.layer_ids(layers)]
+            candidates = np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+            b = self.bounds[candidates]
+            hit = (b[:, 0] <= bbox[2]) & (b[:, 2] >= bbox[0]) & (b[:, 1] <= bbox[3]) & (b[:, 3] >= bbox[1])
+            return candidates[hit]
+
+    def query_point(self, x, y, layers=None):
+        """Indices des polylignes fermées qui contiennent le point (x, y) (test exact par lancer de rayon)."""
+        candidates = self.query_bbox([x, y, x, y], layers)
+        geometry = self.geometry
+        types = geometry.types[candidates]
+        closed = (((types == TYPE_CODES['LWPOLYLINE']) | (types == TYPE_CODES['POLYLINE']))
+                  & ((geometry.flags[candidates] & FLAG_CLOSED) != 0))
+        return np.array([i for i in candidates[closed].tolist()
+                         if point_in_ring(x, y, geometry.entity_vertices(i))], dtype=np.int64)
+
+    def query_within(self, index, layers=None):
+        """Polylignes fermées entièrement contenues dans la polyligne fermée `index` (sommets et emprise)."""
+        geometry = self.geometry
+        outer, outer_bounds = geometry.entity_vertices(index), self.bounds[index]
+        candidates = self.query_bbox(outer_bounds.tolist(), layers)
+        b = self.bounds[candidates]
+        types = geometry.types[candidates]
+        # Filtre vectorisé sur les emprises avant le test exact des sommets
+        inside = ((b[:, 0] >= outer_bounds[0]) & (b[:, 1] >= outer_bounds[1])
+                  & (b[:, 2] <= outer_bounds[2]) & (b[:, 3] <= outer_bounds[3])
+                  & ((types == TYPE_CODES['LWPOLYLINE']) | (types == TYPE_CODES['POLYLINE']))
+                  & (candidates != index))
+        return np.array([i for i in candidates[inside].tolist()
+                         if points_in_ring(geometry.entity_vertices(i), outer).all()], dtype=np.int64)
+
+
+def points_in_ring(points, ring):
+    """Appartenance de plusieurs points (n, 2) à un contour fermé (m, 2), vectorisée (règle pair-impair)."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    ring = np.asarray(ring, dtype=np.float64)
+    if len(ring) < 3:
+        return np.zeros(len(points), dtype=bool)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intersect_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (x < intersect_x)).sum(axis=1) % 2 == 1
+
+
+def point_in_ring(x, y, ring):
+    return bool(points_in_ring([(x, y)], ring)[0])
+
+
+_index_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _open_index(index_path, geometry_path, signature):
+    with open(index_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SpatialIndex(buffer, open_geometry(geometry_path))
+
+
+def _signature(*paths):
+    return tuple((os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths)
+
+
+def build_file_spatial_index(file_path):
+    """Construit et enregistre l'index spatial d'un plan (ingestion) ; retourne False s'il existait déjà."""
+    if extraction_cache.get_cached_path(file_path, ARTIFACT) is not None:
+        return False
+    signature = extraction_cache.file_signature(file_path)
+    geometry = get_file_geometry(file_path)
+    geometry = open_geometry(geometry) if isinstance(geometry, str) else GeometryFile(geometry)
+    with span('spatial_index_build'):
+        data = build_spatial_index(geometry)
+    return extraction_cache.store(file_path, ARTIFACT, data, signature)
+
+
+def get_spatial_index(file_path):
+    """Index spatial d'un plan, mmappé depuis le cache d'extraction (construit au besoin)."""
+    geometry_path = get_file_geometry(file_path)
+    if not isinstance(geometry_path, str):
+        # Cache d'extraction inaccessible : index construit en mémoire pour cette requête
+        geometry = GeometryFile(geometry_path)
+        return SpatialIndex(build_spatial_index(geometry), geometry)
+    index_path = extraction_cache.get_cached_path(file_path, ARTIFACT)
+    if index_path is None:
+        build_file_spatial_index(file_path)
+        index_path = extraction_cache.get_cached_path(file_path, ARTIFACT)
+    if index_path is None:
+        geometry = open_geometry(geometry_path)
+        return SpatialIndex(build_spatial_index(geometry), geometry)
+    with _index_cache_lock:
+        return _open_index(index_path, geometry_path, _signature(index_path, geometry_path))
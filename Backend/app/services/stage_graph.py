@@ -0,0 +1,172 @@
+from app.services.metrics_service import span
+from collections import OrderedDict
+import hashlib
+import json
+import sys
+import threading
+import logging
+
+import numpy as np
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Nombre de résultats d'étapes gardés en mémoire (toutes étapes confondues)
+STAGE_CACHE_SIZE = 256
+# Taille mémoire approximative maximale des résultats en cache (les polygones d'un plan entier pèsent lourd)
+STAGE_CACHE_BYTES = 256 * 1024 * 1024
+# Coût fixe estimé d'une géométrie shapely (objet Python et structure GEOS), hors coordonnées
+GEOMETRY_OVERHEAD = 200
+
+
+def fingerprint(value):
+    """Empreinte d'une entrée JSON (polylignes extraites...) : même contenu, même empreinte.
+
+    L'entrée est entièrement sérialisée à chaque appel, y compris quand toutes les étapes sont
+    ensuite servies depuis le cache : pour un plan entier, ce coût (linéaire en nombre de
+    sommets) reste bien inférieur à celui des étapes géométriques, mais n'est pas nul.
+    """
+    payload = json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def approximate_size(value):
+    """Taille mémoire approximative (octets) d'un résultat d'étape : conteneurs JSON, tableaux numpy, géométries."""
+    if isinstance(value, np.ndarray):
+        if value.dtype != object:
+            return value.nbytes
+        if shapely is not None:
+            try:
+                coordinates = shapely.get_num_coordinates(value)
+            except TypeError:
+                coordinates = None
+            if coordinates is not None:
+                geometries = int(np.count_nonzero(shapely.is_geometry(value)))
+                return value.nbytes + 16 * int(coordinates.sum()) + GEOMETRY_OVERHEAD * geometries
+        return value.nbytes + sum(approximate_size(item) for item in value.ravel())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    if shapely is not None and isinstance(value, shapely.Geometry):
+        return 16 * int(shapely.get_num_coordinates(value)) + GEOMETRY_OVERHEAD
+    return sys.getsizeof(value)
+
+
+class StageGraph:
+    """Petit graphe de calcul dont les résultats d'étapes sont mémorisés par empreinte des entrées.
+
+    Chaque étape déclare ses dépendances (entrées nommées ou autres étapes). Sa clé de cache est
+    dérivée des empreintes des seules entrées dont elle dépend, sans rien évaluer : quand une
+    entrée change, seules les étapes situées en aval sont recalculées, les autres sont servies
+    depuis le cache. Les résultats en cache sont partagés et ne doivent pas être modifiés.
+
+    Le cache est borné en nombre d'entrées et en taille approximative (voir approximate_size) ;
+    un résultat plus gros que tout le budget est retourné sans être mis en cache.
+
+    `version`, fonction sans argument, retourne la version de l'état externe dont dépendent les
+    étapes (règles de calques...) : elle entre dans chaque clé, un changement de version rend
+    donc les résultats mémorisés inaccessibles sans avoir à vider le cache.
+    """
+
+    def __init__(self, name, max_entries=STAGE_CACHE_SIZE, max_bytes=STAGE_CACHE_BYTES, version=None):
+        self.name = name
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stages = {}
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self.cached_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def stage(self, name, *dependencies):
+        """Décorateur : enregistre `func(*valeurs des dépendances)` comme étape `name`."""
+        def register(func):
+            self.stages[name] = (dependencies, func)
+            return func
+        return register
+
+    def _key(self, name, input_keys, keys, version):
+        if name in input_keys:
+            return input_keys[name]
+        if name not in keys:
+            dependencies, _ = self.stages[name]
+            parts = [name, version] + [self._key(dependency, input_keys, keys, version) for dependency in dependencies]
+            keys[name] = hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+        return keys[name]
+
+    def run(self, inputs, targets):
+        """Évalue les étapes `targets` pour les entrées `inputs` ({nom: valeur JSON}) ; retourne {étape: résultat}."""
+        input_keys = {name: fingerprint(value) for name, value in inputs.items()}
+        version = str(self.version()) if self.version is not None else ''
+        keys, values, computed = {}, {}, []
+
+        def evaluate(name):
+            if name in inputs:
+                return inputs[name]
+            if name in values:
+                return values[name]
+            key = self._key(name, input_keys, keys, version)
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits[name] = self.hits.get(name, 0) + 1
+            if cached is None:
+                dependencies, func = self.stages[name]
+                arguments = [evaluate(dependency) for dependency in dependencies]
+                with span(f'{self.name}_{name}'):
+                    cached = (func(*arguments),)
+                computed.append(name)
+                size = approximate_size(cached[0])
+                with self._lock:
+                    self.misses[name] = self.misses.get(name, 0) + 1
+                    self._store(key, cached, size)
+            values[name] = cached[0]
+            return cached[0]
+
+        results = {target: evaluate(target) for target in targets}
+        if computed:
+            logger.info(f"Graphe {self.name} : étape(s) recalculée(s) {', '.join(computed)}")
+        return results
+
+    def _store(self, key, cached, size):
+        # Appelé sous self._lock : les entrées les moins récemment utilisées sont évincées d'abord
+        if size > self.max_bytes:
+            logger.info(f"Graphe {self.name} : résultat de {size} octets non mis en cache (budget {self.max_bytes})")
+            return
+        if key in self._cache:
+            self.cached_bytes -= self._sizes[key]
+        self._cache[key] = cached
+        self._sizes[key] = size
+        self.cached_bytes += size
+        while len(self._cache) > self.max_entries or self.cached_bytes > self.max_bytes:
+            evicted, _ = self._cache.popitem(last=False)
+            self.cached_bytes -= self._sizes.pop(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._sizes.clear()
+            self.cached_bytes = 0
+
+    def prometheus_samples(self):
+        """Collecteur pour /metrics : résultats d'étapes servis depuis le cache ou recalculés."""
+        with self._lock:
+            hits = {(('stage', name),): count for name, count in self.hits.items()}
+            misses = {(('stage', name),): count for name, count in self.misses.items()}
+            cached_bytes = self.cached_bytes
+        return [
+            (f"gex_{self.name}_stage_hits_total", "counter", f"Étapes du graphe {self.name} servies depuis le cache", hits),
+            (f"gex_{self.name}_stage_misses_total", "counter", f"Étapes du graphe {self.name} recalculées", misses),
+            (f"gex_{self.name}_stage_cache_bytes", "gauge", f"Taille approximative du cache du graphe {self.name}",
+             {(): cached_bytes}),
+        ]
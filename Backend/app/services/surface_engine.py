@@ -0,0 +1,285 @@
+from app.services.arc_geometry import bulge_segment_areas, following_vertices
+from app.services.layer_classifier import classify_layer, current_rules, destination_name, is_detail_main_layer
+from app.services.plan_diff_service import diff_plans
+from app.services.polygon_repair import repair_polygons
+from app.services.stage_graph import StageGraph
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shapely est requis pour les surfaces de démolition et RDV ; sans lui, elles ne sont pas calculées
+try:
+    import shapely
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    shapely = None
+
+# Moteur de calcul des surfaces SDP partagé par /generate-excel-file et le rapport visa.
+# La sémantique des calques vient des règles compilées de layer_classifier (app/rules/layer_rules.json).
+
+
+def _vertex_arrays(polylines, indices):
+    """Sommets concaténés (N, 2) des polylignes `indices`, avec le nombre de sommets et le début de chacune."""
+    lengths = np.array([len(polylines[i].get('vertices') or []) for i in indices], dtype=np.int64)
+    coords = np.array([(v['x'], v['y']) for i in indices for v in (polylines[i].get('vertices') or [])],
+                      dtype=np.float64).reshape(-1, 2)
+    return coords, lengths, np.cumsum(lengths) - lengths
+
+
+def polyline_areas(polylines, indices):
+    """Aires exactes des polylignes `indices`, 0 sous trois sommets.
+
+    Formule du lacet sur les sommets bruts, plus l'aire signée du segment circulaire de chaque arc
+    (sommet à bulge) : les pièces courbes sont mesurées sans discrétisation.
+    """
+    coords, lengths, starts = _vertex_arrays(polylines, indices)
+    areas = np.zeros(len(lengths))
+    surfaces = np.flatnonzero(lengths >= 3)
+    if not len(surfaces):
+        return areas
+    following = following_vertices(lengths, starts)
+    nonempty = lengths > 0
+    x, y = coords[:, 0], coords[:, 1]
+    cross = (x * y[following] - x[following] * y) / 2.0
+    bulges = np.array([v.get('bulge', 0.0) for i in indices for v in (polylines[i].get('vertices') or [])],
+                      dtype=np.float64)
+    if bulges.any():
+        cross += bulge_segment_areas(coords, coords[following], bulges)
+    sums = np.add.reduceat(cross, starts[nonempty])
+    areas[nonempty] = np.abs(sums)
+    areas[lengths < 3] = 0.0
+    return areas
+
+
+def containing_polylines(polylines, inner, outer):
+    """Pour chaque polyligne de `inner`, position dans `outer` de la première qui la contient, -1 sinon.
+
+    Contenance approchée par boîtes englobantes : au moins la moitié des sommets de la polyligne
+    intérieure sont dans la boîte de la polyligne extérieure. Les paires candidates sont filtrées
+    par recouvrement des boîtes puis les sommets sont testés en bloc.
+    """
+    result = np.full(len(inner), -1, dtype=np.int64)
+    if not len(inner) or not len(outer):
+        return result
+    inner_coords, inner_lengths, inner_starts = _vertex_arrays(polylines, inner)
+    outer_coords, outer_lengths, outer_starts = _vertex_arrays(polylines, outer)
+    inner_ok, outer_ok = inner_lengths > 0, outer_lengths > 0
+    if not inner_ok.any() or not outer_ok.any():
+        return result
+
+    def boxes(coords, lengths, starts, ok):
+        box = np.full((len(lengths), 4), np.nan)
+        box[ok, :2] = np.minimum.reduceat(coords, starts[ok])
+        box[ok, 2:] = np.maximum.reduceat(coords, starts[ok])
+        return box
+
+    inner_box = boxes(inner_coords, inner_lengths, inner_starts, inner_ok)
+    outer_box = boxes(outer_coords, outer_lengths, outer_starts, outer_ok)
+    # Paires dont les boîtes se recouvrent : requête STRtree sur les enveloppes, sinon comparaison de toutes les paires
+    if shapely is not None:
+        outer_valid = np.flatnonzero(outer_ok)
+        inner_valid = np.flatnonzero(inner_ok)
+        tree = shapely.STRtree(shapely.box(*outer_box[outer_valid].T))
+        pair_inner, pair_outer = tree.query(shapely.box(*inner_box[inner_valid].T))
+        pair_inner, pair_outer = inner_valid[pair_inner], outer_valid[pair_outer]
+    else:
+        overlap = ((inner_box[:, None, 0] <= outer_box[None, :, 2]) & (inner_box[:, None, 2] >= outer_box[None, :, 0]) &
+                   (inner_box[:, None, 1] <= outer_box[None, :, 3]) & (inner_box[:, None, 3] >= outer_box[None, :, 1]))
+        pair_inner, pair_outer = np.nonzero(overlap)
+    if not len(pair_inner):
+        return result
+
+    # Un sommet intérieur par ligne et par paire candidate
+    repeats = inner_lengths[pair_inner]
+    pair_of_vertex = np.repeat(np.arange(len(pair_inner)), repeats)
+    vertex = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats) + inner_starts[pair_inner][pair_of_vertex]
+    box = outer_box[pair_outer][pair_of_vertex]
+    x, y = inner_coords[vertex, 0], inner_coords[vertex, 1]
+    inside = (box[:, 0] <= x) & (x <= box[:, 2]) & (box[:, 1] <= y) & (y <= box[:, 3])
+    points_inside = np.bincount(pair_of_vertex, weights=inside, minlength=len(pair_inner))
+    contained = points_inside >= inner_lengths[pair_inner] / 2
+
+    # Première polyligne extérieure (dans l'ordre de `outer`) qui contient chaque polyligne intérieure
+    first = np.full(len(inner), len(outer), dtype=np.int64)
+    np.minimum.at(first, pair_inner[contained], pair_outer[contained])
+    result[first < len(outer)] = first[first < len(outer)]
+    return result
+
+
+# Graphe de calcul des surfaces : classification des calques et polygones réparés -> surfaces par fichier
+# (avec déductions) -> démolition, comparaison existant/projet et surfaces RDV. Les résultats d'étapes sont mémorisés par empreinte
+# des polylignes : quand seul le fichier projet change, les étapes de l'existant ne sont pas refaites.
+# L'empreinte des règles de calques actives fait partie des clés : réinstaller des règles recalcule tout.
+surface_graph = StageGraph('surface', version=lambda: current_rules().digest)
+
+
+def classify_polylines(polylines):
+    """Répartit les polylignes d'un fichier : principales (SDP_1, avec destination), spéciales à déduire et démolition.
+
+    Les polylignes sont désignées par leur indice dans la liste ; `destinations` associe chaque calque SDP_1 à sa destination.
+    """
+    destinations = {}
+    main, special, demolition = [], [], []
+    for index, polyline in enumerate(polylines):
+        layer = polyline.get('layer', '')
+        layer_class = classify_layer(layer)
+        if layer_class.category == 'main':
+            destinations[layer] = layer_class.destination
+            if layer_class.destination:
+                main.append(index)
+        elif layer_class.category == 'special':
+            special.append(index)
+        elif layer_class.category == 'demolition':
+            demolition.append(index)
+    return {'destinations': destinations, 'main': main, 'special': special, 'demolition': demolition}
+
+
+def destination_areas(polylines, classification):
+    """Surfaces par destination d'un fichier, déduction faite des surfaces spéciales qu'elles contiennent."""
+    destinations = classification['destinations']
+    main, special = classification['main'], classification['special']
+    main_destinations = [destinations[polylines[i].get('layer', '')] for i in main]
+    areas = {}
+    for destination, area in zip(main_destinations, polyline_areas(polylines, main).tolist()):
+        areas[destination] = areas.get(destination, 0) + area
+
+    special_areas = polyline_areas(polylines, special)
+    positive = np.flatnonzero(special_areas > 0)
+    parents = containing_polylines(polylines, [special[i] for i in positive], main)
+    for area, parent in zip(special_areas[positive].tolist(), parents.tolist()):
+        if parent >= 0:
+            areas[main_destinations[parent]] -= area
+    logger.info(f"Surfaces par destination : {len(main)} polyligne(s) principale(s), "
+                f"{int((parents >= 0).sum())} surface(s) spéciale(s) déduite(s)")
+    return areas
+
+
+def prepare_geometry(polylines):
+    """Polygones réparés d'un fichier (un par polyligne, None sans surface) ; None si shapely est absent."""
+    if shapely is None:
+        logger.warning("La bibliothèque Shapely n'est pas disponible : analyses géométriques désactivées")
+        return None
+    return repair_polygons(polylines)
+
+
+def demolition_areas(polylines, classification, geometries):
+    """Surfaces démolies par destination : intersections des polylignes SDP_1 avec les zones GEX_EDS_TA_SDP_CAHIER_DEMO."""
+    logger.info(f"Nombre de polylignes de démolition trouvées: {len(classification['demolition'])}")
+    destinations = classification['destinations']
+    demolition = {destinations[polylines[i].get('layer', '')]: 0.0 for i in classification['main']}
+    if geometries is None:
+        return demolition
+    main = [i for i in classification['main'] if geometries[i] is not None]
+    demo = [i for i in classification['demolition'] if geometries[i] is not None]
+    if not main or not demo:
+        return demolition
+
+    # Paires candidates en une requête STRtree, puis intersections et aires calculées en bloc
+    main_index, demo_index = shapely.STRtree(geometries[demo]).query(geometries[main], predicate='intersects')
+    overlap = shapely.area(shapely.intersection(geometries[main][main_index], geometries[demo][demo_index]))
+    for m, area in zip(main_index.tolist(), overlap.tolist()):
+        if area > 0:
+            demolition[destinations[polylines[main[m]].get('layer', '')]] += area
+    logger.info(f"Démolition : {int((overlap > 0).sum())} intersection(s) avec les zones de démolition")
+    return demolition
+
+
+def plan_diff(existant_polylines, projet_polylines, existant_classification, projet_classification,
+              existant_geometry, projet_geometry):
+    """Comparaison géométrique existant/projet ; None si elle est impossible (shapely absent...)."""
+    destinations = {**existant_classification['destinations'], **projet_classification['destinations']}
+    if existant_geometry is None or projet_geometry is None:
+        return None
+    try:
+        return diff_plans(existant_polylines, projet_polylines,
+                          lambda polyline: destinations.get(polyline.get('layer', '')),
+                          geometries=(existant_geometry, projet_geometry))
+    except Exception as e:
+        logger.warning(f"Comparaison géométrique impossible: {str(e)}")
+        return None
+
+
+def rdv_areas(existant_polylines, projet_polylines, existant_geometry, projet_geometry):
+    """Destinations de la feuille SDP détaillée (noms courts des calques principaux) et surfaces RDV par destination.
+
+    Comme avant l'extraction du moteur, les calques principaux sont ici ceux qui commencent par le préfixe
+    detail_prefix des règles (is_detail_main_layer), et non tous ceux de catégorie 'main'.
+
+    Une surface RDV (calques RDV des règles : LOC_SOC, SANITAIRES...) est comptée pour chaque polyligne
+    principale qu'elle recouvre, les candidates venant d'une seule requête STRtree sur les polygones réparés.
+    """
+    polylines = projet_polylines + existant_polylines
+    main = [i for i, p in enumerate(polylines) if is_detail_main_layer(p.get('layer', ''))]
+    destinations = sorted({destination_name(polylines[i]) for i in main})
+    areas = {}
+    if existant_geometry is None or projet_geometry is None:
+        return {'destinations': destinations, 'rdv': areas}
+    geometries = np.concatenate([projet_geometry, existant_geometry])
+    main = [i for i in main if geometries[i] is not None]
+    rdv = [i for i, p in enumerate(polylines)
+           if geometries[i] is not None and classify_layer(p.get('layer', '')).rdv]
+    if not main or not rdv:
+        return {'destinations': destinations, 'rdv': areas}
+
+    rdv_area = shapely.area(geometries[rdv])
+    main_index, rdv_index = shapely.STRtree(geometries[rdv]).query(geometries[main], predicate='intersects')
+    for m, r in zip(main_index.tolist(), rdv_index.tolist()):
+        name = destination_name(polylines[main[m]])
+        areas[name] = areas.get(name, 0) + float(rdv_area[r])
+    return {'destinations': destinations, 'rdv': areas}
+
+
+for side in ('existant', 'projet'):
+    surface_graph.stage(f'classify_{side}', side)(classify_polylines)
+    surface_graph.stage(f'geometry_{side}', side)(prepare_geometry)
+    surface_graph.stage(f'areas_{side}', side, f'classify_{side}')(destination_areas)
+surface_graph.stage('demolition', 'existant', 'classify_existant', 'geometry_existant')(demolition_areas)
+surface_graph.stage('diff', 'existant', 'projet', 'classify_existant', 'classify_projet',
+                    'geometry_existant', 'geometry_projet')(plan_diff)
+surface_graph.stage('rdv', 'existant', 'projet', 'geometry_existant', 'geometry_projet')(rdv_areas)
+
+
+def compute_surface_results(surfaces):
+    """Calcule les surfaces par destination (existant, projet, démolition, comparaison) à partir des polylignes extraites"""
+    # Analyse détaillée de la structure des données
+    existant_polylines = surfaces.get('existant', {}).get('polylines', [])
+    projet_polylines = surfaces.get('projet', {}).get('polylines', [])
+    
+    logger.info(f"Existant polylines: {len(existant_polylines)}")
+    logger.info(f"Projet polylines: {len(projet_polylines)}")
+    
+    # IMPORTANT: Rappel de l'inversion des fichiers
+    # existant_polylines contient les données du fichier "Projet_demoli_feuille_TA.dxf" (surface existante avant travaux)
+    # projet_polylines contient les données du fichier "Existant_exmple_demoli.dxf" (surface projet)
+    stages = surface_graph.run({'existant': existant_polylines, 'projet': projet_polylines},
+                               ('areas_existant', 'areas_projet', 'demolition', 'diff'))
+    
+    # Structure pour stocker les résultats (copies : les résultats d'étapes sont partagés par le cache)
+    calculation_results = {
+        'existant': dict(stages['areas_existant']),  # Pour les surfaces existantes
+        'projet': dict(stages['areas_projet']),      # Pour les surfaces projet
+        'cree': {},            # Surface créée (B)
+        'cree_changement': {}, # Surface créée par changement de destination
+        'demolie': {},         # Surface démolie reconstruite
+        'supprimee': {},       # Surface supprimée (D)
+        'supprimee_changement': {}, # Surface supprimée par changement de destination
+        'demolition': dict(stages['demolition'])     # Pour les surfaces de démolition par destination
+    }
+    
+    # Comparaison géométrique existant/projet : surfaces créées, supprimées et changements de destination
+    diff = stages['diff']
+    if diff is not None:
+        for key in ('cree', 'cree_changement', 'supprimee', 'supprimee_changement'):
+            calculation_results[key] = dict(diff[key])
+        calculation_results['diff'] = {'elements': dict(diff['elements']), 'changes': list(diff['changes'])}
+    
+    return calculation_results
+
+
+def compute_detail_destinations(surfaces):
+    """Destinations et surfaces RDV de la feuille SDP détaillée, depuis le graphe de calcul partagé."""
+    existant_polylines = surfaces.get('existant', {}).get('polylines', [])
+    projet_polylines = surfaces.get('projet', {}).get('polylines', [])
+    detail = surface_graph.run({'existant': existant_polylines, 'projet': projet_polylines}, ('rdv',))['rdv']
+    return {'destinations': list(detail['destinations']), 'rdv': dict(detail['rdv'])}
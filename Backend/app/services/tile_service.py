@@ -0,0 +1,160 @@
+from app.services import extraction_cache
+from app.services.geometry_format import FLAG_CLOSED, TYPE_CODES, TYPE_NAMES, simplify
+from app.services.metrics_service import span
+from app.services.spatial_index import get_spatial_index
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Taille d'une tuile en pixels : la tolérance de simplification vaut la taille d'un pixel
+TILE_SIZE = 256
+MAX_ZOOM = 24
+# Pyramide précalculée à l'ingestion pour les gros plans (niveaux 0 à PYRAMID_MAX_ZOOM)
+PYRAMID_MAX_ZOOM = 3
+PYRAMID_MIN_ENTITIES = 20000
+MAX_VIEWPORT_PIXELS = 8192
+
+
+def plan_extent(spatial):
+    """Emprise carrée [minx, miny, maxx, maxy] du plan, base de la grille de tuiles.
+
+    L'origine est le coin inférieur gauche : y croît vers le haut comme dans le dessin DXF.
+    """
+    bounds = spatial.bounds
+    valid = ~np.isnan(bounds[:, 0])
+    if not valid.any():
+        return [0.0, 0.0, 1.0, 1.0]
+    minx, miny = float(bounds[valid, 0].min()), float(bounds[valid, 1].min())
+    side = max(float(bounds[valid, 2].max()) - minx, float(bounds[valid, 3].max()) - miny) or 1.0
+    return [minx, miny, minx + side, miny + side]
+
+
+def tile_bbox(extent, z, x, y):
+    size = (extent[2] - extent[0]) / (2 ** z)
+    return [extent[0] + x * size, extent[1] + y * size, extent[0] + (x + 1) * size, extent[1] + (y + 1) * size]
+
+
+def parse_tile_request(params):
+    """Lit une requête de tuile : soit z, x, y, soit bbox ("minx,miny,maxx,maxy") avec resolution
+    (unités du dessin par pixel) ou width (largeur de la vue en pixels). Lève ValueError si invalide.
+    """
+    params = params or {}
+    try:
+        if params.get('bbox') not in (None, ''):
+            bbox = params['bbox']
+            bbox = [float(v) for v in (bbox.split(',') if isinstance(bbox, str) else bbox)]
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise ValueError
+            if params.get('resolution') not in (None, ''):
+                resolution = float(params['resolution'])
+            else:
+                width = min(int(params.get('width') or TILE_SIZE), MAX_VIEWPORT_PIXELS)
+                resolution = (bbox[2] - bbox[0]) / max(width, 1)
+            if resolution < 0:
+                raise ValueError
+            return {'bbox': bbox, 'resolution': resolution}
+        z, x, y = int(params['z']), int(params['x']), int(params['y'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Requête de tuile invalide : z, x et y, ou bbox (minx,miny,maxx,maxy) avec resolution ou width")
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"Tuile hors de la grille : {z}/{x}/{y}")
+    return {'z': z, 'x': x, 'y': y}
+
+
+def _round(values, tolerance):
+    # Pas de décimales au-delà de la précision affichable : réponses JSON plus courtes
+    decimals = max(int(-np.floor(np.log10(tolerance))) + 1, 0) if tolerance > 0 else 6
+    return np.round(values, decimals).tolist()
+
+
+def _entity_feature(geometry, i, tolerance):
+    code = int(geometry.types[i])
+    params = geometry.params[i]
+    feature = {'id': i, 'type': TYPE_NAMES[code], 'layer': geometry.layers[geometry.layer_index[i]],
+               'color': int(geometry.colors[i])}
+    points = geometry.entity_vertices(i)
+    if code in (TYPE_CODES['LWPOLYLINE'], TYPE_CODES['POLYLINE']):
+        closed = bool(geometry.flags[i] & FLAG_CLOSED)
+        simplified = simplify(points, tolerance, closed)
+        feature.update({'closed': closed, 'coords': _round(simplified, tolerance)})
+    elif code == TYPE_CODES['LINE']:
+        feature['coords'] = _round(points, tolerance)
+    elif code in (TYPE_CODES['CIRCLE'], TYPE_CODES['ARC']):
+        feature.update({'center': _round(points[0], tolerance), 'radius': float(params[0])})
+        if code == TYPE_CODES['ARC']:
+            feature.update({'start_angle': float(params[1]), 'end_angle': float(params[2])})
+    else:
+        feature.update({'position': _round(points[0], tolerance), 'height': float(params[0]),
+                        'text': geometry.texts[geometry.aux[i]]})
+    return feature
+
+
+def render_viewport(spatial, bbox, tolerance):
+    """Entités qui intersectent `bbox`, simplifiées à `tolerance` près.
+
+    Les candidates viennent de l'index spatial du plan. Niveau de détail : une entité plus petite
+    qu'un pixel (tolérance) n'est pas rendue ; les polylignes sont simplifiées par Douglas–Peucker.
+    Les entités ne sont pas découpées.
+    """
+    geometry = spatial.geometry
+    bounds = spatial.bounds
+    with span('tile_render'):
+        candidates = spatial.query_bbox(bbox)
+        # Taille à l'écran : plus grande dimension de l'emprise, hauteur pour les textes
+        sizes = np.maximum(bounds[candidates, 2] - bounds[candidates, 0], bounds[candidates, 3] - bounds[candidates, 1])
+        is_text = geometry.types[candidates] == TYPE_CODES['TEXT']
+        sizes[is_text] = geometry.params[candidates[is_text], 0]
+        visible = candidates[sizes >= tolerance]
+        features = [_entity_feature(geometry, i, tolerance) for i in visible.tolist()]
+    return {
+        "bbox": bbox,
+        "tolerance": tolerance,
+        "count": len(features),
+        "skipped": int(len(candidates) - len(visible)),
+        "entities": features,
+    }
+
+
+def _render_tile(spatial, extent, z, x, y):
+    bbox = tile_bbox(extent, z, x, y)
+    tile = render_viewport(spatial, bbox, (bbox[2] - bbox[0]) / TILE_SIZE)
+    return {"z": z, "x": x, "y": y, "extent": extent, **tile}
+
+
+def get_tile(file_path, z=None, x=None, y=None, bbox=None, resolution=None):
+    """Tuile z/x/y d'un plan (mise en cache avec les artefacts d'extraction) ou vue libre bbox + résolution."""
+    spatial = get_spatial_index(file_path)
+    extent = plan_extent(spatial)
+    if bbox is not None:
+        return {"extent": extent, **render_viewport(spatial, bbox, resolution)}
+    return extraction_cache.get_or_compute(file_path, f'tiles/{z}/{x}/{y}',
+                                           lambda path: _render_tile(spatial, extent, z, x, y))
+
+
+def precompute_tile_pyramid(file_path, max_zoom=PYRAMID_MAX_ZOOM, min_entities=PYRAMID_MIN_ENTITIES):
+    """Précalcule les tuiles des niveaux 0 à `max_zoom` d'un gros plan ; retourne le nombre de tuiles calculées.
+
+    Les tuiles entièrement vides ne sont pas enregistrées : elles sont rendues (instantanément) à la demande.
+    """
+    spatial = get_spatial_index(file_path)
+    if spatial.geometry.entity_count < min_entities:
+        return 0
+    extent = plan_extent(spatial)
+    signature = extraction_cache.file_signature(file_path)
+    computed = 0
+    with span('tile_pyramid'):
+        for z in range(max_zoom + 1):
+            for x in range(2 ** z):
+                for y in range(2 ** z):
+                    artifact = f'tiles/{z}/{x}/{y}'
+                    if extraction_cache.get_cached_path(file_path, artifact) is not None:
+                        continue
+                    tile = _render_tile(spatial, extent, z, x, y)
+                    if tile["count"] or tile["skipped"]:
+                        extraction_cache.store(file_path, artifact, tile, signature)
+                        computed += 1
+    if computed:
+        logger.info(f"Pyramide de tuiles de {file_path} : {computed} tuile(s) précalculée(s) (niveaux 0 à {max_zoom})")
+    return computed
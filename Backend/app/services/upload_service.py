@@ -0,0 +1,161 @@
+from flask import Request, current_app, g, has_app_context, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.services import extraction_cache
+from app.services.blob_store import blob_store
+import hashlib
+import os
+import tempfile
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dossier de transit des uploads, sous le dossier Ressources pour que le renommage final reste atomique
+STAGING_DIR_NAME = ".uploads"
+HASH_ALGORITHM = "sha256"
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def staging_dir(resource_dir=None):
+    if resource_dir is None:
+        resource_dir = current_app.config['RESSOURCES_FOLDER']
+    path = os.path.join(resource_dir, STAGING_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class HashingUploadFile:
+    """Fichier temporaire recevant une partie multipart au fil de l'eau.
+
+    Chaque bloc écrit par le parseur de Werkzeug met à jour le hash et la taille ; la taille
+    maximale par fichier est vérifiée à chaque bloc, avant que le fichier complet soit reçu.
+    """
+
+    def __init__(self, directory, max_size=None):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._hash = hashlib.new(HASH_ALGORITHM)
+        self.max_size = max_size
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge(f"Fichier trop volumineux (limite : {self.max_size} octets)")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()
+
+    def detach(self):
+        """Ferme le fichier reçu et le retire du nettoyage de fin de requête ; retourne son chemin."""
+        self._file.close()
+        self.committed = True
+        return self.path
+
+    def discard(self):
+        self._file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell, flush... : délégués au fichier sous-jacent
+        return getattr(self._file, name)
+
+
+class StreamingUploadRequest(Request):
+    """Requête dont les fichiers multipart sont écrits directement dans le dossier de transit."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not has_app_context():
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        config = current_app.config
+        upload = HashingUploadFile(staging_dir(config['RESSOURCES_FOLDER']), config.get('UPLOAD_MAX_FILE_SIZE'))
+        g.setdefault('_staged_uploads', []).append(upload)
+        return upload
+
+
+def save_upload(file, destination):
+    """Enregistre un FileStorage à `destination` et retourne {"path", "size", "sha256", "deduplicated"}.
+
+    Les fichiers reçus par StreamingUploadRequest sont déjà sur disque et hashés ; sinon le contenu
+    est recopié par blocs dans un fichier temporaire du dossier cible, hashé au passage. Le fichier
+    est ensuite rangé dans le stockage adressé par contenu (voir blob_store) et `destination`
+    devient un lien vers ce contenu : un fichier partiel n'y est jamais visible.
+    """
+    stream = file.stream
+    if isinstance(stream, HashingUploadFile):
+        source, size, digest = stream.detach(), stream.size, stream.digest
+    else:
+        digest_state = hashlib.new(HASH_ALGORITHM)
+        size = 0
+        fd, source = tempfile.mkstemp(dir=os.path.dirname(destination) or ".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                for chunk in iter(lambda: stream.read(COPY_BUFFER_SIZE), b""):
+                    size += len(chunk)
+                    digest_state.update(chunk)
+                    target.write(chunk)
+        except BaseException:
+            os.unlink(source)
+            raise
+        digest = digest_state.hexdigest()
+
+    try:
+        deduplicated = place_file(source, digest, destination)
+    except BaseException:
+        if os.path.exists(source):
+            os.unlink(source)
+        raise
+    logger.debug(f"Upload enregistré : {destination} ({size} octets, {HASH_ALGORITHM} {digest})")
+    return {"path": destination, "size": size, HASH_ALGORITHM: digest, "deduplicated": deduplicated}
+
+
+def place_file(source, digest, destination):
+    """Range un fichier reçu et hashé à `destination` via le stockage dédupliqué ; retourne True si déjà stocké."""
+    deduplicated = blob_store.add(source, digest, destination)
+    shared_cache = blob_store.cache_dir(digest) if blob_store.enabled and blob_store.root else None
+    extraction_cache.record_content_hash(destination, digest, shared_cache)
+    return deduplicated
+
+
+def staged_path(file):
+    """Chemin du fichier de transit d'un upload reçu en streaming, sinon None (lecture sans recopie)."""
+    stream = file.stream
+    if isinstance(stream, HashingUploadFile) and not stream.committed:
+        stream.flush()
+        return stream.path
+    return None
+
+
+def _cleanup_staged_uploads(exc=None):
+    for upload in g.pop('_staged_uploads', []):
+        try:
+            upload.discard()
+        except OSError as e:
+            logger.warning(f"Impossible de supprimer le fichier de transit {upload.path}: {str(e)}")
+
+
+def init_uploads(app):
+    """Active la réception des uploads en streaming, les limites de taille et leur erreur JSON (413)."""
+    app.request_class = StreamingUploadRequest
+
+    @app.before_request
+    def _parse_multipart_early():
+        # Analyse le corps avant la vue : un dépassement de taille produit un 413 et non une erreur 500
+        # interceptée par le try/except générique des routes
+        if request.mimetype == 'multipart/form-data':
+            request.files
+
+    app.teardown_request(_cleanup_staged_uploads)
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(e):
+        limit = app.config.get('MAX_CONTENT_LENGTH')
+        if not limit or (request.content_length or 0) <= limit:
+            limit = app.config.get('UPLOAD_MAX_FILE_SIZE')
+        logger.error(f"Upload refusé, taille maximale dépassée ({limit} octets)")
+        return jsonify({"error": "Fichier trop volumineux", "max_size": limit}), 413
@@ -1,8 +1,15 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event
 from app.models.user import User
 from app import db
 from app.models.folder import Folder
+from app.services.folder_sync_service import folder_sync
+from app.services.blob_store import blob_store
 import os
 import shutil
+import threading
+import time
+import uuid
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +19,8 @@ def create_user(nom, prenom, email, password, role):
     user = User(nom=nom, prenom=prenom, email=email, password=password, role=role)
     db.session.add(user)
     db.session.commit()
+    # Un dossier physique peut déjà exister pour cet email
+    folder_sync.mark_user_dirty(email)
     return user
 
 def get_users():
@@ -29,6 +38,7 @@ def update_user(user_id, data):
     old_folder_name = None
     if user.folders:
         old_folder_name = user.folders[0].nom_dossier
+    old_email = user.email
     
     for key, value in data.items():
         if key == 'password' and value == 'unchanged':
@@ -36,7 +46,7 @@ def update_user(user_id, data):
         elif key == 'folderName' and user.folders:
             folder = user.folders[0]
             folder.nom_dossier = value
-            base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Ressources'))
+            base_resource_path = current_app.config['RESSOURCES_FOLDER']
             old_path = os.path.join(base_resource_path, old_folder_name)
             new_path = os.path.join(base_resource_path, value)
             if os.path.exists(old_path) and old_folder_name != value:
@@ -44,6 +54,10 @@ def update_user(user_id, data):
         else:
             setattr(user, key, value)
     db.session.commit()
+    if old_folder_name:
+        folder_sync.mark_dirty(old_folder_name, user.folders[0].nom_dossier if user.folders else None)
+    if user.email != old_email:
+        folder_sync.mark_user_dirty(user.email)
     return user
 
 def delete_user(user_id):
@@ -60,7 +74,7 @@ def delete_user(user_id):
         logger.info(f"Nom du dossier en base de données: {folder_name}")
         
         # Correction du chemin du dossier Ressources
-        base_resource_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Ressources'))
+        base_resource_path = current_app.config['RESSOURCES_FOLDER']
         logger.info(f"Chemin du dossier Ressources: {base_resource_path}")
         
         # Vérifier si le dossier existe directement avec le nom de la base de données
@@ -105,6 +119,7 @@ def delete_user(user_id):
             try:
                 shutil.rmtree(folder_path)
                 logger.info(f"Dossier {folder_path} supprimé avec succès de Ressources.")
+                blob_store.collect_garbage()
             except PermissionError as e:
                 logger.error(f"Permission refusée pour supprimer {folder_path}: {str(e)}")
                 return False
@@ -149,30 +164,141 @@ def authenticate_user(email, password):
         return None
     return None
 
-def get_users_with_folders():
-    users = User.query.filter_by(role='user').all()
-    result = []
-    for user in users:
-        folders = Folder.query.filter_by(id_user=user.id).all()
-        if folders:
-            folder = folders[0]
-            result.append({
-                "user_id": user.id,
-                "nom": user.nom,
-                "prenom": user.prenom,
-                "email": user.email,
-                "folder_id": folder.id,
-                "nom_dossier": folder.nom_dossier,
-                "date_creation": folder.date_creation.isoformat() if folder.date_creation else None
-            })
+# Colonnes autorisées pour le tri du listing admin
+LISTING_SORT_COLUMNS = {
+    "user_id": User.id,
+    "nom": User.nom,
+    "prenom": User.prenom,
+    "email": User.email,
+    "role": User.role,
+    "folder_id": Folder.id,
+    "nom_dossier": Folder.nom_dossier,
+    "date_creation": Folder.date_creation,
+}
+
+# Cache du listing utilisateurs/dossiers, invalidé à chaque écriture sur user ou folder
+_listing_cache = {}
+_listing_cache_lock = threading.Lock()
+
+# Jeton partagé par tous les processus (workers) : fichier du dossier Ressources réécrit à chaque
+# écriture sur user ou folder. Un listing en cache n'est servi que si le jeton n'a pas changé depuis
+# son calcul ; seules les écritures faites hors de l'application attendent l'expiration du TTL.
+LISTING_VERSION_FILE_NAME = ".users_listing_version"
+
+def _listing_version_path():
+    return os.path.join(current_app.config['RESSOURCES_FOLDER'], LISTING_VERSION_FILE_NAME)
+
+def _listing_version():
+    """Jeton courant du listing ('' tant qu'aucune écriture ne l'a créé)."""
+    try:
+        with open(_listing_version_path(), encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+def _bump_listing_version():
+    path = _listing_version_path()
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Jeton du listing utilisateurs non mis à jour : {e}")
+
+def invalidate_users_listing_cache():
+    with _listing_cache_lock:
+        _listing_cache.clear()
+    if has_app_context():
+        _bump_listing_version()
+
+@event.listens_for(db.session, "after_flush")
+def _track_listing_writes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (User, Folder)):
+            session.info["users_listing_dirty"] = True
+            return
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_listing_on_commit(session):
+    if session.info.pop("users_listing_dirty", False):
+        invalidate_users_listing_cache()
+
+@event.listens_for(db.session, "after_rollback")
+def _reset_listing_flag(session):
+    session.info.pop("users_listing_dirty", None)
+
+def get_users_with_folders(role='user', page=None, per_page=None, sort='user_id', order='asc'):
+    """Liste les utilisateurs avec leur dossier en une seule requête (jointure + total par fonction fenêtre).
+
+    Sans `page`, retourne la liste complète ; avec `page`, retourne un dictionnaire
+    paginé {items, total, page, per_page}. Le résultat est servi depuis un cache
+    invalidé à chaque commit touchant les tables user ou folder, dans ce processus comme
+    dans les autres (jeton partagé LISTING_VERSION_FILE_NAME).
+    """
+    if sort not in LISTING_SORT_COLUMNS:
+        raise ValueError(f"Colonne de tri invalide: {sort}")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Ordre de tri invalide: {order}")
+
+    cache_key = (role, page, per_page, sort, order)
+    ttl = current_app.config.get('USERS_LISTING_CACHE_TTL', 30)
+    version = _listing_version()
+    with _listing_cache_lock:
+        cached = _listing_cache.get(cache_key)
+    if cached and cached[1] == version and time.monotonic() - cached[0] < ttl:
+        return cached[2]
+
+    # Un seul dossier par utilisateur (le premier créé), comme l'ancien user.folders[0]
+    first_folder = (
+        db.session.query(Folder.id_user.label("id_user"), db.func.min(Folder.id).label("folder_id"))
+        .group_by(Folder.id_user)
+        .subquery()
+    )
+    query = (
+        db.session.query(
+            User.id, User.nom, User.prenom, User.email,
+            Folder.id, Folder.nom_dossier, Folder.date_creation,
+            db.func.count().over().label("total"),
+        )
+        .outerjoin(first_folder, first_folder.c.id_user == User.id)
+        .outerjoin(Folder, Folder.id == first_folder.c.folder_id)
+    )
+    if role:
+        query = query.filter(User.role == role)
+
+    sort_column = LISTING_SORT_COLUMNS[sort]
+    sort_column = sort_column.desc() if order == 'desc' else sort_column.asc()
+    query = query.order_by(sort_column.nulls_last(), User.id.asc())
+
+    if page:
+        query = query.limit(per_page).offset((page - 1) * per_page)
+
+    rows = query.all()
+    items = [
+        {
+            "user_id": user_id,
+            "nom": nom,
+            "prenom": prenom,
+            "email": email,
+            "folder_id": folder_id,
+            "nom_dossier": nom_dossier,
+            "date_creation": date_creation.isoformat() if date_creation else None
+        }
+        for user_id, nom, prenom, email, folder_id, nom_dossier, date_creation, _ in rows
+    ]
+
+    if page:
+        if rows:
+            total = rows[0].total
         else:
-            result.append({
-                "user_id": user.id,
-                "nom": user.nom,
-                "prenom": user.prenom,
-                "email": user.email,
-                "folder_id": None,
-                "nom_dossier": None,
-                "date_creation": None
-            })
-    return result
\ No newline at end of file
+            # Page hors limites : le total ne peut pas venir de la fonction fenêtre
+            count_query = db.session.query(db.func.count(User.id))
+            total = count_query.filter(User.role == role).scalar() if role else count_query.scalar()
+        result = {"items": items, "total": total, "page": page, "per_page": per_page}
+    else:
+        result = items
+
+    with _listing_cache_lock:
+        _listing_cache[cache_key] = (time.monotonic(), version, result)
+    return result
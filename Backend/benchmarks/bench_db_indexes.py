@@ -0,0 +1,137 @@
+"""Benchmark des recherches sur les tables user/folder avant et après les index.
+
+Compare le schéma initial (sans index secondaires ni contrainte unique sur folder)
+au schéma des modèles actuels (ix_folder_id_user, ix_folder_nom_dossier,
+ix_user_role, uq_folder_id_user_nom_dossier) sur une base SQLite en mémoire.
+
+Usage (depuis Backend/) :
+    python -m benchmarks.bench_db_indexes --users 20000 --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def baseline_metadata():
+    """Schéma tel que produit avant la migration eca879b2b7b0."""
+    metadata = sa.MetaData()
+    sa.Table('user', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('nom', sa.String(50), nullable=False),
+             sa.Column('prenom', sa.String(50), nullable=False),
+             sa.Column('email', sa.String(100), nullable=False, unique=True),
+             sa.Column('password', sa.String(255), nullable=False),
+             sa.Column('role', sa.String(50), nullable=False))
+    sa.Table('folder', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('id_user', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+             sa.Column('nom_dossier', sa.String(100), nullable=False),
+             sa.Column('date_creation', sa.DateTime, nullable=False))
+    return metadata
+
+
+def indexed_metadata():
+    """Schéma des modèles de l'application (avec index)."""
+    from app import db
+    import app.models.user  # noqa: F401 - enregistre la table user
+    import app.models.folder  # noqa: F401 - enregistre la table folder
+    return db.metadata
+
+
+def seed(engine, metadata, users, seed_value):
+    rng = random.Random(seed_value)
+    user_table = metadata.tables['user']
+    folder_table = metadata.tables['folder']
+    now = datetime(2025, 1, 1)
+    user_rows = [
+        {"id": i, "nom": f"Nom{i}", "prenom": f"Prenom{i}", "email": f"user.{i}@example.com",
+         "password": "x", "role": "admin" if rng.random() < 0.02 else "user"}
+        for i in range(1, users + 1)
+    ]
+    folder_rows = [
+        {"id": i, "id_user": i, "nom_dossier": f"user_{i}", "date_creation": now}
+        for i in range(1, users + 1)
+    ]
+    with engine.begin() as conn:
+        conn.execute(user_table.insert(), user_rows)
+        conn.execute(folder_table.insert(), folder_rows)
+
+
+def time_query(engine, statement_factory, repeat, rng):
+    durations = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            statement, params = statement_factory(rng)
+            started = time.perf_counter()
+            conn.execute(statement, params).fetchall()
+            durations.append(time.perf_counter() - started)
+    durations.sort()
+    return {
+        "median_ms": statistics.median(durations) * 1000,
+        "p95_ms": durations[int(len(durations) * 0.95) - 1] * 1000,
+    }
+
+
+def run_schema(label, metadata, users, repeat):
+    engine = sa.create_engine("sqlite://", poolclass=StaticPool)
+    metadata.create_all(engine)
+    seed(engine, metadata, users, seed_value=42)
+
+    user_table = metadata.tables['user']
+    folder_table = metadata.tables['folder']
+    lookups = {
+        "folder_by_id_user": lambda rng: (
+            sa.select(folder_table).where(folder_table.c.id_user == sa.bindparam('v')),
+            {"v": rng.randint(1, users)}),
+        "folder_by_nom_dossier": lambda rng: (
+            sa.select(folder_table).where(folder_table.c.nom_dossier == sa.bindparam('v')),
+            {"v": f"user_{rng.randint(1, users)}"}),
+        "folder_by_user_and_name": lambda rng: (
+            sa.select(folder_table).where(folder_table.c.id_user == sa.bindparam('u'),
+                                          folder_table.c.nom_dossier == sa.bindparam('v')),
+            {"u": rng.randint(1, users), "v": f"user_{rng.randint(1, users)}"}),
+        "users_by_role_admin": lambda rng: (
+            sa.select(user_table.c.id).where(user_table.c.role == sa.bindparam('v')),
+            {"v": "admin"}),
+    }
+
+    results = {}
+    for name, factory in lookups.items():
+        results[name] = time_query(engine, factory, repeat, random.Random(7))
+    engine.dispose()
+    return label, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args(argv)
+
+    before = run_schema("avant", baseline_metadata(), args.users, args.repeat)[1]
+    after = run_schema("après", indexed_metadata(), args.users, args.repeat)[1]
+
+    print(f"{'Recherche':<28}{'avant (ms)':>12}{'après (ms)':>12}{'gain':>10}")
+    for name in before:
+        b = before[name]["median_ms"]
+        a = after[name]["median_ms"]
+        print(f"{name:<28}{b:>12.3f}{a:>12.3f}{b / a if a else float('inf'):>9.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"users": args.users, "repeat": args.repeat, "before": before, "after": after}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
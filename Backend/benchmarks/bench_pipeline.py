@@ -0,0 +1,222 @@
+"""Benchmark de la chaîne extraction DXF → calcul des surfaces → rapports.
+
+Pour chaque taille de plan synthétique (voir benchmarks.dxf_generator), mesure :
+  - extract_file_data        : lecture et extraction des entités DXF
+  - extract_surface_profile  : même extraction limitée au profil "surface"
+  - summarize_dxf            : résumé statistique (mode "summary", hors cache)
+  - compute_surface_results  : calcul géométrique de /generate-excel-file
+  - create_excel_document    : génération du classeur Excel détaillé
+  - generate_visa_content    : génération du rapport visa
+avec la durée (médiane, min, p95), le débit (polylignes/s, sommets/s) et le pic
+mémoire (tracemalloc, mesuré sur une exécution séparée).
+
+Les résultats sont écrits en JSON ; --compare signale les régressions par
+rapport à un fichier de résultats précédent.
+
+Usage (depuis Backend/) :
+    python -m benchmarks.bench_pipeline --sizes 200x8,2000x16 --repeat 5 --json benchmarks/results/run.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/run.json
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.datastructures import FileStorage
+
+from app.services.file_service import EXTRACTION_PROFILES, extract_file_data, summarize_dxf
+from benchmarks.dxf_generator import generate_dxf
+
+FLOOR_NAME = "R+1"
+
+
+def build_surfaces_payload(existant_data, projet_data):
+    """Reproduit la structure `surfaces` envoyée par le frontend (CalculSurface.jsx)."""
+    def section(data):
+        return {
+            "surface": 0,
+            "details": {"polylines": len(data["polylines"]), "circles": len(data["circles"])},
+            "polylines": data["polylines"],
+        }
+    return {"projet": section(projet_data), "existant": section(existant_data), "difference": 0}
+
+
+def _file_storage(content, filename):
+    return FileStorage(stream=io.BytesIO(content), filename=filename, content_type="application/octet-stream")
+
+
+def measure(func, repeat):
+    """Exécute `func` une fois pour l'échauffement puis `repeat` fois ; retourne les durées triées."""
+    func()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return durations
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_size(folder_service, polylines, vertices, repeat, workdir, noise=0):
+    existant_path = generate_dxf(os.path.join(workdir, f"existant_{polylines}x{vertices}.dxf"), polylines, vertices,
+                                 seed=1, noise=noise)
+    projet_path = generate_dxf(os.path.join(workdir, f"projet_{polylines}x{vertices}.dxf"), polylines, vertices,
+                               seed=2, noise=noise)
+    with open(existant_path, "rb") as f:
+        existant_bytes = f.read()
+    with open(projet_path, "rb") as f:
+        projet_bytes = f.read()
+
+    existant_data = extract_file_data(_file_storage(existant_bytes, "existant.dxf"))
+    projet_data = extract_file_data(_file_storage(projet_bytes, "projet.dxf"))
+    if "error" in existant_data or "error" in projet_data:
+        raise RuntimeError(existant_data.get("error") or projet_data.get("error"))
+    surfaces = build_surfaces_payload(existant_data, projet_data)
+    excel_path = os.path.join(workdir, "bench.xlsx")
+
+    total_vertices = sum(len(p["vertices"]) for p in existant_data["polylines"])
+    stages = {
+        "extract_file_data": (
+            lambda: extract_file_data(_file_storage(existant_bytes, "existant.dxf")),
+            len(existant_data["polylines"]), total_vertices),
+        "extract_surface_profile": (
+            lambda: extract_file_data(_file_storage(existant_bytes, "existant.dxf"),
+                                      **EXTRACTION_PROFILES["surface"]),
+            len(existant_data["polylines"]), total_vertices),
+        "summarize_dxf": (
+            lambda: summarize_dxf(existant_path),
+            len(existant_data["polylines"]), total_vertices),
+        "compute_surface_results": (
+            lambda: folder_service.compute_surface_results(surfaces),
+            len(existant_data["polylines"]) + len(projet_data["polylines"]), None),
+        "create_excel_document": (
+            lambda: folder_service.create_excel_document(excel_path, surfaces, FLOOR_NAME),
+            len(existant_data["polylines"]) + len(projet_data["polylines"]), None),
+        "generate_visa_content": (
+            lambda: folder_service.generate_visa_content(surfaces, FLOOR_NAME),
+            len(projet_data["polylines"]), None),
+    }
+
+    results = {"dxf_bytes": len(existant_bytes)}
+    for name, (func, polyline_count, vertex_count) in stages.items():
+        durations = measure(func, repeat)
+        median = statistics.median(durations)
+        stage = {
+            "median_s": median,
+            "min_s": durations[0],
+            "p95_s": durations[max(int(len(durations) * 0.95) - 1, 0)],
+            "polylines": polyline_count,
+            "polylines_per_s": polyline_count / median if median else None,
+            "peak_memory_bytes": peak_memory(func),
+        }
+        if vertex_count is not None:
+            stage["vertices_per_s"] = vertex_count / median if median else None
+        results[name] = stage
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, threshold):
+    """Affiche l'évolution des médianes ; retourne le nombre de régressions au-delà du seuil."""
+    regressions = 0
+    print(f"\n{'Taille':<12}{'Étape':<26}{'avant (ms)':>12}{'après (ms)':>12}{'écart':>9}")
+    for size, stages in current["results"].items():
+        for name, stage in stages.items():
+            if not isinstance(stage, dict):
+                continue
+            before = previous.get("results", {}).get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = stage["median_s"] / before["median_s"] - 1 if before["median_s"] else 0.0
+            flag = "  RÉGRESSION" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(f"{size:<12}{name:<26}{before['median_s'] * 1000:>12.2f}{stage['median_s'] * 1000:>12.2f}"
+                  f"{ratio * 100:>+8.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="200x8,1000x16",
+                        help="Tailles des plans, au format POLYLIGNESxSOMMETS séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--noise", type=int, default=0,
+                        help="Entités d'habillage hors GEX_EDS_* ajoutées à chaque plan")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--compare", help="Fichier JSON d'une exécution précédente à comparer")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Écart relatif de la médiane au-delà duquel une étape est signalée")
+    parser.add_argument("--log-level", default="ERROR",
+                        help="Niveau de journalisation de l'application pendant les mesures")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("FOLDER_SYNC_ENABLED", "false")
+    import folder_service
+    # Les journaux INFO de l'application fausseraient les mesures : on ne garde que le niveau demandé
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes.split(",") if size]
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "noise": args.noise,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="gex_bench_") as workdir:
+        for polylines, vertices in sizes:
+            key = f"{polylines}x{vertices}"
+            report["results"][key] = run_size(folder_service, polylines, vertices, args.repeat, workdir, args.noise)
+
+    print(f"{'Taille':<12}{'Étape':<26}{'médiane (ms)':>14}{'polylignes/s':>14}{'pic mémoire (Mo)':>18}")
+    for key, stages in report["results"].items():
+        for name, stage in stages.items():
+            if isinstance(stage, dict):
+                print(f"{key:<12}{name:<26}{stage['median_s'] * 1000:>14.2f}{stage['polylines_per_s'] or 0:>14.0f}"
+                      f"{stage['peak_memory_bytes'] / 1e6:>18.2f}")
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        exit_code = 1 if compare(previous, report, args.threshold) else 0
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
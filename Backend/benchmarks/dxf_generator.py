@@ -0,0 +1,144 @@
+"""Générateur de fichiers DXF synthétiques pour les benchmarks.
+
+Produit des plans reproductibles (graine fixe) composés de LWPOLYLINE fermées
+réparties sur les calques utilisés par le calcul de surfaces :
+GEX_EDS_SDP_1-* (destinations), GEX_EDS_SDP_2..7 (surfaces à déduire),
+GEX_EDS_TA_SDP_CAHIER_DEMO (démolition) et LOC_SOC / SANITAIRES (RDV).
+
+Usage (depuis Backend/) :
+    python -m benchmarks.dxf_generator plan.dxf --polylines 2000 --vertices 16
+"""
+import argparse
+import random
+
+import ezdxf
+
+DESTINATION_LAYERS = [
+    "GEX_EDS_SDP_1-HABITATION_L",
+    "GEX_EDS_SDP_1-HABITATION_H",
+    "GEX_EDS_SDP_1-COMMERCE_RES",
+    "GEX_EDS_SDP_1-COMMERCE_ART",
+    "GEX_EDS_SDP_1-AUTRE_BUREAU",
+    "GEX_EDS_SDP_1-SPIC_ENSEIGN",
+    "GEX_EDS_SDP_1-EXPLOITATIO0",
+]
+SPECIAL_LAYERS = [
+    "GEX_EDS_SDP_2-TREMIE",
+    "GEX_EDS_SDP_3-H-180",
+    "GEX_EDS_SDP_4-COMBLES",
+    "GEX_EDS_SDP_5-PK",
+    "GEX_EDS_SDP_6-CAVE",
+    "GEX_EDS_SDP_7-LT",
+]
+DEMOLITION_LAYER = "GEX_EDS_TA_SDP_CAHIER_DEMO"
+RDV_LAYERS = ["GEX_EDS_RDV_LOC_SOC", "GEX_EDS_RDV_SANITAIRES"]
+# Calques d'habillage (cotations, mobilier, textes) présents sur les plans réels mais inutiles au calcul
+NOISE_LAYERS = ["0", "COTATION", "MOBILIER", "TEXTE", "HACHURES"]
+
+# Répartition par défaut des polylignes entre les familles de calques
+DEFAULT_LAYER_MIX = {"destination": 0.5, "special": 0.25, "demolition": 0.1, "rdv": 0.15}
+
+CELL_SIZE = 12.0
+ROOM_SIZE = 10.0
+
+
+def _rectangle(x, y, width, height, vertices):
+    """Rectangle dont les côtés sont subdivisés pour atteindre le nombre de sommets demandé."""
+    vertices = max(int(vertices), 4)
+    corners = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+    per_side = [vertices // 4 + (1 if i < vertices % 4 else 0) for i in range(4)]
+    points = []
+    for side, count in enumerate(per_side):
+        (x0, y0), (x1, y1) = corners[side], corners[(side + 1) % 4]
+        for k in range(count):
+            t = k / count
+            points.append((x0 + (x1 - x0) * t, y0 + (y1 - y0) * t))
+    return points
+
+
+def _counts(polylines, layer_mix):
+    total_weight = sum(layer_mix.values())
+    counts = {name: int(polylines * weight / total_weight) for name, weight in layer_mix.items()}
+    counts["destination"] = max(counts.get("destination", 0) + polylines - sum(counts.values()), 1)
+    return counts
+
+
+def build_document(polylines=500, vertices=8, layer_mix=None, seed=42, noise=0):
+    """Construit un document ezdxf en mémoire contenant `polylines` LWPOLYLINE fermées.
+
+    `noise` ajoute autant d'entités d'habillage (LINE, TEXT, CIRCLE, ARC, polylignes ouvertes)
+    sur des calques hors GEX_EDS_*, pour reproduire la composition d'un plan réel.
+    """
+    rng = random.Random(seed)
+    counts = _counts(polylines, layer_mix or DEFAULT_LAYER_MIX)
+
+    doc = ezdxf.new("R2010")
+    for name in DESTINATION_LAYERS + SPECIAL_LAYERS + [DEMOLITION_LAYER] + RDV_LAYERS + NOISE_LAYERS[1:]:
+        doc.layers.add(name)
+    msp = doc.modelspace()
+
+    columns = max(int(counts["destination"] ** 0.5), 1)
+    rooms = []
+    for i in range(counts["destination"]):
+        x = (i % columns) * CELL_SIZE
+        y = (i // columns) * CELL_SIZE
+        rooms.append((x, y))
+        layer = DESTINATION_LAYERS[i % len(DESTINATION_LAYERS)]
+        msp.add_lwpolyline(_rectangle(x, y, ROOM_SIZE, ROOM_SIZE, vertices), close=True, dxfattribs={"layer": layer})
+
+    def inner_shape(layer, scale):
+        x, y = rng.choice(rooms)
+        size = ROOM_SIZE * scale * rng.uniform(0.5, 1.0)
+        offset_x = rng.uniform(0.5, ROOM_SIZE - size - 0.5)
+        offset_y = rng.uniform(0.5, ROOM_SIZE - size - 0.5)
+        msp.add_lwpolyline(_rectangle(x + offset_x, y + offset_y, size, size, vertices), close=True,
+                           dxfattribs={"layer": layer})
+
+    for i in range(counts.get("special", 0)):
+        inner_shape(SPECIAL_LAYERS[i % len(SPECIAL_LAYERS)], 0.3)
+    for i in range(counts.get("rdv", 0)):
+        inner_shape(RDV_LAYERS[i % len(RDV_LAYERS)], 0.25)
+    for _ in range(counts.get("demolition", 0)):
+        # Zone de démolition à cheval sur une pièce pour produire des intersections partielles
+        x, y = rng.choice(rooms)
+        msp.add_lwpolyline(_rectangle(x + ROOM_SIZE / 2, y - 1.0, ROOM_SIZE, ROOM_SIZE / 2, vertices), close=True,
+                           dxfattribs={"layer": DEMOLITION_LAYER})
+
+    for i in range(noise):
+        x, y = rng.choice(rooms)
+        x, y = x + rng.uniform(0, ROOM_SIZE), y + rng.uniform(0, ROOM_SIZE)
+        attribs = {"layer": NOISE_LAYERS[i % len(NOISE_LAYERS)]}
+        kind = i % 5
+        if kind == 0:
+            msp.add_line((x, y), (x + 1.0, y + 0.5), dxfattribs=attribs)
+        elif kind == 1:
+            msp.add_text(f"T{i}", dxfattribs={**attribs, "insert": (x, y), "height": 0.2})
+        elif kind == 2:
+            msp.add_circle((x, y), 0.3, dxfattribs=attribs)
+        elif kind == 3:
+            msp.add_arc((x, y), 0.5, 0, 90, dxfattribs=attribs)
+        else:
+            msp.add_lwpolyline([(x, y), (x + 1.0, y), (x + 1.0, y + 1.0)], dxfattribs=attribs)
+    return doc
+
+
+def generate_dxf(path, polylines=500, vertices=8, layer_mix=None, seed=42, noise=0):
+    """Écrit un plan synthétique dans `path` et retourne le chemin."""
+    build_document(polylines, vertices, layer_mix, seed, noise).saveas(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--polylines", type=int, default=500)
+    parser.add_argument("--vertices", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--noise", type=int, default=0, help="Entités d'habillage hors calques GEX_EDS_*")
+    args = parser.parse_args(argv)
+    generate_dxf(args.output, args.polylines, args.vertices, seed=args.seed, noise=args.noise)
+    print(f"{args.output}: {args.polylines} polylignes de {args.vertices} sommets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Test de charge HTTP de l'API principale (create_app) et de folder_service.
+
+Démarre les deux applications sur des serveurs WSGI locaux multi-threads, avec une
+base SQLite temporaire (ou --database-url vers un Postgres local, dont les tables sont
+supprimées puis recréées : --reset-database est alors obligatoire) et un dossier
+Ressources temporaire. Crée N utilisateurs, leurs dossiers et des plans DXF
+synthétiques, puis envoie un mélange pondéré de requêtes réalistes :
+  - login    : POST /api/auth/login
+  - files    : GET  /api/user-folder/files
+  - extract  : POST /api/user-folder/extract-data-from-file
+  - excel    : POST /generate-excel-file (folder_service)
+  - listing  : GET  /api/users/users-with-folders (pagination admin)
+Rapporte p50/p95/p99 et le débit (req/s) par endpoint, optionnellement en JSON.
+
+Usage (depuis Backend/) :
+    python -m benchmarks.load_test --users 50 --concurrency 16 --duration 30 --json benchmarks/results/load.json
+    python -m benchmarks.load_test --mix login=1,files=6,extract=2,excel=1,listing=2
+"""
+import argparse
+import datetime
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.dxf_generator import generate_dxf
+
+DEFAULT_MIX = "login=1,files=5,extract=3,excel=1,listing=1"
+PASSWORD = "load-test-password"
+PROJECT_FOLDER = "M1"
+
+
+def percentile(sorted_values, ratio):
+    """Percentile par rang le plus proche sur une liste triée."""
+    if not sorted_values:
+        return None
+    index = min(max(math.ceil(ratio * len(sorted_values)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ServerThread(threading.Thread):
+    """Serveur WSGI multi-thread exécuté en arrière-plan sur un port libre."""
+
+    def __init__(self, wsgi_app):
+        super().__init__(daemon=True)
+        self.server = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def run(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+
+
+def temporary_database_uri(workdir):
+    """Base SQLite jetable du test, supprimée avec le dossier de travail."""
+    return "sqlite:///" + os.path.join(workdir, "load_test.db")
+
+
+def configure_environment(workdir, args):
+    """Variables lues à l'import de config.py et de folder_service.py : à définir avant tout import."""
+    os.environ["RESSOURCES_FOLDER"] = os.path.join(workdir, "Ressources")
+    os.environ["FOLDER_SYNC_ENABLED"] = "true" if args.folder_sync else "false"
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.pop("DB_PROFILE", None)
+    else:
+        os.environ["DB_PROFILE"] = "sqlite"
+        os.environ["SQLITE_DATABASE_URL"] = temporary_database_uri(workdir)
+    os.makedirs(os.environ["RESSOURCES_FOLDER"], exist_ok=True)
+
+
+def seed(api_app, users, polylines, vertices, workdir, reset_database=False):
+    """Crée l'admin, les utilisateurs, leurs dossiers Ressources et deux plans DXF par utilisateur.
+
+    Les tables ne sont supprimées que pour la base SQLite temporaire du test, ou si
+    `reset_database` est explicitement demandé pour une autre base.
+    """
+    from app import db
+    from app.models.user import User
+    from app.models.folder import Folder
+
+    existant_path = generate_dxf(os.path.join(workdir, "existant.dxf"), polylines, vertices, seed=1)
+    projet_path = generate_dxf(os.path.join(workdir, "projet.dxf"), polylines, vertices, seed=2)
+    resource_dir = api_app.config["RESSOURCES_FOLDER"]
+
+    accounts = []
+    database_uri = api_app.config["SQLALCHEMY_DATABASE_URI"]
+    if database_uri != temporary_database_uri(workdir) and not reset_database:
+        raise RuntimeError(f"Refus de vider la base {database_uri} : utiliser --reset-database pour confirmer")
+    with api_app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin = User("Admin", "Charge", "load.admin@example.com", PASSWORD, "admin")
+        db.session.add(admin)
+        for i in range(users):
+            email = f"load.user{i}@example.com"
+            user = User(f"Nom{i}", f"Prenom{i}", email, PASSWORD, "user")
+            db.session.add(user)
+            db.session.flush()
+            folder_name = email.split("@")[0]
+            db.session.add(Folder(user.id, folder_name, datetime.datetime.now()))
+
+            project_dir = os.path.join(resource_dir, folder_name, PROJECT_FOLDER)
+            os.makedirs(project_dir, exist_ok=True)
+            for source in (existant_path, projet_path):
+                target = os.path.join(project_dir, os.path.basename(source))
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copyfile(source, target)
+            accounts.append(email)
+        db.session.commit()
+    return accounts, existant_path, projet_path
+
+
+def build_surfaces(existant_path, projet_path):
+    """Charge utile /generate-excel-file identique à celle construite par le frontend."""
+    from app.services.file_service import extract_dxf_data
+    from benchmarks.bench_pipeline import build_surfaces_payload
+    return build_surfaces_payload(extract_dxf_data(existant_path), extract_dxf_data(projet_path))
+
+
+class LoadRunner:
+    """Exécute le mélange de requêtes et collecte les latences par endpoint."""
+
+    def __init__(self, api_url, folder_url, accounts, surfaces, mix, seed_value):
+        self.api_url = api_url
+        self.folder_url = folder_url
+        self.accounts = accounts
+        self.surfaces = surfaces
+        self.actions = list(mix.keys())
+        self.weights = list(mix.values())
+        self.seed_value = seed_value
+        self.tokens = {}
+        self.admin_token = None
+        self.samples = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def login(self, email):
+        response = self.session().post(f"{self.api_url}/api/auth/login", json={"email": email, "password": PASSWORD})
+        if response.status_code == 200:
+            self.tokens[email] = response.json()["access_token"]
+        return response
+
+    def token(self, email):
+        if email not in self.tokens:
+            self.login(email)
+        return self.tokens.get(email, "")
+
+    def request(self, action, email):
+        session = self.session()
+        if action == "login":
+            return self.login(email)
+        if action == "files":
+            return session.get(f"{self.api_url}/api/user-folder/files",
+                               headers={"Authorization": f"Bearer {self.token(email)}"})
+        if action == "extract":
+            return session.post(f"{self.api_url}/api/user-folder/extract-data-from-file",
+                                json={"filename": "projet.dxf", "folder": PROJECT_FOLDER},
+                                headers={"Authorization": f"Bearer {self.token(email)}"})
+        if action == "excel":
+            return session.post(f"{self.folder_url}/generate-excel-file", json={
+                "email": email, "surfaces": self.surfaces, "floorName": "R+1", "folderPath": PROJECT_FOLDER})
+        if action == "listing":
+            if self.admin_token is None:
+                self.login("load.admin@example.com")
+                self.admin_token = self.tokens.get("load.admin@example.com", "")
+            return session.get(f"{self.api_url}/api/users/users-with-folders", params={"page": 1, "per_page": 50},
+                               headers={"Authorization": f"Bearer {self.admin_token}"})
+        raise ValueError(f"Action inconnue: {action}")
+
+    def worker(self, worker_id, deadline, budget):
+        rng = random.Random(self.seed_value + worker_id)
+        while time.perf_counter() < deadline and budget.acquire(blocking=False):
+            action = rng.choices(self.actions, self.weights)[0]
+            email = rng.choice(self.accounts)
+            started = time.perf_counter()
+            try:
+                status = self.request(action, email).status_code
+            except requests.RequestException:
+                status = None
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.samples.append((action, duration, status))
+
+    def run(self, concurrency, duration, max_requests):
+        budget = threading.Semaphore(max_requests if max_requests else 2 ** 31 - 1)
+        started = time.perf_counter()
+        deadline = started + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(self.worker, i, deadline, budget) for i in range(concurrency)]:
+                future.result()
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        by_action = {}
+        for action, duration, status in self.samples:
+            by_action.setdefault(action, []).append((duration, status))
+        by_action["total"] = [(duration, status) for _, duration, status in self.samples]
+
+        results = {}
+        for action, samples in by_action.items():
+            durations = sorted(d for d, _ in samples)
+            results[action] = {
+                "requests": len(samples),
+                "errors": sum(1 for _, status in samples if status is None or status >= 400),
+                "rps": len(samples) / elapsed if elapsed else None,
+                "p50_ms": percentile(durations, 0.50) * 1000,
+                "p95_ms": percentile(durations, 0.95) * 1000,
+                "p99_ms": percentile(durations, 0.99) * 1000,
+            }
+        return results
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if float(weight or 0) > 0:
+            mix[name.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Nombre d'utilisateurs créés")
+    parser.add_argument("--concurrency", type=int, default=8, help="Nombre de clients simultanés")
+    parser.add_argument("--duration", type=float, default=20.0, help="Durée maximale du test (secondes)")
+    parser.add_argument("--requests", type=int, default=0, help="Nombre maximal de requêtes (0 = illimité)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pondération des actions, ex. login=1,files=5")
+    parser.add_argument("--polylines", type=int, default=200, help="Polylignes par plan DXF")
+    parser.add_argument("--vertices", type=int, default=8, help="Sommets par polyligne")
+    parser.add_argument("--database-url", help="Base à utiliser à la place du SQLite temporaire (ex. Postgres local)")
+    parser.add_argument("--reset-database", action="store_true",
+                        help="Autorise la suppression des tables de --database-url avant le test (données perdues)")
+    parser.add_argument("--no-folder-sync", dest="folder_sync", action="store_false",
+                        help="Désactive la synchronisation dossiers/base pendant le test")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--log-level", default="ERROR",
+                        help="Niveau de journalisation des applications pendant le test")
+    args = parser.parse_args(argv)
+    if args.database_url and not args.reset_database:
+        parser.error("--database-url : les tables de cette base sont supprimées, ajouter --reset-database pour confirmer")
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix="gex_load_")
+    try:
+        configure_environment(workdir, args)
+        from app import create_app
+        import folder_service
+        logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+        api_app = create_app()
+        accounts, existant_path, projet_path = seed(api_app, args.users, args.polylines, args.vertices, workdir,
+                                                    reset_database=args.reset_database)
+        surfaces = build_surfaces(existant_path, projet_path)
+
+        api_server = ServerThread(api_app)
+        folder_server = ServerThread(folder_service.app)
+        api_server.start()
+        folder_server.start()
+        try:
+            runner = LoadRunner(api_server.base_url, folder_server.base_url, accounts, surfaces, mix, args.seed)
+            elapsed = runner.run(args.concurrency, args.duration, args.requests)
+        finally:
+            api_server.shutdown()
+            folder_server.shutdown()
+            sync = api_app.extensions.get("folder_sync")
+            if sync is not None:
+                sync.stop()
+        results = runner.report(elapsed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'Endpoint':<10}{'requêtes':>10}{'erreurs':>9}{'req/s':>9}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+    for action, stats in results.items():
+        print(f"{action:<10}{stats['requests']:>10}{stats['errors']:>9}{stats['rps']:>9.1f}"
+              f"{stats['p50_ms']:>11.1f}{stats['p95_ms']:>11.1f}{stats['p99_ms']:>11.1f}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "database": "custom" if args.database_url else "sqlite",
+                "users": args.users,
+                "concurrency": args.concurrency,
+                "elapsed_s": elapsed,
+                "mix": mix,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,73 @@
 import os
+import logging
 from datetime import timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+def get_database_uri():
+    """Retourne l'URI de la base : DATABASE_URL, ou SQLite local (profil DB_PROFILE=sqlite ou URL absente).
+
+    Le dossier de la base SQLite est créé par l'application (create_app), pas à l'import.
+    """
+    database_url = os.getenv("DATABASE_URL")
+    sqlite_profile = os.getenv("DB_PROFILE", "").lower() == "sqlite"
+    if sqlite_profile or not database_url:
+        if not sqlite_profile:
+            logger.warning("DATABASE_URL non définie : utilisation de la base SQLite locale")
+        return os.getenv("SQLITE_DATABASE_URL", "sqlite:///" + os.path.join(BASE_DIR, "instance", "local.db"))
+    return database_url
+
+def ensure_sqlite_directory(database_uri):
+    """Crée le dossier d'une base SQLite sur disque s'il n'existe pas (sans effet pour les autres moteurs)."""
+    if not database_uri.startswith("sqlite"):
+        return
+    from sqlalchemy.engine import make_url
+    database = make_url(database_uri).database
+    if database and database != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+
+def build_engine_options(database_uri):
+    """Profil de moteur SQLAlchemy : pool dimensionné pour Postgres, options minimales pour SQLite."""
+    if database_uri.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if database_uri in ("sqlite://", "sqlite:///:memory:"):
+            # Une base en mémoire n'existe que sur une seule connexion
+            from sqlalchemy.pool import StaticPool
+            options["poolclass"] = StaticPool
+        return options
+
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+        # LIFO : les connexions inutilisées restent au fond du pool et sont recyclées
+        "pool_use_lifo": True,
+    }
+    if database_uri.startswith("postgresql"):
+        statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+        idle_timeout = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", "60000"))
+        options["connect_args"] = {
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+            "application_name": os.getenv("DB_APPLICATION_NAME", "gex16-backend"),
+            "options": f"-c statement_timeout={statement_timeout} -c idle_in_transaction_session_timeout={idle_timeout}",
+        }
+    return options
+
 class Config:
     # Database
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    SQLALCHEMY_DATABASE_URI = get_database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Application
@@ -25,7 +86,50 @@ class Config:
     CORS_HEADERS = 'Content-Type'
 
     # Configuration du dossier des ressources
-    RESSOURCES_FOLDER = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-    "Ressources"
-)
+    RESSOURCES_FOLDER = os.getenv(
+        "RESSOURCES_FOLDER",
+        os.path.join(BASE_DIR, "app", "Ressources")
+    )
+
+    # Synchronisation incrémentale dossiers physiques <-> table folder
+    FOLDER_SYNC_ENABLED = env_bool("FOLDER_SYNC_ENABLED", True)
+    FOLDER_SYNC_POLL_INTERVAL = float(os.getenv("FOLDER_SYNC_POLL_INTERVAL", "2.0"))
+    FOLDER_SYNC_DEBOUNCE = float(os.getenv("FOLDER_SYNC_DEBOUNCE", "0.2"))
+
+    # Instrumentation et profilage à la demande (en-tête X-Profile: 1 ou ?_profile=1) : les variables
+    # PROFILING_* sont lues par metrics_service (PROFILING_DEFAULTS), pour l'API comme pour folder_service
+    # /metrics (sans JWT, pour Prometheus) n'est servie qu'aux réseaux listés, séparés par des virgules
+    METRICS_ALLOWED_NETWORKS = os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.0/8,::1")
+
+    # Uploads : corps de requête et taille par fichier maximaux (octets), vérifiés pendant la réception
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(512 * 1024 * 1024)))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", str(256 * 1024 * 1024)))
+    # Uploads reprenables (/api/uploads) : taille de morceau par défaut et durée de vie des sessions inactives
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+
+    # Compression des réponses (gzip, zstd et brotli si installés) et des corps de requête acceptés
+    COMPRESSION_ENABLED = env_bool("COMPRESSION_ENABLED", True)
+    COMPRESSION_ALGORITHMS = os.getenv("COMPRESSION_ALGORITHMS", "zstd,br,gzip")
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    COMPRESSION_BROTLI_LEVEL = int(os.getenv("COMPRESSION_BROTLI_LEVEL", "4"))
+
+    # Stockage des plans adressé par contenu : une copie par contenu, liens physiques dans les dossiers
+    DEDUP_ENABLED = env_bool("DEDUP_ENABLED", True)
+
+    # Précalcul en arrière-plan des extractions DXF après upload (cache d'extraction)
+    INGEST_ENABLED = env_bool("INGEST_ENABLED", True)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_ARTIFACTS = os.getenv("INGEST_ARTIFACTS", "")
+    # Pyramide de tuiles précalculée à l'ingestion pour les plans d'au moins N entités (-1 : désactivée)
+    TILE_PYRAMID_MAX_ZOOM = int(os.getenv("TILE_PYRAMID_MAX_ZOOM", "3"))
+    TILE_PYRAMID_MIN_ENTITIES = int(os.getenv("TILE_PYRAMID_MIN_ENTITIES", "20000"))
+
+    # Fichier de règles des calques SDP (JSON, ou YAML si PyYAML est installé) ; vide : app/rules/layer_rules.json
+    LAYER_RULES_FILE = os.getenv("LAYER_RULES_FILE", "")
+
+    # Listing admin utilisateurs/dossiers ; le TTL ne borne que la prise en compte des écritures faites hors de l'application
+    USERS_LISTING_CACHE_TTL = float(os.getenv("USERS_LISTING_CACHE_TTL", "30"))
+    USERS_LISTING_MAX_PER_PAGE = int(os.getenv("USERS_LISTING_MAX_PER_PAGE", "500"))
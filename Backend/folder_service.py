@@ -3,25 +3,36 @@ import logging
 import json
 import datetime
 import shutil
-import tempfile
-import ezdxf
 import requests
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.comments import Comment
 from werkzeug.utils import secure_filename
-from werkzeug.datastructures import FileStorage
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-import io
 import math
+from app.services.metrics_service import init_metrics, registry, span
+from app.services.file_service import get_file_data, parse_extraction_filters, get_file_summary, get_cached_summary_statistics, geometry_response
+from app.services.entity_query_service import parse_entity_query, query_entities
+from app.services.layer_classifier import destination_label, format_destination, init_layer_rules
+from app.services.surface_engine import compute_detail_destinations, compute_surface_results, surface_graph
+from app.services.ingest_service import ingest_pipeline, ingest_prometheus_samples
+from app.services.tile_service import get_tile, parse_tile_request
+from app.services.upload_service import init_uploads, save_upload
+from app.services.blob_store import blob_store
+from app.services.compression_service import init_compression
+from config import Config
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Création d'une application Flask autonome
+# Dossier racine des ressources utilisateurs
+RESOURCE_DIR = Config.RESSOURCES_FOLDER
+
+# Création d'une application Flask autonome, configurée par la même classe Config que l'API (create_app)
 app = Flask(__name__)
+app.config.from_object(Config)
 CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000"],
@@ -32,6 +43,20 @@ CORS(app, resources={
         "max_age": 3600
     }
 })
+init_metrics(app, service_name="folder_service")
+
+# Précalcul des extractions DXF après transfert (Config.INGEST_* et TILE_PYRAMID_*)
+ingest_pipeline.init_app(app)
+registry.register_collector(ingest_prometheus_samples)
+
+# Réception des uploads en streaming vers le dossier Ressources, stockage dédupliqué et compression
+blob_store.init_app(app)
+init_compression(app)
+init_uploads(app)
+
+# Règles de sémantique des calques SDP, compilées au démarrage (Config.LAYER_RULES_FILE)
+init_layer_rules(app)
+registry.register_collector(surface_graph.prometheus_samples)
 
 @app.route('/create-folder', methods=['POST'])
 def create_folder():
@@ -52,8 +77,7 @@ def create_folder():
         logger.info(f"Email de l'utilisateur: {email}")
         
         # Créer le chemin du dossier Ressources
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         # Vérifier si le dossier Ressources existe, sinon le créer
         if not os.path.exists(resource_dir):
@@ -128,8 +152,7 @@ def check_folder():
         logger.info(f"Email de l'utilisateur: {email}")
         
         # Créer le chemin du dossier Ressources
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         # Vérifier si le dossier Ressources existe
         if not os.path.exists(resource_dir):
@@ -169,6 +192,8 @@ def get_folder_structure(folder_path):
             return structure
         
         for item in os.listdir(folder_path):
+            if item.startswith('.'):
+                continue  # Dossiers techniques (cache d'extraction)
             item_path = os.path.join(folder_path, item)
             
             if os.path.isdir(item_path):
@@ -184,13 +209,21 @@ def get_folder_structure(folder_path):
             else:
                 # C'est un fichier
                 file_size = os.path.getsize(item_path)
-                structure['files'].append({
+                file_info = {
                     'name': item,
                     'path': os.path.relpath(item_path, folder_path),
                     'size': file_size,
                     'size_formatted': format_file_size(file_size),
                     'last_modified': datetime.datetime.fromtimestamp(os.path.getmtime(item_path)).strftime('%Y-%m-%d %H:%M:%S')
-                })
+                }
+                # Statistiques déjà calculées (résumé en cache) : affichées sans relire le fichier
+                if item.lower().endswith('.dxf'):
+                    statistics = get_cached_summary_statistics(item_path)
+                    if statistics is not None:
+                        file_info['statistics'] = statistics
+                    elif ingest_pipeline.status(item_path):
+                        file_info['processing'] = True
+                structure['files'].append(file_info)
         
         # Trier les dossiers et fichiers par nom
         structure['folders'].sort(key=lambda x: x['name'].lower())
@@ -231,8 +264,7 @@ def get_folder_files():
         logger.info(f"Email de l'utilisateur: {email}")
         
         # Créer le chemin du dossier Ressources
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         # Vérifier si le dossier Ressources existe
         if not os.path.exists(resource_dir):
@@ -294,8 +326,7 @@ def transfer_files():
         logger.info(f"Email de l'utilisateur: {email}")
         
         # Créer le chemin du dossier Ressources
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         # Vérifier si le dossier Ressources existe
         if not os.path.exists(resource_dir):
@@ -337,9 +368,12 @@ def transfer_files():
         file1_path = os.path.join(transfer_folder, filename1)
         file2_path = os.path.join(transfer_folder, filename2)
         
-        file1.save(file1_path)
-        file2.save(file2_path)
+        with span('disk_write'):
+            save_upload(file1, file1_path)
+            save_upload(file2, file2_path)
         logger.debug(f"Fichiers sauvegardés: {file1_path}, {file2_path}")
+        ingest_pipeline.submit(file1_path)
+        ingest_pipeline.submit(file2_path)
         
         return jsonify({"message": f"Fichiers transférés avec succès dans {os.path.basename(transfer_folder)}"}), 200
     
@@ -347,137 +381,6 @@ def transfer_files():
         logger.error(f"Erreur lors du transfert des fichiers: {str(e)}")
         return jsonify({"error": f"Erreur lors du transfert des fichiers: {str(e)}"}), 500
 
-def extract_file_data(file):
-    """Extrait les données d'un fichier DXF"""
-    temp_file_path = None
-    try:
-        logger.info(f"Début de l'extraction pour le fichier : {file.filename}")
-        
-        # Créer un fichier temporaire avec un chemin explicite et mode binaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dxf', mode='wb') as temp_file:
-            file.save(temp_file)
-            temp_file_path = temp_file.name
-            logger.info(f"Fichier temporaire sauvegardé : {temp_file_path}")
-            
-        # Charger le fichier DXF à partir du chemin temporaire
-        logger.info(f"Lecture du fichier DXF : {temp_file_path}")
-        doc = ezdxf.readfile(temp_file_path)
-        
-        # Extraire les calques (layers)
-        layers = [
-            {
-                "name": layer.dxf.name,
-                "color": layer.dxf.color if layer.dxf.color != 0 else 'N/A',
-                "lineweight": layer.dxf.lineweight if hasattr(layer.dxf, 'lineweight') else None
-            }
-            for layer in doc.layers 
-            if not layer.dxf.name.startswith('*')  # Exclure les calques système
-        ]
-        
-        # Extraire les entités (polylignes, lignes, cercles, arcs, texte, etc.)
-        modelspace = doc.modelspace()
-        
-        polylines = []
-        lines = []
-        circles = []
-        arcs = []
-        texts = []
-        
-        for entity in modelspace.query('*'):
-            dxftype = entity.dxftype()
-            if dxftype == 'POLYLINE':
-                polylines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'vertices': [{'x': v[0], 'y': v[1]} for v in entity.points()],
-                    'closed': entity.closed,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'LWPOLYLINE':
-                polylines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'vertices': [{'x': v[0], 'y': v[1]} for v in entity.get_points()],
-                    'closed': entity.closed,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'LINE':
-                lines.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'start': {'x': entity.dxf.start[0], 'y': entity.dxf.start[1]},
-                    'end': {'x': entity.dxf.end[0], 'y': entity.dxf.end[1]},
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'CIRCLE':
-                circles.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},
-                    'radius': entity.dxf.radius,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'ARC':
-                arcs.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'center': {'x': entity.dxf.center[0], 'y': entity.dxf.center[1]},
-                    'radius': entity.dxf.radius,
-                    'start_angle': entity.dxf.start_angle,
-                    'end_angle': entity.dxf.end_angle,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-            elif dxftype == 'TEXT':
-                texts.append({
-                    'type': dxftype,
-                    'layer': entity.dxf.layer,
-                    'text': entity.dxf.text,
-                    'position': {'x': entity.dxf.insert[0], 'y': entity.dxf.insert[1]},
-                    'height': entity.dxf.height,
-                    'color': entity.dxf.color if entity.dxf.color != 0 else 'N/A',
-                    'lineweight': entity.dxf.lineweight if hasattr(entity.dxf, 'lineweight') else None
-                })
-        
-        # Statistiques globales
-        total_entities = len(modelspace)
-        statistics = {
-            "layer_count": len(layers),
-            "polyline_count": len(polylines),
-            "line_count": len(lines),
-            "circle_count": len(circles),
-            "arc_count": len(arcs),
-            "text_count": len(texts),
-            "total_entities": total_entities
-        }
-        
-        logger.info("Données extraites avec succès")
-        return {
-            "layers": layers,
-            "polylines": polylines,
-            "lines": lines,
-            "circles": circles,
-            "arcs": arcs,
-            "texts": texts,
-            "statistics": statistics
-        }
-    
-    except Exception as e:
-        logger.error(f"Erreur lors de l'extraction des données : {str(e)}")
-        return {"error": f"Erreur lors de l'extraction des données : {str(e)}"}
-    
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.info(f"Fichier temporaire supprimé : {temp_file_path}")
-            except Exception as e:
-                logger.error(f"Erreur lors de la suppression du fichier temporaire : {str(e)}")
-
 @app.route('/extract-data-from-file', methods=['POST'])
 def extract_data_from_file():
     """Extrait les données d'un fichier DXF dans le dossier de l'utilisateur"""
@@ -494,6 +397,12 @@ def extract_data_from_file():
         
         logger.info(f"Type de fichier: {file_type}")
         
+        try:
+            filters = parse_extraction_filters(data)
+        except ValueError as e:
+            logger.error(f"Filtres d'extraction invalides: {str(e)}")
+            return jsonify({"error": str(e)}), 400
+        
         if not filename:
             logger.error("Nom de fichier manquant")
             return jsonify({"error": "Nom de fichier requis"}), 400
@@ -506,8 +415,7 @@ def extract_data_from_file():
         logger.info(f"Nom du fichier: {filename}")
         logger.info(f"Dossier: {folder}")
         
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         if not os.path.exists(resource_dir):
             logger.error(f"Le dossier Ressources n'existe pas: {resource_dir}")
@@ -556,16 +464,15 @@ def extract_data_from_file():
         if not file_path.lower().endswith('.dxf'):
             logger.warning(f"Format non standard détecté: {file_path} - tentative d'extraction quand même")
         
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
-        
-        file_obj = FileStorage(
-            stream=io.BytesIO(file_content),
-            filename=os.path.basename(file_path),
-            content_type='application/octet-stream'
-        )
-        
-        extracted_data = extract_file_data(file_obj)
+        # Géométries binaires GEXG (tableaux typés) à la place des listes d'entités JSON
+        if data.get('format') == 'binary':
+            return geometry_response(file_path, **filters)
+
+        # Le fichier est déjà sur disque : extraction directe, sans copie temporaire
+        if data.get('mode') == 'summary':
+            extracted_data = get_file_summary(file_path)
+        else:
+            extracted_data = get_file_data(file_path, **filters)
         logger.info(f"Données extraites avec succès pour {file_path} (Type: {file_type})")
         
         extracted_data['fileType'] = file_type
@@ -584,12 +491,86 @@ def extract_data_from_file():
             extracted_data['sourcePath'] = rel_path
             extracted_data['parentFolder'] = ''
         
-        return jsonify(extracted_data), 200
+        with span('json_serialize'):
+            response = jsonify(extracted_data)
+        return response, 200
     
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction: {str(e)}")
         return jsonify({"error": f"Erreur lors de l'extraction: {str(e)}"}), 500
 
+@app.route('/query-entities', methods=['POST'])
+def query_file_entities():
+    """Page d'entités d'un fichier, filtrée (type, calque, emprise, aire) et triée côté serveur"""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename')
+        folder = data.get('folder', "")
+        email = data.get('email')
+        
+        if not filename:
+            logger.error("Nom de fichier manquant")
+            return jsonify({"error": "Nom de fichier requis"}), 400
+        
+        if not email:
+            logger.error("Email non fourni dans la requête")
+            return jsonify({"error": "Email non fourni"}), 400
+        
+        try:
+            query = parse_entity_query(data)
+        except ValueError as e:
+            logger.error(f"Requête d'entités invalide: {str(e)}")
+            return jsonify({"error": str(e)}), 400
+        
+        user_folder_path = os.path.join(RESOURCE_DIR, email.split('@')[0])
+        file_path = os.path.join(user_folder_path, folder, filename) if folder else os.path.join(user_folder_path, filename)
+        if not os.path.exists(file_path):
+            logger.error(f"Fichier non trouvé: {file_path}")
+            return jsonify({"error": "Fichier non trouvé"}), 404
+        
+        result = query_entities(file_path, **query)
+        logger.info(f"Requête d'entités sur {file_path}: {result['matched']} entité(s), page {result['page']}")
+        return jsonify(result), 200
+    
+    except Exception as e:
+        logger.error(f"Erreur lors de la requête d'entités: {str(e)}")
+        return jsonify({"error": f"Erreur lors de la requête d'entités: {str(e)}"}), 500
+
+@app.route('/tiles', methods=['POST'])
+def get_file_tile():
+    """Géométries d'une tuile z/x/y ou d'une vue (bbox + résolution), simplifiées selon le zoom"""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename')
+        folder = data.get('folder', "")
+        email = data.get('email')
+        
+        if not filename:
+            logger.error("Nom de fichier manquant")
+            return jsonify({"error": "Nom de fichier requis"}), 400
+        
+        if not email:
+            logger.error("Email non fourni dans la requête")
+            return jsonify({"error": "Email non fourni"}), 400
+        
+        try:
+            tile_request = parse_tile_request(data)
+        except ValueError as e:
+            logger.error(f"Requête de tuile invalide: {str(e)}")
+            return jsonify({"error": str(e)}), 400
+        
+        user_folder_path = os.path.join(RESOURCE_DIR, email.split('@')[0])
+        file_path = os.path.join(user_folder_path, folder, filename) if folder else os.path.join(user_folder_path, filename)
+        if not os.path.exists(file_path):
+            logger.error(f"Fichier non trouvé: {file_path}")
+            return jsonify({"error": "Fichier non trouvé"}), 404
+        
+        return jsonify(get_tile(file_path, **tile_request)), 200
+    
+    except Exception as e:
+        logger.error(f"Erreur lors du rendu de la tuile: {str(e)}")
+        return jsonify({"error": f"Erreur lors du rendu de la tuile: {str(e)}"}), 500
+
 @app.route('/get-visa-content', methods=['POST'])
 def get_visa_content():
     """Récupère le contenu d'un fichier visa.txt"""
@@ -603,8 +584,7 @@ def get_visa_content():
         logger.info(f"Tentative d'accès au fichier: {file_path}")
         
         if email and '/' in file_path and not file_path.startswith('/'):
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+            resource_dir = RESOURCE_DIR
             folder_name = email.split('@')[0]
             user_folder_path = os.path.join(resource_dir, folder_name)
             
@@ -616,8 +596,7 @@ def get_visa_content():
             logger.error(f"Fichier non trouvé: {file_path}")
             
             if email:
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+                resource_dir = RESOURCE_DIR
                 folder_name = email.split('@')[0]
                 user_folder_path = os.path.join(resource_dir, folder_name)
                 
@@ -668,8 +647,7 @@ def download_visa_file():
         logger.info(f"Paramètres reçus - filePath: {file_path}, email: {email}")
         
         if email and file_path:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+            resource_dir = RESOURCE_DIR
             folder_name = email.split('@')[0]
             user_folder_path = os.path.join(resource_dir, folder_name)
             
@@ -681,8 +659,7 @@ def download_visa_file():
             logger.error(f"Fichier non trouvé: {file_path}")
             
             if email:
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+                resource_dir = RESOURCE_DIR
                 folder_name = email.split('@')[0]
                 user_folder_path = os.path.join(resource_dir, folder_name)
                 
@@ -744,8 +721,7 @@ def generate_visa_file():
             logger.error("Données de surface non fournies")
             return jsonify({'error': 'Données de surface non fournies'}), 400
         
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        resource_dir = os.path.join(current_dir, 'app', 'Ressources')
+        resource_dir = RESOURCE_DIR
         
         if not os.path.exists(resource_dir):
             logger.info(f"Création du dossier Ressources: {resource_dir}")
@@ -776,9 +752,10 @@ def generate_visa_file():
         file_name = f"visa_{floor_name.replace(' ', '_')}.txt"
         file_path = os.path.join(output_folder_path, file_name)
         
-        content = generate_visa_content(surfaces, floor_name)
+        with span('visa_render'):
+            content = generate_visa_content(surfaces, floor_name)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with span('disk_write'), open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
         logger.info(f"Fichier visa généré avec succès: {file_path}")
@@ -832,11 +809,10 @@ def generate_excel_file():
         
         # Préparation des dossiers
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
             folder_name = email.split('@')[0]
-            resource_dir = os.path.join(current_dir, 'app', 'Ressources', folder_name)
+            resource_dir = os.path.join(RESOURCE_DIR, folder_name)
             
-            logger.info(f"Chemins - current_dir: {current_dir}, folder_name: {folder_name}, resource_dir: {resource_dir}")
+            logger.info(f"Chemins - folder_name: {folder_name}, resource_dir: {resource_dir}")
             
             if not os.path.exists(resource_dir):
                 logger.warning(f"Le dossier de l'utilisateur n'existe pas: {resource_dir}, tentative de création")
@@ -896,321 +872,11 @@ def generate_excel_file():
             # Traitement très simplifié des destinations
             row = 2
             
-            # Fonction pour calculer l'intersection entre deux polylignes
-            def calculate_intersection(poly1, poly2):
-                try:
-                    # Convertir les sommets en objets Point
-                    from shapely.geometry import Polygon
-                    
-                    # Créer les polygones à partir des sommets
-                    poly1_pts = [(v['x'], v['y']) for v in poly1.get('vertices', [])]
-                    poly2_pts = [(v['x'], v['y']) for v in poly2.get('vertices', [])]
-                    
-                    if len(poly1_pts) < 3 or len(poly2_pts) < 3:
-                        return 0.0
-                        
-                    poly1_shapely = Polygon(poly1_pts)
-                    poly2_shapely = Polygon(poly2_pts)
-                    
-                    # Vérifier si les polygones sont valides
-                    if not poly1_shapely.is_valid or not poly2_shapely.is_valid:
-                        return 0.0
-                    
-                    # Calculer l'intersection
-                    intersection = poly1_shapely.intersection(poly2_shapely)
-                    
-                    # Retourner l'aire de l'intersection
-                    return intersection.area
-                    
-                except Exception as e:
-                    logger.warning(f"Erreur lors du calcul d'intersection: {str(e)}")
-                    return 0.0
-            
-            # Dictionnaire de correspondance pour les cas spéciaux
-            special_cases = {
-                "AUTRE_BUREAU": "Autre bureau",
-                "AUTRE_CONGRE": "Autre congrès exposition",
-                "AUTRE_ENTREP": "Autre entrepôt",
-                "AUTRE_INDUST": "Autre industrie",
-                "COMMERCE_ART": "Commerce artisanat",
-                "COMMERCE_AUT": "Commerce autre hébergement touristique",
-                "COMMERCE_CIN": "Commerce cinéma",
-                "COMMERCE_DE_": "Commerce de gros",
-                "COMMERCE_HOT": "Commerce hôtel",
-                "COMMERCE_RES": "Commerce restauration",
-                "COMMERCE_SER": "Commerce service accueil clientèle",
-                "EXPLOITATIO": "Exploitation forestière",
-                "EXPLOITATION": "Exploitation agricole",
-                "HABITATION_H": "Habitation hébergement",
-                "HABITATION_L": "Habitation logement",
-                "SPIC_ADMINIS": "Spic administration",
-                "SPIC_ART_SPE": "Spic art spectacle",
-                "SPIC_AUTRE": "Spic autre",
-                "SPIC_ENSEIGN": "Spic enseignement santé",
-                "SPIC_LT": "Spic lt",
-                "SPIC_SPORT": "Spic sport"
-            }
-            
             # Journaliser la structure complète des données pour déboguer
             logger.info(f"Structure détaillée des surfaces: {json.dumps(surfaces, default=str)}")
             
-            # Analyse détaillée de la structure des données
-            existant_polylines = surfaces.get('existant', {}).get('polylines', [])
-            projet_polylines = surfaces.get('projet', {}).get('polylines', [])
-            
-            logger.info(f"Existant polylines: {len(existant_polylines)}")
-            logger.info(f"Projet polylines: {len(projet_polylines)}")
-            
-            # IMPORTANT: Rappel de l'inversion des fichiers
-            # existant_polylines contient les données du fichier "Projet_demoli_feuille_TA.dxf" (surface existante avant travaux)
-            # projet_polylines contient les données du fichier "Existant_exmple_demoli.dxf" (surface projet)
-            
-            # Fonction pour extraire le nom de destination d'une polyligne avec logging
-            def get_destination_from_layer(layer):
-                if not isinstance(layer, str):
-                    logger.warning(f"Layer n'est pas une chaîne: {layer}")
-                    return None
-                    
-                # Vérifier si c'est un calque SDP_1
-                if 'GEX_EDS_SDP_1' not in layer:
-                    return None
-                
-                # Journaliser le calque pour débogage
-                logger.info(f"Traitement du calque: {layer}")
-                
-                # Extraire la partie après GEX_EDS_SDP_1-
-                try:
-                    parts = layer.split('GEX_EDS_SDP_1-')
-                    if len(parts) >= 2:
-                        raw_destination = parts[1]
-                        
-                        # Journaliser la destination brute extraite
-                        logger.info(f"Destination brute extraite: {raw_destination}")
-                        
-                        # Nettoyer le nom de la destination de tout caractère indésirable à la fin
-                        if raw_destination.endswith('_'):
-                            raw_destination = raw_destination[:-1]
-                        
-                        # Cas spécial pour EXPLOITATIO0 qui apparaît dans votre fichier
-                        if "EXPLOITATIO0" in raw_destination:
-                            raw_destination = "EXPLOITATIO"
-                        
-                        # Tentative de correspondance avec les clés connues
-                        for key in special_cases.keys():
-                            if key == raw_destination:
-                                logger.info(f"Match exact: {key}")
-                                return key
-                        
-                        # Si pas de correspondance exacte, faire une recherche partielle
-                        for key in special_cases.keys():
-                            if key in raw_destination or raw_destination in key:
-                                logger.info(f"Match partiel: {key} dans {raw_destination}")
-                                return key
-                        
-                        logger.info(f"Destination finale: {raw_destination}")
-                        return raw_destination
-                except Exception as e:
-                    logger.error(f"Erreur lors de l'extraction de la destination: {str(e)}")
-                
-                return None
-            
-            # Fonction pour déterminer si une polyligne est un calque spécial à déduire
-            def is_special_layer(layer):
-                if not isinstance(layer, str):
-                    return False
-                    
-                patterns = ['GEX_EDS_SDP_2', 'GEX_EDS_SDP_3', 'GEX_EDS_SDP_4', 'GEX_EDS_SDP_5', 'GEX_EDS_SDP_7']
-                return any(pattern in layer for pattern in patterns)
-            
-            # Fonction pour calculer la surface d'une polyligne
-            def calculate_area(polyline):
-                vertices = polyline.get('vertices', [])
-                if len(vertices) < 3:
-                    return 0
-                    
-                # Calculer l'aire en utilisant la formule de Shoelace
-                area = 0.0
-                n = len(vertices)
-                for i in range(n):
-                    j = (i + 1) % n
-                    area += vertices[i]['x'] * vertices[j]['y']
-                    area -= vertices[j]['x'] * vertices[i]['y']
-                    
-                return abs(area) / 2.0
-            
-            # Fonction pour déterminer si une polyligne est contenue dans une autre
-            def is_contained(polyline1, polyline2):
-                try:
-                    vertices1 = polyline1.get('vertices', [])
-                    vertices2 = polyline2.get('vertices', [])
-                    
-                    if not vertices1 or not vertices2:
-                        return False
-                        
-                    # Trouver les limites de la boîte englobante pour polyline2
-                    min_x2 = min(v['x'] for v in vertices2)
-                    max_x2 = max(v['x'] for v in vertices2)
-                    min_y2 = min(v['y'] for v in vertices2)
-                    max_y2 = max(v['y'] for v in vertices2)
-                    
-                    # Vérifier si tous les points de polyline1 sont à l'intérieur de la boîte englobante de polyline2
-                    points_inside = 0
-                    for v in vertices1:
-                        if min_x2 <= v['x'] <= max_x2 and min_y2 <= v['y'] <= max_y2:
-                            points_inside += 1
-                    
-                    # Si au moins la moitié des points sont à l'intérieur, considérer comme contenu
-                    return points_inside >= len(vertices1) / 2
-                except Exception as e:
-                    logger.warning(f"Erreur lors de la vérification de contenance: {str(e)}")
-                    return False
-                    
-            # Structure pour stocker les résultats
-            calculation_results = {
-                'existant': {},       # Pour les surfaces existantes
-                'projet': {},          # Pour les surfaces projet
-                'cree_changement': {}, # Surface créée par changement de destination
-                'demolie': {},         # Surface démolie reconstruite
-                'supprimee': {},       # Surface supprimée (D)
-                'supprimee_changement': {}, # Surface supprimée par changement de destination
-                'demolition': {}       # Pour les surfaces de démolition par destination
-            }
-            
-            # Identifier les polylignes de démolition (GEX_EDS_TA_SDP_CAHIER_DEMO)
-            demolition_polylines = [p for p in existant_polylines 
-                                 if 'GEX_EDS_TA_SDP_CAHIER_DEMO' in p.get('layer', '')]
-            
-            logger.info(f"Nombre de polylignes de démolition trouvées: {len(demolition_polylines)}")
-            
-            # Traiter les polylignes existantes (Projet_demoli_feuille_TA.dxf)
-            main_existant_polylines = []
-            special_existant_polylines = []
-            
-            for polyline in existant_polylines:
-                layer = polyline.get('layer', '')
-                if 'GEX_EDS_SDP_1' in layer:
-                    destination = get_destination_from_layer(layer)
-                    if destination:
-                        main_existant_polylines.append(polyline)
-                        area = calculate_area(polyline)
-                        if destination not in calculation_results['existant']:
-                            calculation_results['existant'][destination] = 0
-                            calculation_results['demolition'][destination] = 0.0
-                        calculation_results['existant'][destination] += area
-                        logger.info(f"Existant: Destination {destination} - ajout surface {area}")
-                        
-                        # Calculer l'intersection avec les zones de démolition
-                        for demo_poly in demolition_polylines:
-                            intersection_area = calculate_intersection(polyline, demo_poly)
-                            if intersection_area > 0:
-                                calculation_results['demolition'][destination] += intersection_area
-                                logger.info(f"  - Intersection avec zone de démolition: {intersection_area:.2f} m²")
-                                
-                elif is_special_layer(layer):
-                    special_existant_polylines.append(polyline)
-            
-            # Traiter les polylignes projet (Existant_exmple_demoli.dxf)
-            main_projet_polylines = []
-            special_projet_polylines = []
-            
-            for polyline in projet_polylines:
-                layer = polyline.get('layer', '')
-                if 'GEX_EDS_SDP_1' in layer:
-                    destination = get_destination_from_layer(layer)
-                    if destination:
-                        main_projet_polylines.append(polyline)
-                        area = calculate_area(polyline)
-                        
-                        # Enregistrer les dimensions brutes pour analyse
-                        vertices = polyline.get('vertices', [])
-                        if vertices:
-                            min_x = min(v['x'] for v in vertices)
-                            max_x = max(v['x'] for v in vertices)
-                            min_y = min(v['y'] for v in vertices)
-                            max_y = max(v['y'] for v in vertices)
-                            logger.info(f"Dimensions brutes pour {destination}: X({min_x},{max_x}), Y({min_y},{max_y}), Surface={area}")
-                            
-                        # Vérifier si le calcul semble correct (cas de figure spécifique)
-                        # Les erreurs de calcul peuvent venir de points trop proches ou mal définis
-                        
-                        if destination not in calculation_results['projet']:
-                            calculation_results['projet'][destination] = 0
-                        calculation_results['projet'][destination] += area
-                        logger.info(f"Projet: Destination {destination} - ajout surface {area}")
-                elif is_special_layer(layer):
-                    special_projet_polylines.append(polyline)
-            
-            # Déduire les surfaces spéciales des existantes
-            for special_polyline in special_existant_polylines:
-                area = calculate_area(special_polyline)
-                if area <= 0:
-                    continue
-                    
-                for main_polyline in main_existant_polylines:
-                    if is_contained(special_polyline, main_polyline):
-                        destination = get_destination_from_layer(main_polyline.get('layer', ''))
-                        if destination and destination in calculation_results['existant']:
-                            calculation_results['existant'][destination] -= area
-                            logger.info(f"Existant: Déduction de {area} pour {destination}")
-                        break
-            
-            # Déduire les surfaces spéciales des projets
-            for special_polyline in special_projet_polylines:
-                area = calculate_area(special_polyline)
-                if area <= 0:
-                    continue
-                    
-                for main_polyline in main_projet_polylines:
-                    if is_contained(special_polyline, main_polyline):
-                        destination = get_destination_from_layer(main_polyline.get('layer', ''))
-                        if destination and destination in calculation_results['projet']:
-                            calculation_results['projet'][destination] -= area
-                            logger.info(f"Projet: Déduction de {area} pour {destination}")
-                        break
-            
-            # IMPORTANT: Recalculer les surfaces projet avec la même méthode que pour les surfaces existantes
-            # Nous allons vider et recalculer les surfaces projet
-            logger.info("Recalcul des surfaces projet avec la même méthode que pour les surfaces existantes")
-            
-            # Vider les résultats précédents pour les surfaces projet
-            calculation_results['projet'] = {}
-            
-            # Appliquer exactement la même méthode pour les surfaces projet que pour les surfaces existantes
-            # Pour les polylignes principales
-            main_projet_polylines = []
-            for polyline in projet_polylines:
-                layer = polyline.get('layer', '')
-                if 'GEX_EDS_SDP_1' in layer:
-                    destination = get_destination_from_layer(layer)
-                    if destination:
-                        main_projet_polylines.append(polyline)
-                        area = calculate_area(polyline)
-                        if destination not in calculation_results['projet']:
-                            calculation_results['projet'][destination] = 0
-                        calculation_results['projet'][destination] += area
-                        logger.info(f"Recalcul Projet: Destination {destination} - ajout surface {area}")
-            
-            # Pour les polylignes spéciales
-            special_projet_polylines = []
-            for polyline in projet_polylines:
-                layer = polyline.get('layer', '')
-                if 'GEX_EDS_SDP_1' not in layer and is_special_layer(layer):
-                    special_projet_polylines.append(polyline)
-            
-            # Déduire les surfaces spéciales des surfaces projet
-            for special_polyline in special_projet_polylines:
-                area = calculate_area(special_polyline)
-                if area <= 0:
-                    continue
-                    
-                # Vérifier la contenance dans chaque polyligne principale
-                for main_polyline in main_projet_polylines:
-                    if is_contained(special_polyline, main_polyline):
-                        destination = get_destination_from_layer(main_polyline.get('layer', ''))
-                        if destination and destination in calculation_results['projet']:
-                            calculation_results['projet'][destination] -= area
-                            logger.info(f"Recalcul Projet: Déduction de {area} pour {destination}")
-                        break
+            with span('geometry'):
+                calculation_results = compute_surface_results(surfaces)
             
             # Débogage des résultats de calcul finaux
             logger.info(f"===== Résultats de calcul finaux =====")
@@ -1237,7 +903,7 @@ def generate_excel_file():
             
             # Traiter chaque destination
             for destination in sorted(all_destinations):
-                formatted_destination = special_cases.get(destination, destination)
+                formatted_destination = destination_label(destination)
                 
                 # Surface existante (A) - du fichier Projet_demoli_feuille_TA.dxf
                 existant_surface = calculation_results['existant'].get(destination, 0)
@@ -1265,6 +931,13 @@ def generate_excel_file():
                 if demolition_surface > 0:
                     ws[f'F{row}'] = demolition_surface
                 
+                # Colonnes issues de la comparaison géométrique (B, changements de destination, D)
+                for column, key in (('D', 'cree'), ('E', 'cree_changement'),
+                                    ('G', 'supprimee'), ('H', 'supprimee_changement')):
+                    value = calculation_results[key].get(destination, 0)
+                    if value > 0:
+                        ws[f'{column}{row}'] = value
+                
                 # Journaliser les résultats pour débogage
                 logger.info(f"Destination {formatted_destination} - Surface existante: {existant_surface}, "
                            f"Surface projet: {projet_surface}, Surface démolie: {demolition_surface}")
@@ -1292,7 +965,8 @@ def generate_excel_file():
             # Juste une seule ligne avec l'étage
             
             # Sauvegarder le fichier Excel
-            wb.save(excel_path)
+            with span('excel_write'):
+                wb.save(excel_path)
             
             logger.info(f"Fichier Excel créé avec succès: {excel_path}")
         except Exception as e:
@@ -1312,6 +986,7 @@ def generate_excel_file():
         logger.error(traceback.format_exc())
         return jsonify({'error': f'Erreur lors de la génération du fichier Excel: {str(e)}'}), 500
 
+
 @app.route('/download-excel-file', methods=['GET'])
 def download_excel_file():
     """Permet le téléchargement d'un fichier Excel"""
@@ -1343,7 +1018,7 @@ def download_excel_file():
         
         # Essayons différentes combinaisons possibles pour le répertoire utilisateur
         possible_paths = [
-            os.path.join(current_dir, 'app', 'Ressources', folder_name),
+            os.path.join(RESOURCE_DIR, folder_name),
             os.path.join(current_dir, 'Ressources', folder_name),
         ]
         
@@ -1399,12 +1074,13 @@ def download_excel_file():
         
         # Envoyer le fichier au client
         try:
-            return send_file(
-                full_file_path,
-                as_attachment=True,
-                download_name=os.path.basename(file_path),
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            with span('send_file'):
+                return send_file(
+                    full_file_path,
+                    as_attachment=True,
+                    download_name=os.path.basename(file_path),
+                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                )
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi du fichier: {str(e)}")
             return jsonify({'error': f"Erreur lors de l'envoi du fichier: {str(e)}"}), 500
@@ -1488,6 +1164,23 @@ def generate_visa_content(surfaces, floor_name):
         if exist_elems > 0:
             content.append(f"Surface moyenne par élément supprimé: {existant_surface / exist_elems:.2f} m²")
         
+    # Modifications réelles, mesurées par la comparaison géométrique quand les polylignes sont fournies
+    if surfaces.get('existant', {}).get('polylines') or surfaces.get('projet', {}).get('polylines'):
+        results = compute_surface_results(surfaces)
+        if 'diff' in results:
+            elements = results['diff']['elements']
+            content.append("")
+            content.append("MODIFICATIONS GÉOMÉTRIQUES:")
+            content.append("-" * 50)
+            content.append(f"Éléments inchangés: {elements['unchanged']}, modifiés: {elements['modified']}, "
+                           f"ajoutés: {elements['added']}, supprimés: {elements['removed']}")
+            labels = (('cree', "Surface créée (B)"), ('cree_changement', "Surface créée par changement de destination"),
+                      ('supprimee', "Surface supprimée (D)"),
+                      ('supprimee_changement', "Surface supprimée par changement de destination"))
+            for key, label in labels:
+                for destination, value in sorted(results[key].items()):
+                    content.append(f"  - {label} - {destination_label(destination)}: {value:.2f} m²")
+    
     content.append("")
     content.append("INVENTAIRE DÉTAILLÉ DES ÉLÉMENTS:")
     content.append("-" * 50)
@@ -1681,439 +1374,10 @@ def create_excel_document(excel_path, surfaces, floor_name):
     cell.alignment = data_alignment
     cell.border = border
     
-    # Utiliser les données réelles des polylignes pour la colonne Destinations
-    row = 2  # Commencer à la ligne 2
-    
-    # Fonction pour extraire le nom de destination à partir d'une polyligne
-    def get_destination_name(polyline):
-        import re
-        
-        # Essayer d'extraire le nom du calque (layer)
-        layer = polyline.get('layer', '')
-        
-        # Si le calque n'est pas valide, essayer d'autres propriétés
-        if not layer or not isinstance(layer, str):
-            # Essayer d'utiliser le type de polyligne
-            polyline_type = polyline.get('type', '')
-            if polyline_type:
-                return polyline_type
-            return "NON_SPECIFIE"
-        
-        # Format standard: GEX_EDS_SDP_X-CATEGORIE_SOUSCATEGORIE
-        # Exemple: GEX_EDS_SDP_1-COMMERCE_CIN -> COMMERCE_CIN
-        pattern1 = r'(?:GEX_EDS_)?SDP_\d+-([A-Z_]+)'
-        match = re.search(pattern1, layer)
-        if match:
-            # Extraire uniquement la partie après le tiret (COMMERCE_CIN)
-            return match.group(1)
-        
-        # Format spécifique pour hauteur sous plafond (H-180)
-        if "H-" in layer:
-            match = re.search(r'H-(\d+)', layer)
-            if match:
-                return f"H-{match.group(1)}"
-        
-        # Format spécifique pour stationnement
-        if "PK" in layer:
-            return "PK"
-        
-        # Si le calque contient un tiret, prendre la partie après le tiret
-        if "-" in layer:
-            parts = layer.split('-')
-            if len(parts) > 1:
-                return parts[-1]
-        
-        # Enlever les préfixes communs
-        clean_layer = re.sub(r'^(?:GEX_EDS_)?(?:SDP_)?\d*', '', layer)
-        
-        # Si le calque nettoyé commence par un tiret, l'enlever
-        if clean_layer.startswith('-'):
-            clean_layer = clean_layer[1:]
-        
-        # Si le calque nettoyé n'est pas vide, le retourner
-        if clean_layer:
-            return clean_layer
-        
-        # En dernier recours, retourner le calque original
-        return layer
-    
-    # Collecter les noms de destination uniques et calculer les surfaces par destination
-    destinations = set()  # Utiliser un ensemble pour éliminer automatiquement les doublons
-    
-    # Créer un dictionnaire pour stocker tous les types de calques rencontrés
-    all_layer_types = {}
-    
-    # Fonction pour enregistrer un type de calque
-    def register_layer_type(polyline):
-        layer = polyline.get('layer', '')
-        if layer and isinstance(layer, str):
-            # Extraire le nom de destination
-            destination = get_destination_name(polyline)
-            all_layer_types[destination] = True
-    
-    # Dictionnaire pour stocker les surfaces par destination
-    surfaces_par_destination = {}
-    
-    # Extraire les destinations des polylignes du projet
-    projet_polylines = surfaces.get('projet', {}).get('polylines', [])
-    for polyline in projet_polylines:
-        destination = get_destination_name(polyline)
-        destinations.add(destination)
-    
-    # Fonction pour calculer la surface d'une polyligne à partir de ses vertices
-    def calculer_surface_polyligne(polyline):
-        # Vérifier si la polyligne a des vertices
-        if 'vertices' not in polyline or not polyline['vertices']:
-            return 0
-        
-        vertices = polyline['vertices']
-        if len(vertices) < 3:  # Un polygone doit avoir au moins 3 points
-            return 0
-        
-        # Calculer la surface en utilisant la formule de Shoelace (Gauss's area formula)
-        area = 0.0
-        n = len(vertices)
-        for i in range(n):
-            j = (i + 1) % n
-            area += vertices[i]['x'] * vertices[j]['y']
-            area -= vertices[j]['x'] * vertices[i]['y']
-        
-        # Prendre la valeur absolue et diviser par 2
-        return abs(area) / 2.0
-    
-    # IMPORTANT: Selon la demande du client et en tenant compte de l'inversion des fichiers
-    # La colonne "Surface existante avant travaux (A)" contient les surfaces des fichiers de "Projet_demoli_feuille_TA.dxf" (section "Importation d'existant .dxf")
-    # La colonne "Surface projet" contient les surfaces des fichiers de "Existant_exmple_demoli.dxf" (section "Importation de fichier .dxf")
-    
-    # Fonction pour déterminer si une polyligne est un calque principal SDP_1
-    def is_main_sdp_polyline(polyline):
-        layer = polyline.get('layer', '')
-        return isinstance(layer, str) and layer.startswith('GEX_EDS_SDP_1')
-    
-    # Fonction pour déterminer si une polyligne est un calque spécial à déduire (SDP_2, SDP_3, etc.)
-    def is_special_polyline(polyline):
-        layer = polyline.get('layer', '')
-        if not isinstance(layer, str):
-            return False
-        # Vérifier si c'est un calque spécial à déduire (pas SDP_1)
-        patterns = ['GEX_EDS_SDP_2', 'GEX_EDS_SDP_3', 'GEX_EDS_SDP_4', 'GEX_EDS_SDP_5', 'GEX_EDS_SDP_7']
-        return any(pattern in layer for pattern in patterns)
-    
-    # Fonction pour déterminer la destination parente d'un calque spécial de manière simple sans dépendre de Shapely
-    def get_parent_destination(special_polyline, main_polylines):
-        special_layer = special_polyline.get('layer', '')
-        if not isinstance(special_layer, str):
-            return None
-            
-        # Méthode simplifiée: utiliser les correspondances de noms de calques
-        # Par exemple, si nous avons GEX_EDS_SDP_3-H-180, chercher un GEX_EDS_SDP_1 avec des coordonnées similaires
-        special_prefix = special_layer.split('-')[0] if '-' in special_layer else ''
-        
-        # Essayer d'extraire le numéro d'étage ou de bâtiment (si présent dans le nom du calque)
-        parts = special_prefix.split('_')
-        etage_num = parts[-1] if len(parts) > 1 and parts[-1].isdigit() else None
-        
-        # Vérifier chaque polyligne principale pour voir si elle pourrait être parent
-        # basé sur des heuristiques simples (proximité ou même étage)
-        for main_polyline in main_polylines:
-            main_layer = main_polyline.get('layer', '')
-            if not isinstance(main_layer, str):
-                continue
-                
-            # Si le calque spécial est inclus dans les coordonnées du calque principal, c'est probablement son parent
-            if is_contained(special_polyline, main_polyline):
-                return get_destination_name(main_polyline)
-                
-        # Si nous n'avons pas pu trouver de parent, retourner None
-        return None
-        
-    # Fonction helper pour déterminer si une polyligne est contenue dans une autre
-    # en utilisant une méthode simplifiée de comparaison de boîtes englobantes
-    def is_contained(polyline1, polyline2):
-        try:
-            # Essayer de déterminer si polyline1 est contenue dans polyline2
-            # en vérifiant si les coordonnées de polyline1 sont à l'intérieur de la boîte englobante de polyline2
-            vertices1 = polyline1.get('vertices', [])
-            vertices2 = polyline2.get('vertices', [])
-            
-            if not vertices1 or not vertices2:
-                return False
-                
-            # Trouver les limites de la boîte englobante pour polyline2
-            min_x2 = min(v['x'] for v in vertices2)
-            max_x2 = max(v['x'] for v in vertices2)
-            min_y2 = min(v['y'] for v in vertices2)
-            max_y2 = max(v['y'] for v in vertices2)
-            
-            # Vérifier si tous les points de polyline1 sont à l'intérieur de la boîte englobante de polyline2
-            points_inside = 0
-            for v in vertices1:
-                if min_x2 <= v['x'] <= max_x2 and min_y2 <= v['y'] <= max_y2:
-                    points_inside += 1
-            
-            # Si au moins la moitié des points sont à l'intérieur, considérer comme contenu
-            return points_inside >= len(vertices1) / 2
-        except Exception as e:
-            logger.warning(f"Erreur lors de la vérification de contenance: {str(e)}")
-            return False
-    
-    # Récupérer les polylignes des deux fichiers
-    existant_polylines = surfaces.get('existant', {}).get('polylines', [])
-    projet_polylines = surfaces.get('projet', {}).get('polylines', [])
-    
-    # Initialiser le dictionnaire des surfaces
-    surfaces_par_destination = {}
-    
-    # Filtrer les polylignes principales (SDP_1)
-    main_existant_polylines = [p for p in existant_polylines if is_main_sdp_polyline(p)]
-    main_projet_polylines = [p for p in projet_polylines if is_main_sdp_polyline(p)]
-    
-    # Filtrer les polylignes spéciales à déduire
-    special_existant_polylines = [p for p in existant_polylines if is_special_polyline(p)]
-    special_projet_polylines = [p for p in projet_polylines if is_special_polyline(p)]
-    
-    # Collecter toutes les destinations des polylignes principales
-    all_destinations = set()
-    for polyline in main_existant_polylines + main_projet_polylines:
-        destination = get_destination_name(polyline)
-        all_destinations.add(destination)
-    
-    # Initialiser le dictionnaire des surfaces pour toutes les destinations
-    for destination in all_destinations:
-        surfaces_par_destination[destination] = {'existant': 0, 'projet': 0, 'rdv': 0}
-    
-    # CORRECTION: Calcul des surfaces existantes (colonne "Surface existante avant travaux (A)")
-    # Utiliser les polylignes de "Projet_demoli_feuille_TA.dxf" (dans main_existant_polylines)
-    for polyline in main_existant_polylines:
-        destination = get_destination_name(polyline)
-        surface = calculer_surface_polyligne(polyline)
-        surfaces_par_destination[destination]['existant'] += surface
-    
-    # CORRECTION: Calcul des surfaces projet (colonne "Surface projet")
-    # Utiliser les polylignes de "Existant_exmple_demoli.dxf" (dans main_projet_polylines)
-    for polyline in main_projet_polylines:
-        destination = get_destination_name(polyline)
-        surface = calculer_surface_polyligne(polyline)
-        surfaces_par_destination[destination]['projet'] += surface
-    
-    # Méthode simplifiée pour déduire les surfaces des calques spéciaux
-    logger.info("Début de la déduction des surfaces des calques spéciaux")
-    
-    # Pour les fichiers DXF, on sait que GEX_EDS_SDP_2, GEX_EDS_SDP_3, etc. sont des zones à déduire
-    # des zones principales GEX_EDS_SDP_1 correspondantes
-    
-    # Structure pour garder trace des calques spéciaux traités
-    special_layers_processed = {
-        'existant': {},
-        'projet': {}
-    }
-    
-    # Traitement des polylignes spéciales dans le fichier existant
-    try:
-        logger.info(f"Traitement de {len(special_existant_polylines)} polylignes spéciales dans le fichier existant")
-        
-        for special_polyline in special_existant_polylines:
-            special_layer = special_polyline.get('layer', '')
-            if not isinstance(special_layer, str):
-                continue
-                
-            logger.info(f"Traitement du calque spécial existant: {special_layer}")
-            
-            # Calculer la surface de cette polyligne spéciale
-            special_surface = calculer_surface_polyligne(special_polyline)
-            if special_surface <= 0:
-                logger.warning(f"Surface nulle ou négative pour le calque {special_layer}, ignoré")
-                continue
-                
-            # Déterminer le type de calque spécial (SDP_2, SDP_3, etc.)
-            if 'GEX_EDS_SDP_2' in special_layer:
-                category = 'TREMIE'
-            elif 'GEX_EDS_SDP_3' in special_layer:
-                category = 'H-180'
-            elif 'GEX_EDS_SDP_5' in special_layer:
-                category = 'PK'
-            elif 'GEX_EDS_SDP_7' in special_layer:
-                category = 'LT'
-            else:
-                logger.warning(f"Type de calque spécial inconnu: {special_layer}, ignoré")
-                continue
-                
-            # Essayer de trouver la destination parente directement via les coordonnées
-            # Cette méthode est plus simple et plus robuste
-            parent_found = False
-            
-            for main_polyline in main_existant_polylines:
-                if is_contained(special_polyline, main_polyline):
-                    parent_destination = get_destination_name(main_polyline)
-                    if parent_destination in surfaces_par_destination:
-                        # Déduire la surface spéciale de la surface existante
-                        surfaces_par_destination[parent_destination]['existant'] -= special_surface
-                        logger.info(f"Surface {special_surface} déduite de {parent_destination} (existant) - Calque: {special_layer}")
-                        special_layers_processed['existant'][special_layer] = {
-                            'surface': special_surface,
-                            'parent': parent_destination
-                        }
-                        parent_found = True
-                        break
-            
-            if not parent_found:
-                logger.warning(f"Aucun parent trouvé pour le calque {special_layer} dans l'existant")
-                
-    except Exception as e:
-        logger.error(f"Erreur lors du traitement des calques spéciaux existants: {str(e)}")
-    
-    # Traitement des polylignes spéciales dans le fichier projet
-    try:
-        logger.info(f"Traitement de {len(special_projet_polylines)} polylignes spéciales dans le fichier projet")
-        
-        for special_polyline in special_projet_polylines:
-            special_layer = special_polyline.get('layer', '')
-            if not isinstance(special_layer, str):
-                continue
-                
-            logger.info(f"Traitement du calque spécial projet: {special_layer}")
-            
-            # Calculer la surface de cette polyligne spéciale
-            special_surface = calculer_surface_polyligne(special_polyline)
-            if special_surface <= 0:
-                logger.warning(f"Surface nulle ou négative pour le calque {special_layer}, ignoré")
-                continue
-                
-            # Déterminer le type de calque spécial (SDP_2, SDP_3, etc.)
-            if 'GEX_EDS_SDP_2' in special_layer:
-                category = 'TREMIE'
-            elif 'GEX_EDS_SDP_3' in special_layer:
-                category = 'H-180'
-            elif 'GEX_EDS_SDP_5' in special_layer:
-                category = 'PK'
-            elif 'GEX_EDS_SDP_7' in special_layer:
-                category = 'LT'
-            else:
-                logger.warning(f"Type de calque spécial inconnu: {special_layer}, ignoré")
-                continue
-                
-            # Essayer de trouver la destination parente directement via les coordonnées
-            parent_found = False
-            
-            for main_polyline in main_projet_polylines:
-                if is_contained(special_polyline, main_polyline):
-                    parent_destination = get_destination_name(main_polyline)
-                    if parent_destination in surfaces_par_destination:
-                        # Déduire la surface spéciale de la surface projet
-                        surfaces_par_destination[parent_destination]['projet'] -= special_surface
-                        logger.info(f"Surface {special_surface} déduite de {parent_destination} (projet) - Calque: {special_layer}")
-                        special_layers_processed['projet'][special_layer] = {
-                            'surface': special_surface,
-                            'parent': parent_destination
-                        }
-                        parent_found = True
-                        break
-            
-            if not parent_found:
-                logger.warning(f"Aucun parent trouvé pour le calque {special_layer} dans le projet")
-                
-    except Exception as e:
-        logger.error(f"Erreur lors du traitement des calques spéciaux projet: {str(e)}")
-    
-    # Afficher un résumé des calques spéciaux traités
-    logger.info(f"Résumé des calques spéciaux traités - Existant: {len(special_layers_processed['existant'])}, Projet: {len(special_layers_processed['projet'])}")
-
-        
-    # Importer les bibliothèques nécessaires pour les analyses spatiales
-    try:
-        from shapely.geometry import Polygon, Point
-        shapely_available = True
-    except ImportError:
-        # Si Shapely n'est pas disponible, on affiche un message
-        print("La bibliothèque Shapely n'est pas disponible. L'analyse spatiale précise ne sera pas possible.")
-        shapely_available = False
-        
-    # Fonction pour convertir une polyligne en polygone Shapely
-    def polyligne_to_polygon(polyline):
-        if 'vertices' not in polyline or not polyline['vertices'] or len(polyline['vertices']) < 3:
-            return None
-        vertices = polyline['vertices']
-        # Créer une liste de coordonnées (x, y) pour Shapely
-        coords = [(vertex['x'], vertex['y']) for vertex in vertices]
-        try:
-            # Créer un polygone Shapely
-            return Polygon(coords)
-        except Exception as e:
-            print(f"Erreur lors de la création du polygone: {e}")
-            return None
-    
-    # Identifier les polylignes LOC_SOC et SANITAIRES dans tous les fichiers
-    rdv_specific_polylines = []
-    for polyline in projet_polylines + existant_polylines:
-        layer = polyline.get('layer', '')
-        if isinstance(layer, str) and ('LOC_SOC' in layer or 'SANITAIRES' in layer):
-            rdv_specific_polylines.append(polyline)
-    
-    # Pour chaque destination (polyligne SDP), vérifier si elle contient des polylignes LOC_SOC ou SANITAIRES
-    if shapely_available and rdv_specific_polylines:
-        for destination in all_destinations:
-            # Trouver toutes les polylignes associées à cette destination
-            destination_polylines = []
-            for polyline in filtered_projet_polylines + filtered_existant_polylines:
-                if get_destination_name(polyline) == destination:
-                    destination_polylines.append(polyline)
-            
-            # Pour chaque polyligne de destination, vérifier si elle contient des polylignes LOC_SOC ou SANITAIRES
-            for dest_polyline in destination_polylines:
-                dest_polygon = polyligne_to_polygon(dest_polyline)
-                if not dest_polygon:
-                    continue
-                
-                # Vérifier chaque polyligne spécifique
-                for rdv_polyline in rdv_specific_polylines:
-                    rdv_polygon = polyligne_to_polygon(rdv_polyline)
-                    if not rdv_polygon:
-                        continue
-                    
-                    # Vérifier si le polygone RDV est contenu dans le polygone de destination
-                    if dest_polygon.contains(rdv_polygon) or dest_polygon.intersects(rdv_polygon):
-                        # Calcul de la surface du polygone RDV
-                        surface_rdv = rdv_polygon.area
-                        # Ajouter cette surface à la destination
-                        surfaces_par_destination[destination]['rdv'] += surface_rdv
-        
-    # Utiliser toutes les destinations collectées pour l'affichage
-    destinations = all_destinations
-    
-    # Fonction pour formater les noms de destination pour un affichage plus lisible
-    def format_destination(destination):
-        # Dictionnaire de correspondance pour les cas spéciaux
-        special_cases = {
-            "AUTRE_BUREAU": "Autre bureau",
-            "AUTRE_CONGRE": "Autre congrès exposition",
-            "AUTRE_ENTREP": "Autre entrepôt",
-            "AUTRE_INDUST": "Autre industrie",
-            "COMMERCE_ART": "Commerce artisanat",
-            "COMMERCE_AUT": "Commerce autre hébergement touristique",
-            "COMMERCE_CIN": "Commerce cinéma",
-            "COMMERCE_DE_": "Commerce de gros",
-            "COMMERCE_HOT": "Commerce hôtel",
-            "COMMERCE_RES": "Commerce restauration",
-            "COMMERCE_SER": "Commerce service accueil clientèle",
-            "EXPLOITATIO": "Exploitation forestière",
-            "EXPLOITATION": "Exploitation agricole",
-            "HABITATION_H": "Habitation hébergement",
-            "HABITATION_L": "Habitation logement",
-            "SPIC_ADMINIS": "Spic administration",
-            "SPIC_ART_SPE": "Spic art spectacle",
-            "SPIC_AUTRE": "Spic autre",
-            "SPIC_ENSEIGN": "Spic enseignement santé",
-            "SPIC_LT": "Spic lt",
-            "SPIC_SPORT": "Spic sport"
-        }
-        
-        # Si la destination est dans notre dictionnaire, utiliser la correspondance
-        if destination in special_cases:
-            return special_cases[destination]
-        
-        # Sinon, transformer le format générique: remplacer les underscores par des espaces et mettre la première lettre en majuscule
-        formatted = destination.replace('_', ' ').lower().capitalize()
-        return formatted
+    # Destinations (noms courts des calques principaux) et surfaces RDV, calculées par le moteur de surfaces partagé
+    detail = compute_detail_destinations(surfaces)
+    destinations = detail['destinations']
+    surfaces_rdv = detail['rdv']
     
     # Trier les destinations par ordre alphabétique
     sorted_destinations = sorted(destinations)
@@ -2146,7 +1410,7 @@ def create_excel_document(excel_path, surfaces, floor_name):
         cell.border = border
         
         # Colonne J: Surface RDV
-        surface_rdv = surfaces_par_destination.get(destination, {}).get('rdv', 0)
+        surface_rdv = surfaces_rdv.get(destination, 0)
         if surface_rdv > 0:
             # Convertir en mètres carrés si nécessaire
             surface_rdv_m2 = surface_rdv
@@ -0,0 +1,52 @@
+"""Folder table and lookup indexes
+
+Revision ID: eca879b2b7b0
+Revises: e2a359007539
+Create Date: 2026-10-19 10:12:31.408112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eca879b2b7b0'
+down_revision = 'e2a359007539'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('folder'):
+        op.create_table('folder',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('id_user', sa.Integer(), nullable=False),
+        sa.Column('nom_dossier', sa.String(length=100), nullable=False),
+        sa.Column('date_creation', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['id_user'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id_user', 'nom_dossier', name='uq_folder_id_user_nom_dossier')
+        )
+    else:
+        # Table créée hors migration (db.create_all) : supprimer les doublons avant la contrainte unique
+        op.execute(
+            "DELETE FROM folder WHERE id NOT IN "
+            "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM folder GROUP BY id_user, nom_dossier) AS keep)"
+        )
+        with op.batch_alter_table('folder') as batch_op:
+            batch_op.create_unique_constraint('uq_folder_id_user_nom_dossier', ['id_user', 'nom_dossier'])
+
+    op.create_index(op.f('ix_folder_id_user'), 'folder', ['id_user'], unique=False)
+    op.create_index(op.f('ix_folder_nom_dossier'), 'folder', ['nom_dossier'], unique=False)
+    op.create_index(op.f('ix_user_role'), 'user', ['role'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_role'), table_name='user')
+    op.drop_index(op.f('ix_folder_nom_dossier'), table_name='folder')
+    op.drop_index(op.f('ix_folder_id_user'), table_name='folder')
+    # La table folder et ses données existaient avant cette migration (db.create_all) : seule la contrainte est retirée
+    with op.batch_alter_table('folder') as batch_op:
+        batch_op.drop_constraint('uq_folder_id_user_nom_dossier', type_='unique')
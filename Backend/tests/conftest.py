@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Variables lues à l'import de config.py et de folder_service.py : à définir avant tout import de l'application
+os.environ.setdefault("DB_PROFILE", "sqlite")
+os.environ.setdefault("SQLITE_DATABASE_URL", "sqlite://")
+os.environ.setdefault("FOLDER_SYNC_ENABLED", "false")
+os.environ.setdefault("INGEST_ENABLED", "false")
+os.environ.setdefault("RESSOURCES_FOLDER", tempfile.mkdtemp(prefix="gex_tests_"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ezdxf  # noqa: E402
+
+
+@pytest.fixture
+def mixed_dxf(tmp_path):
+    """Plan DXF avec un exemplaire de chaque type d'entité pris en charge, fermé ou non."""
+    doc = ezdxf.new()
+    doc.layers.add("GEX_EDS_SDP_1-HABITATION")
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0), (4, 0), (4, 4), (0, 4)], close=True,
+                       dxfattribs={"layer": "GEX_EDS_SDP_1-HABITATION"})
+    msp.add_lwpolyline([(10, 0), (12, 0), (12, 2)], close=False, dxfattribs={"layer": "GEX_EDS_SDP_1-HABITATION"})
+    msp.add_polyline2d([(0, 10), (2, 10), (2, 12), (0, 12)], close=True, dxfattribs={"layer": "sdp_a"})
+    msp.add_polyline2d([(5, 10), (6, 10), (6, 11)], close=False, dxfattribs={"layer": "sdp_a"})
+    msp.add_line((0, 0), (1, 1), dxfattribs={"layer": "COTES"})
+    msp.add_circle((20, 20), 2, dxfattribs={"layer": "COTES"})
+    msp.add_arc((30, 30), 1, 0, 90, dxfattribs={"layer": "COTES"})
+    msp.add_text("SEJOUR", dxfattribs={"layer": "TEXTES", "insert": (1, 1), "height": 0.5})
+    path = tmp_path / "mixed.dxf"
+    doc.saveas(path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Application de l'API (create_app) sur une base SQLite en mémoire."""
+    from app import create_app
+    application = create_app()
+    application.config["TESTING"] = True
+    return application
+
+
+@pytest.fixture
+def database(app):
+    """Tables créées pour un test puis supprimées ; le test s'exécute dans un contexte d'application."""
+    from app import db
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
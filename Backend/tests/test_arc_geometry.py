@@ -0,0 +1,65 @@
+import math
+
+import ezdxf
+import numpy as np
+import pytest
+
+from app.services import extraction_cache
+from app.services.arc_geometry import bulge_segment_areas, tessellate_bulges, vertex_dict
+from app.services.file_service import _geometry_document, extract_dxf_data, get_file_summary, summarize_dxf
+from app.services.geometry_format import GeometryFile
+from app.services.surface_engine import polyline_areas
+
+
+@pytest.fixture
+def rounded_dxf(tmp_path):
+    """Rectangle 4 x 2 dont le côté gauche est remplacé par un demi-cercle extérieur de rayon 1."""
+    doc = ezdxf.new()
+    doc.modelspace().add_lwpolyline([(0, 0, 0, 0, 0), (4, 0, 0, 0, 0), (4, 2, 0, 0, 0), (0, 2, 0, 0, 1)],
+                                    format="xyseb", close=True, dxfattribs={"layer": "GEX_EDS_SDP_1-HABITATION_L"})
+    path = tmp_path / "arrondi.dxf"
+    doc.saveas(path)
+    return str(path)
+
+
+def test_segment_area_of_a_half_circle():
+    start, end = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 0.0]]), np.array([[-1.0, 0.0], [-1.0, 0.0], [0.0, 0.0]])
+    areas = bulge_segment_areas(start, end, [1.0, -1.0, 1.0])
+    assert areas.tolist() == pytest.approx([math.pi / 2, -math.pi / 2, 0.0])
+
+
+def test_tessellation_stays_within_tolerance():
+    coords = np.array([[1.0, 0.0], [-1.0, 0.0]])
+    owner = np.zeros(2, dtype=np.int64)
+    points, point_owner = tessellate_bulges(coords, np.array([1.0, 0.0]), owner, tolerance=1e-3)
+    assert len(points) > 20 and (point_owner == 0).all()
+    assert points[0].tolist() == [1.0, 0.0] and points[-1].tolist() == [-1.0, 0.0]
+    # Sommets intermédiaires sur le demi-cercle supérieur
+    assert np.hypot(points[1:-1, 0], points[1:-1, 1]) == pytest.approx(1.0)
+    assert (points[1:-1, 1] > 0).all()
+    # Flèche de chaque corde : distance du centre à son milieu
+    middles = (points[:-1] + points[1:]) / 2.0
+    assert (1.0 - np.hypot(middles[:, 0], middles[:, 1]) <= 1e-3 + 1e-12).all()
+
+    straight = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])
+    same, _ = tessellate_bulges(straight, np.zeros(3), np.zeros(3, dtype=np.int64))
+    assert same is straight
+
+
+def test_extraction_keeps_bulges_and_exact_areas(rounded_dxf):
+    vertices = extract_dxf_data(rounded_dxf)["polylines"][0]["vertices"]
+    assert vertices[3] == vertex_dict(0.0, 2.0, 1.0) and "bulge" not in vertices[0]
+
+    exact = 8 + math.pi / 2
+    assert summarize_dxf(rounded_dxf)["statistics"]["closed_polyline_area"] == pytest.approx(exact)
+    assert polyline_areas(extract_dxf_data(rounded_dxf)["polylines"], [0]).tolist() == pytest.approx([exact])
+    geometry = GeometryFile(_geometry_document(ezdxf.readfile(rounded_dxf)))
+    assert geometry.entity_areas()[0] == pytest.approx(exact)
+    assert geometry.to_extraction()["polylines"][0]["vertices"] == vertices
+
+
+def test_cache_format_change_invalidates_artifacts(rounded_dxf, monkeypatch):
+    summary = get_file_summary(rounded_dxf)
+    assert extraction_cache.get_cached(rounded_dxf, "summary") == summary
+    monkeypatch.setattr(extraction_cache, "CACHE_FORMAT", extraction_cache.CACHE_FORMAT + 1)
+    assert extraction_cache.get_cached(rounded_dxf, "summary") is None
@@ -0,0 +1,43 @@
+import json
+import logging
+
+import ezdxf
+
+from benchmarks import bench_pipeline
+from benchmarks.dxf_generator import DEMOLITION_LAYER, DESTINATION_LAYERS, build_document, generate_dxf
+
+
+def test_generated_plan_matches_requested_size():
+    doc = build_document(polylines=40, vertices=10, seed=1, noise=10)
+    polylines = [e for e in doc.modelspace() if e.dxftype() == 'LWPOLYLINE' and e.closed]
+    assert len(polylines) == 40
+    assert all(len(p) == 10 for p in polylines)
+    layers = {p.dxf.layer for p in polylines}
+    assert DEMOLITION_LAYER in layers and layers & set(DESTINATION_LAYERS)
+    assert len(doc.modelspace()) == 50
+
+
+def test_generation_is_deterministic(tmp_path):
+    first = generate_dxf(str(tmp_path / "a.dxf"), polylines=30, seed=7)
+    second = generate_dxf(str(tmp_path / "b.dxf"), polylines=30, seed=7)
+    points = [[list(e.get_points('xy')) for e in ezdxf.readfile(path).modelspace()] for path in (first, second)]
+    assert points[0] == points[1]
+
+
+def test_compare_flags_regressions_beyond_threshold(capsys):
+    previous = {"results": {"10x4": {"extract": {"median_s": 1.0}, "surface": {"median_s": 1.0}}}}
+    current = {"results": {"10x4": {"extract": {"median_s": 1.1}, "surface": {"median_s": 1.5}}}}
+    assert bench_pipeline.compare(previous, current, threshold=0.15) == 1
+    assert "RÉGRESSION" in capsys.readouterr().out
+
+
+def test_pipeline_benchmark_runs_end_to_end(tmp_path):
+    output = tmp_path / "bench.json"
+    try:
+        assert bench_pipeline.main(["--sizes", "20x4", "--repeat", "1", "--json", str(output)]) == 0
+        assert bench_pipeline.main(["--sizes", "20x4", "--repeat", "1", "--compare", str(output),
+                                    "--threshold", "1000"]) == 0
+    finally:
+        logging.disable(logging.NOTSET)
+    stages = json.loads(output.read_text())["results"]["20x4"]
+    assert all(stage["median_s"] > 0 for stage in stages.values() if isinstance(stage, dict))
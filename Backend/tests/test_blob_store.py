@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from app.services.blob_store import BlobStore
+
+DIGEST = "ab" + "0" * 62
+
+
+@pytest.fixture
+def store(tmp_path):
+    app = Flask(__name__)
+    app.config.update(RESSOURCES_FOLDER=str(tmp_path), DEDUP_ENABLED=True)
+    blob_store = BlobStore()
+    blob_store.init_app(app)
+    return blob_store
+
+
+def _upload(tmp_path, name, content=b"contenu du plan"):
+    path = tmp_path / f"{name}.part"
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_identical_uploads_share_one_blob(store, tmp_path):
+    first, second = str(tmp_path / "a.dxf"), str(tmp_path / "b.dxf")
+
+    assert store.add(_upload(tmp_path, "1"), DIGEST, first) is False
+    assert store.add(_upload(tmp_path, "2"), DIGEST, second) is True
+
+    assert os.stat(first).st_ino == os.stat(second).st_ino == os.stat(store.blob_path(DIGEST)).st_ino
+    assert not os.path.exists(tmp_path / "1.part") and not os.path.exists(tmp_path / "2.part")
+    assert store.stats() == {"blobs": 1, "references": 2, "stored_bytes": 15, "logical_bytes": 30, "saved_bytes": 15}
+
+
+def test_garbage_collection_removes_only_unreferenced_blobs(store, tmp_path):
+    kept, dropped = str(tmp_path / "kept.dxf"), str(tmp_path / "dropped.dxf")
+    other = "cd" + "0" * 62
+    store.add(_upload(tmp_path, "1"), DIGEST, kept)
+    store.add(_upload(tmp_path, "2", b"autre"), other, dropped)
+    os.makedirs(store.cache_dir(other))
+    os.unlink(dropped)
+
+    assert store.collect_garbage() == 1
+    assert os.path.exists(store.blob_path(DIGEST))
+    assert not os.path.exists(store.blob_path(other)) and not os.path.exists(store.cache_dir(other))
+
+
+def test_disabled_store_moves_the_file(tmp_path):
+    app = Flask(__name__)
+    app.config.update(RESSOURCES_FOLDER=str(tmp_path), DEDUP_ENABLED=False)
+    store = BlobStore()
+    store.init_app(app)
+    destination = str(tmp_path / "plan.dxf")
+
+    assert store.add(_upload(tmp_path, "1"), DIGEST, destination) is False
+    assert open(destination, "rb").read() == b"contenu du plan"
+    assert not os.path.exists(os.path.join(str(tmp_path), ".blobs"))
+
+
+def _hold_lock(root, ready, seconds):
+    store = BlobStore()
+    store.root = root
+    with store._locked():
+        ready.set()
+        time.sleep(seconds)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="verrou inter-processus POSIX")
+def test_lock_is_shared_between_processes(store, tmp_path):
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+    holder = context.Process(target=_hold_lock, args=(store.root, ready, 0.5))
+    holder.start()
+    try:
+        assert ready.wait(10)
+        started = time.monotonic()
+        store.add(_upload(tmp_path, "1"), DIGEST, str(tmp_path / "a.dxf"))
+        assert time.monotonic() - started >= 0.3
+    finally:
+        holder.join()
@@ -0,0 +1,79 @@
+import gzip
+import io
+import json
+
+import pytest
+from flask import Flask, jsonify, request
+
+from app.services import compression_service
+from app.services.compression_service import DECOMPRESS_BLOCK_SIZE, init_compression
+
+LIMIT = 64 * 1024
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(MAX_CONTENT_LENGTH=LIMIT, COMPRESSION_ALGORITHMS="zstd,br,gzip", COMPRESSION_MIN_SIZE=100)
+    init_compression(app)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return jsonify({"size": len(request.get_data())})
+
+    @app.route("/big")
+    def big():
+        return jsonify({"values": list(range(1000))})
+
+    return app.test_client()
+
+
+def _compressors():
+    compressors = {"gzip": gzip.compress}
+    if compression_service.zstandard is not None:
+        compressors["zstd"] = compression_service.zstandard.ZstdCompressor().compress
+    if compression_service.brotli is not None:
+        compressors["br"] = compression_service.brotli.compress
+    return compressors
+
+
+@pytest.mark.parametrize("encoding", sorted(_compressors()))
+def test_compressed_request_body_is_decoded(client, encoding):
+    body = json.dumps({"surfaces": list(range(2000))}).encode()
+
+    response = client.post("/echo", data=_compressors()[encoding](body),
+                           headers={"Content-Encoding": encoding, "Content-Type": "application/json"})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"size": len(body)}
+
+
+@pytest.mark.parametrize("encoding", sorted(_compressors()))
+def test_decompression_bomb_is_rejected(client, encoding):
+    bomb = _compressors()[encoding](b"\0" * (64 * LIMIT))
+
+    response = client.post("/echo", data=bomb, headers={"Content-Encoding": encoding})
+
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("encoding", sorted(_compressors()))
+def test_decoded_blocks_are_bounded(encoding):
+    chunks = compression_service._decoder(encoding)(io.BytesIO(_compressors()[encoding](b"\0" * (4 * 1024 * 1024))))
+
+    # Brotli cesse d'agrandir son tampon une fois la limite atteinte : il peut la dépasser d'un incrément
+    assert max(len(chunk) for chunk in chunks) <= 2 * DECOMPRESS_BLOCK_SIZE
+
+
+def test_unknown_or_corrupt_encoding_is_a_bad_request(client):
+    assert client.post("/echo", data=b"abc", headers={"Content-Encoding": "compress"}).status_code == 400
+    assert client.post("/echo", data=b"pas du gzip", headers={"Content-Encoding": "gzip"}).status_code == 400
+
+
+def test_response_encoding_is_negotiated(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data))["values"][-1] == 999
+    assert "Content-Encoding" not in client.get("/big").headers
@@ -0,0 +1,52 @@
+import logging
+import os
+
+from sqlalchemy import create_engine, text
+
+from config import build_engine_options, ensure_sqlite_directory, get_database_uri
+from app.services.db_pool_service import PoolMetrics
+
+
+def test_sqlite_profile_ignores_database_url(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "sqlite")
+    monkeypatch.setenv("DATABASE_URL", "postgresql://db/gex")
+    monkeypatch.setenv("SQLITE_DATABASE_URL", "sqlite:///local.db")
+    assert get_database_uri() == "sqlite:///local.db"
+
+
+def test_missing_database_url_warns_and_falls_back(monkeypatch, caplog):
+    monkeypatch.setenv("DB_PROFILE", "postgres")
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("SQLITE_DATABASE_URL", "sqlite:///local.db")
+    with caplog.at_level(logging.WARNING, logger="config"):
+        assert get_database_uri() == "sqlite:///local.db"
+    assert "DATABASE_URL" in caplog.text
+
+
+def test_engine_options_per_backend(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    postgres = build_engine_options("postgresql://db/gex")
+    assert postgres["pool_size"] == 12 and postgres["pool_pre_ping"] and postgres["pool_use_lifo"]
+    assert "statement_timeout=30000" in postgres["connect_args"]["options"]
+    assert "pool_size" not in build_engine_options("sqlite:///local.db")
+    assert build_engine_options("sqlite://")["poolclass"].__name__ == "StaticPool"
+
+
+def test_ensure_sqlite_directory(tmp_path):
+    target = tmp_path / "instance" / "local.db"
+    ensure_sqlite_directory(f"sqlite:///{target}")
+    assert os.path.isdir(target.parent)
+    ensure_sqlite_directory("sqlite://")
+    ensure_sqlite_directory("postgresql://db/gex")
+
+
+def test_pool_metrics_count_checkouts():
+    engine = create_engine("sqlite://", **build_engine_options("sqlite://"))
+    metrics = PoolMetrics()
+    metrics.instrument(engine)
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts_total"] == snapshot["checkins_total"] == 3
+    assert snapshot["checked_out_max"] == 1 and snapshot["pool_class"] == "StaticPool"
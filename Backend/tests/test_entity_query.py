@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.entity_query_service import parse_entity_query, query_entities
+
+
+def _query(path, **params):
+    return query_entities(path, **parse_entity_query(params))
+
+
+def test_polylines_of_a_layer_prefix(mixed_dxf):
+    result = _query(mixed_dxf, types='polylines', layers='gex_eds')
+    assert result["matched"] == 2 and result["counts"]["polylines"] == 2
+    assert result["layer_counts"] == {"GEX_EDS_SDP_1-HABITATION": 2}
+    assert [row["closed"] for row in result["items"]] == [True, False]
+
+
+def test_sort_by_area_descending_with_pages(mixed_dxf):
+    first = _query(mixed_dxf, sort='-area', pageSize=2)
+    assert first["pages"] == 4 and [row["id"] for row in first["items"]] == [0, 5]
+    assert first["items"][1]["area"] == pytest.approx(4 * 3.141592653589793)
+    second = _query(mixed_dxf, sort='-area', pageSize=2, page=2)
+    assert [row["id"] for row in second["items"]] == [2, 1]
+
+
+def test_closed_only_and_area_range(mixed_dxf):
+    result = _query(mixed_dxf, closedOnly='true', minArea=1, maxArea=10)
+    assert [(row["id"], row["type"], row["layer"]) for row in result["items"]] == [(2, "POLYLINE", "sdp_a")]
+
+
+def test_bbox_uses_the_spatial_index(mixed_dxf):
+    result = _query(mixed_dxf, bbox='19,19,21,21')
+    assert [row["type"] for row in result["items"]] == ["CIRCLE"]
+    assert result["items"][0]["bbox"] == [18.0, 18.0, 22.0, 22.0]
+
+
+@pytest.mark.parametrize("params", [
+    {"types": "spline"},
+    {"bbox": "1,2,3"},
+    {"bbox": "5,0,1,1"},
+    {"sort": "couleur"},
+    {"minArea": "beaucoup"},
+    {"page": "un"},
+])
+def test_invalid_parameters_are_rejected(params):
+    with pytest.raises(ValueError):
+        parse_entity_query(params)
@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.file_service import extract_dxf_data, parse_extraction_filters
+
+
+def test_closed_only_keeps_closed_polylines_of_a_mixed_file(mixed_dxf):
+    result = extract_dxf_data(mixed_dxf, closed_only=True)
+
+    assert "error" not in result
+    assert [(p["type"], p["closed"]) for p in result["polylines"]] == [("LWPOLYLINE", True), ("POLYLINE", True)]
+    assert result["lines"] == result["circles"] == result["arcs"] == result["texts"] == []
+
+
+def test_full_extraction_reports_polyline_closed_flags(mixed_dxf):
+    result = extract_dxf_data(mixed_dxf)
+
+    assert [p["closed"] for p in result["polylines"]] == [True, False, True, False]
+    assert result["statistics"]["total_entities"] == 8
+    assert (len(result["lines"]), len(result["circles"]), len(result["arcs"]), len(result["texts"])) == (1, 1, 1, 1)
+
+
+def test_entity_type_and_layer_filters(mixed_dxf):
+    result = extract_dxf_data(mixed_dxf, entity_types=("CIRCLE", "LWPOLYLINE"), layers=("gex_eds_",))
+
+    assert [p["layer"] for p in result["polylines"]] == ["GEX_EDS_SDP_1-HABITATION"] * 2
+    assert result["circles"] == []
+
+
+def test_parse_extraction_filters():
+    filters = parse_extraction_filters({"entityTypes": "lwpolyline, circle", "layers": "GEX_EDS_*", "closedOnly": "1"})
+
+    assert filters == {"entity_types": ("LWPOLYLINE", "CIRCLE"), "layers": ("GEX_EDS_*",), "closed_only": True}
+    assert parse_extraction_filters({"profile": "surface"})["closed_only"] is True
+    with pytest.raises(ValueError):
+        parse_extraction_filters({"entityTypes": "SPLINE"})
+    with pytest.raises(ValueError):
+        parse_extraction_filters({"profile": "inconnu"})
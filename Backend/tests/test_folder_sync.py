@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from app.models.folder import Folder
+from app.models.user import User
+from app.services.folder_sync_service import FolderSynchronizer, folder_names_for_email
+
+
+@pytest.fixture
+def synchronizer(app, database, tmp_path):
+    sync = FolderSynchronizer()
+    sync.app = app
+    sync.base_resource_path = str(tmp_path)
+    return sync
+
+
+def _user(database, email):
+    user = User(nom="Nom", prenom="Prenom", email=email, password="secret", role="user")
+    database.session.add(user)
+    database.session.commit()
+    return user
+
+
+def test_folder_names_for_email():
+    assert folder_names_for_email("jean.dupont@example.com") == {"jean.dupont", "jean_dupont"}
+    assert folder_names_for_email("") == set()
+
+
+def test_flush_without_dirty_entries_does_nothing(synchronizer):
+    assert synchronizer.flush() == (0, 0)
+
+
+def test_dirty_folder_is_added_for_its_owner(synchronizer, database, tmp_path):
+    user = _user(database, "jean.dupont@example.com")
+    os.mkdir(tmp_path / "jean_dupont")
+    os.mkdir(tmp_path / "inconnu")
+
+    synchronizer.mark_dirty("jean_dupont", "inconnu", ".cache")
+    assert synchronizer.flush() == (1, 0)
+    assert [(f.id_user, f.nom_dossier) for f in Folder.query.all()] == [(user.id, "jean_dupont")]
+
+
+def test_only_dirty_entries_are_reconciled(synchronizer, database, tmp_path):
+    _user(database, "a@example.com")
+    _user(database, "b@example.com")
+    os.mkdir(tmp_path / "a")
+    os.mkdir(tmp_path / "b")
+
+    synchronizer.mark_dirty("a")
+    synchronizer.flush()
+    assert {f.nom_dossier for f in Folder.query.all()} == {"a"}
+
+    synchronizer.mark_all_dirty()
+    synchronizer.flush()
+    assert {f.nom_dossier for f in Folder.query.all()} == {"a", "b"}
+
+
+def test_removed_folder_is_deleted(synchronizer, database, tmp_path):
+    user = _user(database, "a@example.com")
+    database.session.add(Folder(id_user=user.id, nom_dossier="a"))
+    database.session.commit()
+
+    synchronizer.mark_user_dirty("a@example.com")
+    assert synchronizer.flush() == (0, 1)
+    assert Folder.query.count() == 0
+
+
+def test_sync_folders_endpoint_runs_a_full_reconciliation(app, database):
+    from app.services.folder_sync_service import folder_sync
+
+    user = _user(database, "marie.curie@example.com")
+    os.makedirs(os.path.join(folder_sync.base_resource_path, "marie_curie"))
+    database.session.add(Folder(id_user=user.id, nom_dossier="disparu"))
+    database.session.commit()
+
+    response = app.test_client().get("/api/users/sync-folders")
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body["folders_added"], body["folders_removed"]) == (1, 1)
+    assert "marie_curie" in body["physical_folders"] and body["database_folders"] == ["disparu"]
+    assert [f.nom_dossier for f in Folder.query.all()] == ["marie_curie"]
@@ -0,0 +1,45 @@
+import ezdxf
+import numpy as np
+
+from app.services.file_service import _geometry_document, extract_dxf_data
+from app.services.geometry_format import GeometryFile
+
+
+def _geometry(path, **filters):
+    return GeometryFile(_geometry_document(ezdxf.readfile(path), **filters))
+
+
+def test_round_trip_matches_json_extraction(mixed_dxf):
+    assert _geometry(mixed_dxf).to_extraction() == extract_dxf_data(mixed_dxf)
+
+
+def test_polyline_closed_flag(mixed_dxf):
+    polylines = _geometry(mixed_dxf).to_extraction()["polylines"]
+    assert [(p["type"], p["closed"]) for p in polylines] == [
+        ("LWPOLYLINE", True), ("LWPOLYLINE", False), ("POLYLINE", True), ("POLYLINE", False)]
+
+
+def test_closed_only_matches_json_extraction(mixed_dxf):
+    geometry = _geometry(mixed_dxf, closed_only=True).to_extraction()
+    assert geometry == extract_dxf_data(mixed_dxf, closed_only=True)
+    assert [p["layer"] for p in geometry["polylines"]] == ["GEX_EDS_SDP_1-HABITATION", "sdp_a"]
+
+
+def test_entity_layer_case_is_preserved(tmp_path):
+    doc = ezdxf.new()
+    doc.layers.add("SDP_A")
+    doc.modelspace().add_lwpolyline([(0, 0), (1, 0), (1, 1)], close=True, dxfattribs={"layer": "sdp_a"})
+    path = str(tmp_path / "casse.dxf")
+    doc.saveas(path)
+
+    geometry = _geometry(path).to_extraction()
+    assert geometry["polylines"][0]["layer"] == "sdp_a"
+    assert geometry == extract_dxf_data(path)
+
+
+def test_areas_and_bounds(mixed_dxf):
+    geometry = _geometry(mixed_dxf)
+    areas = geometry.entity_areas()
+    # Ordre du modelspace : polylignes fermée/ouverte (LWPOLYLINE puis POLYLINE), ligne, cercle, arc, texte
+    np.testing.assert_allclose(areas, [16.0, 0, 4.0, 0, 0, np.pi * 4, 0, 0])
+    np.testing.assert_allclose(geometry.entity_bounds()[0], [0, 0, 4, 4])
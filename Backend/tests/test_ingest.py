@@ -0,0 +1,55 @@
+import pytest
+
+from app.services import extraction_cache
+from app.services.file_service import CACHED_ARTIFACTS, get_file_data, precompute_artifacts
+from app.services.ingest_service import IngestPipeline
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = IngestPipeline()
+    pipeline.artifacts = ['summary', 'extract_full']
+    pipeline.tile_pyramid_max_zoom = -1
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_precompute_fills_every_missing_artifact_once(mixed_dxf):
+    assert precompute_artifacts(mixed_dxf) == list(CACHED_ARTIFACTS)
+    assert all(extraction_cache.get_cached_path(mixed_dxf, artifact) for artifact in CACHED_ARTIFACTS)
+    assert precompute_artifacts(mixed_dxf) == []
+
+
+def test_submitted_plan_is_served_from_cache(pipeline, mixed_dxf):
+    future = pipeline.submit(mixed_dxf)
+    assert future.result(timeout=30) == ['summary', 'extract_full', 'spatial_index']
+    assert pipeline.wait(timeout=5)
+    assert extraction_cache.get_cached(mixed_dxf, 'extract_full') == get_file_data(mixed_dxf)
+    assert pipeline.status(mixed_dxf) is None
+
+    snapshot = pipeline.snapshot()
+    assert snapshot["submitted_total"] == snapshot["completed_total"] == 1
+    assert snapshot["queue_depth"] == 0
+
+
+def test_non_dxf_and_disabled_submissions_are_ignored(pipeline, mixed_dxf, tmp_path):
+    assert pipeline.submit(str(tmp_path / "notes.txt")) is None
+    pipeline.enabled = False
+    assert pipeline.submit(mixed_dxf) is None
+
+
+def test_failures_are_counted(pipeline, tmp_path):
+    broken = tmp_path / "casse.dxf"
+    broken.write_text("pas un DXF")
+    assert pipeline.submit(str(broken)).result(timeout=30) == []
+    assert pipeline.snapshot()["failed_total"] == 1
+
+
+def test_unknown_artifacts_are_rejected(app):
+    pipeline = IngestPipeline()
+    app.config['INGEST_ARTIFACTS'] = 'summary,inconnu'
+    try:
+        with pytest.raises(ValueError):
+            pipeline.init_app(app)
+    finally:
+        app.config.pop('INGEST_ARTIFACTS')
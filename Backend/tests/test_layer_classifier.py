@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.services import layer_classifier
+from app.services.layer_classifier import (LayerRules, classify_layer, current_rules, install_layer_rules,
+                                           is_detail_main_layer, load_layer_rules)
+
+
+@pytest.fixture
+def restore_rules():
+    rules = current_rules()
+    yield
+    install_layer_rules(rules)
+
+
+def test_main_layer_destination_and_alias():
+    habitation = classify_layer('GEX_EDS_SDP_1-HABITATION_L')
+    assert (habitation.category, habitation.destination, habitation.name) == ('main', 'HABITATION_L', 'HABITATION_L')
+    assert classify_layer('GEX_EDS_SDP_1-EXPLOITATIO0').destination == 'EXPLOITATIO'
+
+
+def test_special_demolition_rdv_and_other():
+    assert classify_layer('GEX_EDS_SDP_3-H-180')[:3] == ('special', None, 'H-180')
+    assert classify_layer('GEX_EDS_TA_SDP_CAHIER_DEMO').category == 'demolition'
+    assert classify_layer('GEX_EDS_SDP_1-LOC_SOC').rdv
+    assert classify_layer('COTES') == ('other', None, None, False, 'COTES', 'Cotes')
+    assert classify_layer(None).category == 'other'
+
+
+def test_detail_sheet_keeps_prefix_semantics():
+    # Catégorie 'main' par motif contenu, mais la feuille détaillée ne retient que le préfixe
+    assert classify_layer('ANCIEN_GEX_EDS_SDP_1-HABITATION_L').category == 'main'
+    assert not is_detail_main_layer('ANCIEN_GEX_EDS_SDP_1-HABITATION_L')
+    assert is_detail_main_layer('GEX_EDS_SDP_1-HABITATION_L')
+    assert not is_detail_main_layer(None)
+
+
+def test_first_rule_wins_over_later_matches():
+    rules = LayerRules({'layers': [{'contains': 'SDP_1', 'category': 'main'},
+                                   {'contains': 'SDP_1-DEMO', 'category': 'demolition'}]})
+    rule, rdv = rules.match('X_SDP_1-DEMO')
+    assert rule[1] == 'main' and not rdv
+
+
+def test_invalid_rule_is_rejected():
+    with pytest.raises(ValueError):
+        LayerRules({'layers': [{'contains': 'X', 'category': 'inconnue'}]})
+
+
+def test_installed_rules_invalidate_memoized_classes(tmp_path, restore_rules):
+    assert classify_layer('ZONE_A').category == 'other'
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'layers': [{'contains': 'ZONE_', 'category': 'special', 'special': 'PK'}]}))
+    install_layer_rules(load_layer_rules(str(path)))
+    assert classify_layer('ZONE_A')[:3] == ('special', None, 'PK')
+    assert layer_classifier.current_rules().source == str(path)
+
+
+def test_classification_is_memoized_per_layer_name():
+    classify_layer.cache_clear()
+    for _ in range(3):
+        classify_layer('GEX_EDS_SDP_1-COMMERCE_CIN')
+    info = classify_layer.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_short_names_and_display_labels():
+    assert classify_layer('GEX_EDS_SDP_1-COMMERCE_CIN').display_name == 'Commerce cinéma'
+    # Le motif SDP_X-CATEGORIE passe avant la hauteur sous plafond, comme dans le calcul d'origine
+    assert classify_layer('GEX_EDS_SDP_3-H-180').name == 'H'
+    assert classify_layer('HSP_H-180').name == 'H-180'
+    assert classify_layer('GEX_EDS_SDP_5-PK').name == 'PK'
+    assert layer_classifier.format_destination('LOCAL_VELO') == 'Local velo'
+    assert layer_classifier.destination_name({'layer': '', 'type': 'LWPOLYLINE'}) == 'LWPOLYLINE'
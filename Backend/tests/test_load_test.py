@@ -0,0 +1,32 @@
+import pytest
+
+from benchmarks import load_test
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert load_test.percentile(values, 0.5) == 50
+    assert load_test.percentile(values, 0.95) == 95
+    assert load_test.percentile(values, 0.99) == 99
+    assert load_test.percentile([7], 0.99) == 7
+    assert load_test.percentile([], 0.5) is None
+
+
+def test_parse_mix_ignores_zero_weights():
+    assert load_test.parse_mix("login=1, files=5,excel=0") == {"login": 1.0, "files": 5.0}
+
+
+def test_database_url_requires_reset_flag(capsys):
+    with pytest.raises(SystemExit):
+        load_test.main(["--database-url", "postgresql://localhost/gex"])
+    assert "--reset-database" in capsys.readouterr().err
+
+
+def test_seed_refuses_to_reset_another_database(app, database, tmp_path):
+    from app.models.user import User
+    database.session.add(User("Nom", "Prenom", "garde@example.com", "x", "user"))
+    database.session.commit()
+
+    with pytest.raises(RuntimeError):
+        load_test.seed(app, users=1, polylines=4, vertices=4, workdir=str(tmp_path))
+    assert User.query.filter_by(email="garde@example.com").count() == 1
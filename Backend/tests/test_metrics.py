@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from flask import Flask
+
+from app.services.metrics_service import Histogram, init_metrics, span
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask("metrics_test")
+    app.config.update(PROFILING_ENABLED=True, PROFILING_BACKEND="cprofile", PROFILING_OUTPUT_DIR=str(tmp_path))
+    init_metrics(app, service_name="metrics_test")
+
+    @app.route("/travail")
+    def travail():
+        with span("parse_test"):
+            pass
+        return "ok"
+
+    @app.route("/echec")
+    def echec():
+        with span("echec_test"):
+            raise RuntimeError("échec")
+
+    return app.test_client()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "doc", buckets=(0.1, 1.0))
+    histogram.observe({"route": "/a"}, 0.5)
+    histogram.observe({"route": "/a"}, 0.05)
+    lines = histogram.render()
+    assert 'h_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'h_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'h_count{route="/a"} 2' in lines
+
+
+def test_server_timing_lists_spans(client):
+    response = client.get("/travail")
+    timings = response.headers["Server-Timing"]
+    assert timings.startswith("parse_test;dur=") and "total;dur=" in timings
+
+
+def test_metrics_endpoint_exports_routes_and_spans(client):
+    client.get("/travail")
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'route="/travail"' in body and 'service="metrics_test"' in body
+    assert 'span="parse_test"' in body
+
+
+def test_span_is_recorded_when_the_block_raises(client):
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    assert client.get("/echec").status_code == 500
+    assert 'span="echec_test"' in client.get("/metrics").get_data(as_text=True)
+
+
+def test_requested_profile_is_written(client, tmp_path):
+    response = client.get("/travail", headers={"X-Profile": "1"})
+    assert response.headers["X-Profile-File"].endswith(".prof")
+    assert os.path.exists(tmp_path / response.headers["X-Profile-File"])
+    assert "X-Profile-File" not in client.get("/travail").headers
+
+
+def test_metrics_are_served_to_allowed_networks_only(client):
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 403
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "::1"}).status_code == 200
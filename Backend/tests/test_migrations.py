@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import sqlalchemy as sa
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _flask_db(database_path, *args):
+    env = dict(os.environ, DB_PROFILE="sqlite", SQLITE_DATABASE_URL=f"sqlite:///{database_path}")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app:create_app", "db", *args],
+                   cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+
+
+def _indexes(engine, table):
+    return {index["name"] for index in sa.inspect(engine).get_indexes(table)}
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / "migrations.db"
+
+
+def test_upgrade_and_downgrade_keep_folder_data(database_path):
+    _flask_db(database_path, "upgrade", "e2a359007539")
+    engine = sa.create_engine(f"sqlite:///{database_path}")
+    # Table folder créée hors migration (db.create_all), avec un doublon à éliminer
+    with engine.begin() as connection:
+        connection.execute(sa.text("INSERT INTO user (id, nom, prenom, email, password, role) "
+                                   "VALUES (1, 'N', 'P', 'a@example.com', 'x', 'user')"))
+        connection.execute(sa.text("CREATE TABLE folder (id INTEGER PRIMARY KEY, id_user INTEGER NOT NULL, "
+                                   "nom_dossier VARCHAR(100) NOT NULL, date_creation DATETIME NOT NULL)"))
+        connection.execute(sa.text("INSERT INTO folder VALUES (1, 1, 'a', '2025-01-01'), (2, 1, 'a', '2025-01-02')"))
+
+    _flask_db(database_path, "upgrade")
+    assert {"ix_folder_id_user", "ix_folder_nom_dossier"} <= _indexes(engine, "folder")
+    assert "ix_user_role" in _indexes(engine, "user")
+    unique = sa.inspect(engine).get_unique_constraints("folder")
+    assert [c["name"] for c in unique] == ["uq_folder_id_user_nom_dossier"]
+    with engine.connect() as connection:
+        assert connection.execute(sa.text("SELECT id FROM folder")).scalars().all() == [1]
+
+    _flask_db(database_path, "downgrade")
+    assert not _indexes(engine, "folder") and "ix_user_role" not in _indexes(engine, "user")
+    assert sa.inspect(engine).get_unique_constraints("folder") == []
+    with engine.connect() as connection:
+        assert connection.execute(sa.text("SELECT count(*) FROM folder")).scalar() == 1
+    engine.dispose()
+
+
+def test_upgrade_creates_folder_table(database_path):
+    _flask_db(database_path, "upgrade")
+    engine = sa.create_engine(f"sqlite:///{database_path}")
+    assert {"ix_folder_id_user", "ix_folder_nom_dossier"} <= _indexes(engine, "folder")
+    assert [c["name"] for c in sa.inspect(engine).get_unique_constraints("folder")] == ["uq_folder_id_user_nom_dossier"]
+    engine.dispose()
@@ -0,0 +1,18 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+def _headers(role):
+    return {"Authorization": f"Bearer {create_access_token(identity='1', additional_claims={'role': role})}"}
+
+
+@pytest.mark.parametrize("path", ["/api/monitoring/db-pool", "/api/monitoring/blob-store"])
+def test_monitoring_endpoints_are_reserved_to_admins(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=_headers("user")).status_code == 403
+    assert client.get(path, headers=_headers("admin")).status_code == 200
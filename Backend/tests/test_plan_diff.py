@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("shapely")
+
+from app.services.plan_diff_service import diff_plans  # noqa: E402
+
+DESTINATIONS = {"HAB": "HABITATION", "COM": "COMMERCE", "BUR": "BUREAU"}
+
+
+def _square(layer, x0, y0, x1, y1):
+    return {"type": "LWPOLYLINE", "layer": layer, "closed": True,
+            "vertices": [{"x": x, "y": y} for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))]}
+
+
+def _diff(existant, projet):
+    return diff_plans(existant, projet, lambda polyline: DESTINATIONS.get(polyline["layer"]))
+
+
+def test_statuses_and_surfaces():
+    existant = [_square("HAB", 0, 0, 10, 10), _square("COM", 20, 20, 30, 30), _square("HAB", 40, 40, 50, 50)]
+    projet = [
+        _square("HAB", 0, 0, 10, 10),    # inchangée
+        _square("COM", 20, 20, 35, 30),  # agrandie
+        _square("BUR", 40, 40, 50, 50),  # changement de destination
+        _square("HAB", 60, 60, 70, 70),  # nouvelle
+    ]
+    result = _diff(existant, projet)
+
+    assert result["elements"] == {"unchanged": 1, "modified": 1, "added": 2, "removed": 1}
+    assert result["cree"] == {"COMMERCE": pytest.approx(50.0), "HABITATION": pytest.approx(100.0)}
+    assert result["cree_changement"] == {"BUREAU": pytest.approx(100.0)}
+    assert result["supprimee"] == {}
+    assert result["supprimee_changement"] == {"HABITATION": pytest.approx(100.0)}
+
+    modified = next(c for c in result["changes"] if c["status"] == "modified")
+    assert (modified["existant_index"], modified["projet_index"]) == (1, 1)
+    assert modified["area_delta"] == pytest.approx(50.0)
+
+
+def test_vertex_order_and_tolerance_do_not_count_as_changes():
+    existant = [_square("HAB", 0, 0, 10, 10)]
+    shifted = _square("HAB", 0, 0, 10, 10 + 1e-4)
+    shifted["vertices"] = shifted["vertices"][2:] + shifted["vertices"][:2]
+    result = _diff(existant, [shifted])
+    assert result["elements"]["unchanged"] == 1 and result["changes"] == []
+
+
+def test_demolished_surface_is_removed():
+    result = _diff([_square("HAB", 0, 0, 10, 10), _square("HAB", 20, 0, 25, 10)], [_square("HAB", 0, 0, 10, 10)])
+    assert result["supprimee"] == {"HABITATION": pytest.approx(50.0)}
+    assert [c["status"] for c in result["changes"]] == ["removed"]
+
+
+def test_polylines_without_destination_are_ignored():
+    result = _diff([_square("COTES", 0, 0, 10, 10)], [_square("COTES", 5, 5, 15, 15)])
+    assert result["elements"] == {"unchanged": 0, "modified": 0, "added": 0, "removed": 0}
@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+shapely = pytest.importorskip("shapely")
+
+from app.services.arc_geometry import ARC_TOLERANCE  # noqa: E402
+from app.services.polygon_repair import repair_polygons  # noqa: E402
+
+
+def _polyline(*points, bulges=None):
+    bulges = bulges or [0.0] * len(points)
+    return {"layer": "GEX_EDS_SDP_1-HABITATION_L",
+            "vertices": [{"x": x, "y": y, "bulge": b} for (x, y), b in zip(points, bulges)]}
+
+
+def test_valid_contours_keep_their_area_and_order():
+    square = _polyline((0, 0), (4, 0), (4, 4), (0, 4))
+    clockwise = _polyline((10, 0), (10, 2), (12, 2), (12, 0))
+    polygons = repair_polygons([square, {"layer": "X"}, clockwise])
+    assert polygons[1] is None
+    assert shapely.area(polygons[0]) == 16.0 and shapely.area(polygons[2]) == 4.0
+    assert shapely.is_ccw(polygons[2].exterior)
+
+
+def test_duplicate_and_closing_vertices_are_removed():
+    polyline = _polyline((0, 0), (4, 0), (4, 0), (4, 4), (0, 4), (0, 0))
+    polygon = repair_polygons([polyline])[0]
+    assert shapely.is_valid(polygon) and len(polygon.exterior.coords) == 5
+
+
+def test_self_intersecting_contour_becomes_a_multipolygon():
+    bowtie = _polyline((0, 0), (2, 2), (2, 0), (0, 2))
+    polygon = repair_polygons([bowtie])[0]
+    assert shapely.is_valid(polygon)
+    assert shapely.get_type_id(polygon) == 6 and shapely.area(polygon) == pytest.approx(2.0)
+
+
+def test_degenerate_contours_have_no_surface():
+    line = _polyline((0, 0), (1, 1), (2, 2))
+    point = _polyline((0, 0), (0, 0), (0, 0))
+    assert repair_polygons([line, point]).tolist() == [None, None]
+
+
+def test_arcs_are_tessellated_unless_disabled():
+    # Demi-disque de rayon 1 : diamètre (-1, 0) -> (1, 0) puis arc antihoraire de 180° (bulge 1)
+    half_disc = _polyline((1, 0), (-1, 0), bulges=[0.0, 1.0])
+    # Cordes inscrites dont la flèche ne dépasse pas ARC_TOLERANCE : écart d'aire < flèche x longueur de l'arc
+    area = shapely.area(repair_polygons([half_disc])[0])
+    assert math.pi / 2 - ARC_TOLERANCE * math.pi < area < math.pi / 2
+    assert repair_polygons([half_disc], arc_tolerance=None)[0] is None
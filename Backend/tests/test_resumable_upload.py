@@ -0,0 +1,84 @@
+import hashlib
+import io
+import os
+
+import pytest
+from flask import Flask
+
+from app.services import resumable_upload_service as resumable
+from app.services import upload_service
+from app.services.blob_store import BlobStore
+
+CHUNK = resumable.MIN_CHUNK_SIZE
+CONTENT = os.urandom(2 * CHUNK + 1000)
+
+
+@pytest.fixture
+def context(tmp_path, monkeypatch):
+    app = Flask("resumable_test")
+    app.config.update(RESSOURCES_FOLDER=str(tmp_path), UPLOAD_MAX_FILE_SIZE=10 * CHUNK)
+    monkeypatch.setattr(upload_service, "blob_store", BlobStore())
+    with app.app_context():
+        yield tmp_path
+
+
+def _open(tmp_path, **options):
+    return resumable.create_session("alice", "plan.dxf", len(CONTENT), destination_dir=str(tmp_path / "M1"),
+                                    chunk_size=CHUNK, **options)
+
+
+def _put(upload_id, index, owner="alice"):
+    data = CONTENT[index * CHUNK:(index + 1) * CHUNK]
+    return resumable.write_chunk(upload_id, owner, index * CHUNK, io.BytesIO(data), len(data))
+
+
+def test_chunks_in_any_order_are_reassembled(context):
+    upload_id = _open(context, sha256=hashlib.sha256(CONTENT).hexdigest())["upload_id"]
+    for index in (2, 0, 0, 1):
+        status = _put(upload_id, index)
+    assert status["missing_chunks"] == [] and status["received_bytes"] == len(CONTENT)
+
+    result = resumable.finalize(upload_id, "alice")
+    assert result["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert open(result["path"], "rb").read() == CONTENT
+    with pytest.raises(resumable.UploadSessionNotFound):
+        resumable.get_status(upload_id, "alice")
+
+
+def test_status_lists_missing_chunks_for_resume(context):
+    upload_id = _open(context)["upload_id"]
+    _put(upload_id, 1)
+    status = resumable.get_status(upload_id, "alice")
+    assert (status["total_chunks"], status["missing_chunks"]) == (3, [0, 2])
+    with pytest.raises(ValueError):
+        resumable.finalize(upload_id, "alice")
+
+
+def test_invalid_chunks_are_rejected(context):
+    upload_id = _open(context)["upload_id"]
+    with pytest.raises(ValueError):
+        resumable.write_chunk(upload_id, "alice", 100, io.BytesIO(b"x"), 1)
+    with pytest.raises(ValueError):
+        resumable.write_chunk(upload_id, "alice", 0, io.BytesIO(b"court"), 5)
+    with pytest.raises(PermissionError):
+        _put(upload_id, 0, owner="bob")
+    with pytest.raises(resumable.UploadSessionNotFound):
+        resumable.get_status("../../etc", "alice")
+
+
+def test_hash_mismatch_is_refused(context):
+    upload_id = _open(context, sha256="0" * 64)["upload_id"]
+    for index in range(3):
+        _put(upload_id, index)
+    with pytest.raises(ValueError):
+        resumable.finalize(upload_id, "alice")
+    assert not os.path.exists(context / "M1" / "plan.dxf")
+
+
+def test_session_limits_and_expiry(context):
+    with pytest.raises(ValueError):
+        resumable.create_session("alice", "gros.dxf", 11 * CHUNK, destination_dir=str(context))
+    with pytest.raises(ValueError):
+        resumable.create_session("alice", "plan.dxf", 1000, destination_dir=str(context), chunk_size=1024)
+    _open(context)
+    assert resumable.purge_expired_sessions(ttl=-1) == 1
@@ -0,0 +1,68 @@
+import ezdxf
+import numpy as np
+
+from app.services import extraction_cache
+from app.services.spatial_index import (ARTIFACT, build_file_spatial_index, get_spatial_index, point_in_ring,
+                                        points_in_ring)
+
+
+def _brute_force(spatial, bbox):
+    b = spatial.bounds
+    hit = (b[:, 0] <= bbox[2]) & (b[:, 2] >= bbox[0]) & (b[:, 1] <= bbox[3]) & (b[:, 3] >= bbox[1])
+    return np.flatnonzero(hit)
+
+
+def test_bbox_queries_match_a_full_scan(tmp_path):
+    from benchmarks.dxf_generator import generate_dxf
+    path = generate_dxf(str(tmp_path / "plan.dxf"), polylines=300, noise=100, seed=3)
+    spatial = get_spatial_index(path)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        x, y = rng.uniform(-10, 250, size=2)
+        bbox = [x, y, x + rng.uniform(0, 40), y + rng.uniform(0, 40)]
+        assert spatial.query_bbox(bbox).tolist() == _brute_force(spatial, bbox).tolist()
+
+
+def test_index_is_persisted_once(mixed_dxf):
+    assert build_file_spatial_index(mixed_dxf)
+    assert extraction_cache.get_cached_path(mixed_dxf, ARTIFACT) is not None
+    assert not build_file_spatial_index(mixed_dxf)
+    assert get_spatial_index(mixed_dxf) is get_spatial_index(mixed_dxf)
+
+
+def test_layer_filter_and_point_queries(mixed_dxf):
+    spatial = get_spatial_index(mixed_dxf)
+    everything = [-1, -1, 40, 40]
+    assert spatial.query_bbox(everything, layers=["cotes"]).tolist() == [4, 5, 6]
+    assert spatial.query_bbox(everything, layers=["absent"]).tolist() == []
+    assert spatial.query_point(1, 11).tolist() == [2]
+    assert spatial.query_point(3, 3).tolist() == [0]
+    assert spatial.query_point(8, 8).tolist() == []
+
+
+def test_layer_names_differing_by_case_are_all_queried(tmp_path):
+    doc = ezdxf.new()
+    doc.layers.add("SDP_A")
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0), (1, 0), (1, 1)], close=True, dxfattribs={"layer": "SDP_A"})
+    msp.add_lwpolyline([(2, 0), (3, 0), (3, 1)], close=True, dxfattribs={"layer": "sdp_a"})
+    path = str(tmp_path / "casse.dxf")
+    doc.saveas(path)
+
+    spatial = get_spatial_index(path)
+    assert spatial.query_bbox([-1, -1, 5, 5], layers=["Sdp_A"]).tolist() == [0, 1]
+
+
+def test_within_and_ring_membership(tmp_path):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0), (10, 0), (10, 10), (0, 10)], close=True)
+    msp.add_lwpolyline([(1, 1), (2, 1), (2, 2)], close=True)
+    msp.add_lwpolyline([(9, 9), (12, 9), (12, 12)], close=True)
+    path = str(tmp_path / "inclus.dxf")
+    doc.saveas(path)
+
+    assert get_spatial_index(path).query_within(0).tolist() == [1]
+    ring = [(0, 0), (4, 0), (4, 4), (0, 4)]
+    assert points_in_ring([(1, 1), (5, 1)], ring).tolist() == [True, False]
+    assert not point_in_ring(1, 1, ring[:2])
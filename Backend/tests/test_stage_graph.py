@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.services.stage_graph import StageGraph, approximate_size
+
+shapely = pytest.importorskip("shapely")
+
+
+def _graph(**limits):
+    graph = StageGraph('test', **limits)
+    calls = []
+
+    @graph.stage('double', 'a')
+    def double(a):
+        calls.append('double')
+        return [x * 2 for x in a]
+
+    @graph.stage('total', 'double', 'b')
+    def total(doubled, b):
+        calls.append('total')
+        return sum(doubled) + sum(b)
+
+    return graph, calls
+
+
+def test_only_downstream_stages_are_recomputed():
+    graph, calls = _graph()
+    assert graph.run({'a': [1, 2], 'b': [3]}, ('total',)) == {'total': 9}
+    assert calls == ['double', 'total']
+
+    calls.clear()
+    assert graph.run({'a': [1, 2], 'b': [4]}, ('total',)) == {'total': 10}
+    assert calls == ['total']
+    assert graph.hits == {'double': 1}
+    assert graph.misses == {'double': 1, 'total': 2}
+
+
+def test_cache_is_bounded_by_approximate_size():
+    graph, calls = _graph(max_bytes=2 * approximate_size([x * 2 for x in [0] * 100]))
+    for value in range(5):
+        graph.run({'a': [value] * 100, 'b': []}, ('double',))
+    assert graph.cached_bytes <= graph.max_bytes
+    assert len(graph._cache) == 2
+
+    calls.clear()
+    graph.run({'a': [0] * 100, 'b': []}, ('double',))
+    assert calls == ['double']
+
+
+def test_result_larger_than_budget_is_not_cached():
+    graph, calls = _graph(max_bytes=100)
+    graph.run({'a': list(range(1000)), 'b': []}, ('double',))
+    assert len(graph._cache) == 0 and graph.cached_bytes == 0
+
+
+def test_geometry_arrays_are_sized_by_coordinates():
+    small = np.array([shapely.box(0, 0, 1, 1)], dtype=object)
+    large = np.array([shapely.Polygon([(np.cos(t), np.sin(t)) for t in np.linspace(0, 6, 1000)])], dtype=object)
+    assert approximate_size(large) - approximate_size(small) >= 16 * 990
+    assert approximate_size(np.array([None, shapely.box(0, 0, 1, 1)], dtype=object)) > approximate_size(small)
+
+
+def test_version_change_recomputes_every_stage():
+    version = ['v1']
+    graph = StageGraph('test', version=lambda: version[0])
+    calls = []
+    graph.stage('double', 'a')(lambda a: calls.append('double') or [x * 2 for x in a])
+
+    graph.run({'a': [1]}, ('double',))
+    graph.run({'a': [1]}, ('double',))
+    version[0] = 'v2'
+    graph.run({'a': [1]}, ('double',))
+    assert calls == ['double', 'double']
@@ -0,0 +1,58 @@
+import os
+
+from app.services import extraction_cache
+from app.services.file_service import get_cached_summary_statistics, get_file_summary, summarize_dxf
+
+
+def test_summary_counts_extents_and_closed_areas(mixed_dxf):
+    summary = summarize_dxf(mixed_dxf)
+
+    statistics = summary["statistics"]
+    assert statistics["total_entities"] == 8
+    assert statistics["polyline_count"] == 4
+    # LWPOLYLINE 4 x 4 et POLYLINE 2 x 2 fermées ; les polylignes ouvertes n'ont pas d'aire
+    assert statistics["closed_polyline_count"] == 2
+    assert statistics["closed_polyline_area"] == 20.0
+    assert summary["layer_statistics"]["sdp_a"]["bbox"] == [0.0, 10.0, 6.0, 12.0]
+    assert summary["bbox"] == [0.0, 0.0, 31.0, 31.0]
+
+
+def test_summary_is_cached_next_to_the_file(mixed_dxf):
+    assert get_cached_summary_statistics(mixed_dxf) is None
+
+    summary = get_file_summary(mixed_dxf)
+
+    assert extraction_cache.get_cached(mixed_dxf, "summary") == summary
+    assert get_cached_summary_statistics(mixed_dxf) == summary["statistics"]
+    assert os.path.isdir(extraction_cache.cache_dir_for(mixed_dxf))
+
+
+def test_cache_is_invalidated_when_the_file_changes(tmp_path):
+    path = tmp_path / "plan.dxf"
+    path.write_text("v1")
+    calls = []
+
+    def compute(file_path):
+        calls.append(file_path)
+        return {"content": open(file_path).read()}
+
+    assert extraction_cache.get_or_compute(str(path), "summary", compute) == {"content": "v1"}
+    assert extraction_cache.get_or_compute(str(path), "summary", compute) == {"content": "v1"}
+    path.write_text("version 2")
+
+    assert extraction_cache.get_or_compute(str(path), "summary", compute) == {"content": "version 2"}
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached_and_stale_results_are_not_stored(tmp_path):
+    path = tmp_path / "plan.dxf"
+    path.write_text("v1")
+
+    extraction_cache.get_or_compute(str(path), "summary", lambda p: {"error": "illisible"})
+    assert extraction_cache.get_cached(str(path), "summary") is None
+
+    signature = extraction_cache.file_signature(str(path))
+    path.write_text("modifié pendant le calcul")
+    assert extraction_cache.store(str(path), "summary", {"content": "v1"}, signature) is False
+    assert extraction_cache.get_cached(str(path), "summary") is None
+
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("shapely")
+
+from app.services.layer_classifier import LayerRules, current_rules, install_layer_rules  # noqa: E402
+from app.services.surface_engine import (compute_detail_destinations, compute_surface_results,  # noqa: E402
+                                         containing_polylines, polyline_areas, surface_graph)
+
+HABITATION = "GEX_EDS_SDP_1-HABITATION_L"
+COMMERCE = "GEX_EDS_SDP_1-COMMERCE_CIN"
+
+
+def _square(layer, x0, y0, x1, y1):
+    return {"type": "LWPOLYLINE", "layer": layer, "closed": True,
+            "vertices": [{"x": x, "y": y} for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))]}
+
+
+def _surfaces(existant, projet):
+    return {"existant": {"polylines": existant}, "projet": {"polylines": projet}}
+
+
+def test_areas_and_containment():
+    polylines = [_square(HABITATION, 0, 0, 10, 10), _square("GEX_EDS_SDP_3-H-180", 1, 1, 3, 3),
+                 {"layer": HABITATION, "vertices": [{"x": 0, "y": 0}, {"x": 1, "y": 1}]}]
+    assert polyline_areas(polylines, [0, 1, 2]).tolist() == [100.0, 4.0, 0.0]
+    assert containing_polylines(polylines, [1], [0]).tolist() == [0]
+    assert containing_polylines(polylines, [0], [1]).tolist() == [-1]
+
+
+def test_special_surfaces_are_deducted_from_their_destination():
+    existant = [_square(HABITATION, 0, 0, 10, 10), _square("GEX_EDS_SDP_3-H-180", 1, 1, 3, 3),
+                _square("GEX_EDS_SDP_2-TREMIE", 50, 50, 51, 51)]
+    results = compute_surface_results(_surfaces(existant, []))
+    # La trémie hors de toute surface principale n'est déduite de rien
+    assert results["existant"] == {"HABITATION_L": pytest.approx(96.0)}
+
+
+def test_demolition_and_diff_surfaces():
+    existant = [_square(HABITATION, 0, 0, 10, 10), _square(COMMERCE, 20, 0, 30, 10),
+                _square("GEX_EDS_TA_SDP_CAHIER_DEMO", 5, 0, 25, 10)]
+    projet = [_square(HABITATION, 0, 0, 10, 10), _square("GEX_EDS_SDP_1-AUTRE_BUREAU", 20, 0, 30, 10)]
+    results = compute_surface_results(_surfaces(existant, projet))
+
+    assert results["demolition"] == {"HABITATION_L": pytest.approx(50.0), "COMMERCE_CIN": pytest.approx(50.0)}
+    assert results["projet"] == {"HABITATION_L": pytest.approx(100.0), "AUTRE_BUREAU": pytest.approx(100.0)}
+    assert results["cree_changement"] == {"AUTRE_BUREAU": pytest.approx(100.0)}
+    assert results["supprimee_changement"] == {"COMMERCE_CIN": pytest.approx(100.0)}
+    assert results["diff"]["elements"]["unchanged"] == 1
+
+
+def test_detail_destinations_and_rdv_surfaces():
+    projet = [_square(HABITATION, 0, 0, 10, 10), _square("GEX_EDS_RDV_LOC_SOC", 1, 1, 3, 3),
+              _square("ANCIEN_GEX_EDS_SDP_1-COMMERCE_CIN", 20, 0, 30, 10)]
+    detail = compute_detail_destinations(_surfaces([], projet))
+    # Feuille détaillée : seuls les calques commençant par GEX_EDS_SDP_1 sont des destinations
+    assert detail == {"destinations": ["HABITATION_L"], "rdv": {"HABITATION_L": pytest.approx(4.0)}}
+    assert compute_surface_results(_surfaces([], projet))["projet"]["COMMERCE_CIN"] == pytest.approx(100.0)
+
+
+def test_only_the_changed_side_is_recomputed():
+    existant = [_square(HABITATION, 0, 0, 10, 10)]
+    compute_surface_results(_surfaces(existant, [_square(COMMERCE, 0, 0, 5, 5)]))
+    misses = dict(surface_graph.misses)
+    results = compute_surface_results(_surfaces(existant, [_square(COMMERCE, 0, 0, 6, 6)]))
+
+    assert results["projet"] == {"COMMERCE_CIN": pytest.approx(36.0)}
+    assert surface_graph.misses["areas_existant"] == misses["areas_existant"]
+    assert surface_graph.misses["areas_projet"] == misses["areas_projet"] + 1
+
+
+def test_reinstalled_layer_rules_are_not_served_from_the_cache():
+    surfaces = _surfaces([_square(HABITATION, 0, 0, 10, 10)], [])
+    assert compute_surface_results(surfaces)["existant"] == {"HABITATION_L": pytest.approx(100.0)}
+
+    rules = current_rules()
+    install_layer_rules(LayerRules({"layers": []}))
+    try:
+        assert compute_surface_results(surfaces)["existant"] == {}
+    finally:
+        install_layer_rules(rules)
+    assert compute_surface_results(surfaces)["existant"] == {"HABITATION_L": pytest.approx(100.0)}
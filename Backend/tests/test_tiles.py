@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.services import extraction_cache
+from app.services.geometry_format import simplify
+from app.services.spatial_index import get_spatial_index
+from app.services.tile_service import get_tile, parse_tile_request, plan_extent, precompute_tile_pyramid, tile_bbox
+
+
+def test_extent_is_square_from_lower_left(mixed_dxf):
+    extent = plan_extent(get_spatial_index(mixed_dxf))
+    assert extent == [0.0, 0.0, 31.0, 31.0]
+    assert tile_bbox(extent, 1, 1, 0) == [15.5, 0.0, 31.0, 15.5]
+
+
+def test_tiles_select_entities_and_are_cached(mixed_dxf):
+    root = get_tile(mixed_dxf, 0, 0, 0)
+    assert root["count"] == 8 and root["skipped"] == 0
+    upper_right = get_tile(mixed_dxf, 1, 1, 1)
+    assert sorted(e["type"] for e in upper_right["entities"]) == ["ARC", "CIRCLE"]
+    assert extraction_cache.get_cached(mixed_dxf, 'tiles/1/1/1') == upper_right
+
+
+def test_entities_smaller_than_a_pixel_are_skipped(mixed_dxf):
+    view = get_tile(mixed_dxf, bbox=[0, 0, 31, 31], resolution=3.0)
+    # Seuls la polyligne 4 x 4 et le cercle de diamètre 4 dépassent un pixel de 3 unités
+    assert sorted(e["type"] for e in view["entities"]) == ["CIRCLE", "LWPOLYLINE"]
+    assert view["skipped"] == 6
+
+
+def test_simplify_drops_points_within_tolerance():
+    points = np.array([(0, 0), (1, 0.01), (2, 0), (2, 2), (0, 2)], dtype=np.float64)
+    assert simplify(points, 0.1, closed=True).tolist() == [[0, 0], [2, 0], [2, 2], [0, 2]]
+    assert len(simplify(points, 0.001, closed=True)) == 5
+    triangle = np.array([(0, 0), (1, 0), (0.5, 0.01)])
+    assert len(simplify(triangle, 1.0, closed=True)) == 3
+
+
+def test_pyramid_only_for_large_plans(mixed_dxf):
+    assert precompute_tile_pyramid(mixed_dxf, max_zoom=1, min_entities=100) == 0
+    # Niveau 0 et les deux tuiles non vides du niveau 1 (1/0/0 et 1/1/1) ; les tuiles vides ne sont pas stockées
+    assert precompute_tile_pyramid(mixed_dxf, max_zoom=1, min_entities=1) == 3
+    assert precompute_tile_pyramid(mixed_dxf, max_zoom=1, min_entities=1) == 0
+
+
+@pytest.mark.parametrize("params", [{}, {"z": 1, "x": 2, "y": 0}, {"bbox": "0,0,0,1"}, {"bbox": "a,b,c,d"}])
+def test_invalid_tile_requests(params):
+    with pytest.raises(ValueError):
+        parse_tile_request(params)
+
+
+def test_viewport_resolution_from_width():
+    assert parse_tile_request({"bbox": "0,0,100,50", "width": "200"}) == {"bbox": [0, 0, 100, 50], "resolution": 0.5}
@@ -0,0 +1,70 @@
+import hashlib
+import io
+import os
+
+import pytest
+from flask import Flask, jsonify, request
+
+from app.services import upload_service
+from app.services.blob_store import BlobStore
+from app.services.upload_service import STAGING_DIR_NAME, init_uploads, save_upload, staged_path
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    app = Flask("upload_test")
+    app.config.update(RESSOURCES_FOLDER=str(tmp_path), UPLOAD_MAX_FILE_SIZE=1024)
+    store = BlobStore()
+    store.init_app(app)
+    monkeypatch.setattr(upload_service, "blob_store", store)
+    init_uploads(app)
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        file = request.files["file"]
+        streamed = staged_path(file) is not None
+        result = save_upload(file, os.path.join(tmp_path, file.filename))
+        return jsonify({**result, "streamed": streamed})
+
+    return app.test_client()
+
+
+def _post(client, content, name="plan.dxf"):
+    return client.post("/upload", data={"file": (io.BytesIO(content), name)}, content_type="multipart/form-data")
+
+
+def _staged_files(tmp_path):
+    return os.listdir(tmp_path / STAGING_DIR_NAME)
+
+
+def test_upload_is_streamed_and_hashed(client, tmp_path):
+    content = b"0\nSECTION\n" * 50
+    body = _post(client, content).get_json()
+    assert body["streamed"] and not body["deduplicated"]
+    assert body["size"] == len(content)
+    assert body["sha256"] == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / "plan.dxf").read_bytes() == content
+    assert _staged_files(tmp_path) == []
+
+
+def test_identical_upload_is_deduplicated(client):
+    _post(client, b"meme contenu", "a.dxf")
+    assert _post(client, b"meme contenu", "b.dxf").get_json()["deduplicated"]
+
+
+def test_oversized_file_is_rejected_without_leftovers(client, tmp_path):
+    response = _post(client, b"x" * 2048)
+    assert response.status_code == 413
+    assert response.get_json() == {"error": "Fichier trop volumineux", "max_size": 1024}
+    assert not (tmp_path / "plan.dxf").exists()
+    assert _staged_files(tmp_path) == []
+
+
+def test_non_streamed_file_is_copied_and_hashed(tmp_path, monkeypatch):
+    from werkzeug.datastructures import FileStorage
+    monkeypatch.setattr(upload_service, "blob_store", BlobStore())
+    destination = str(tmp_path / "copie.dxf")
+    result = save_upload(FileStorage(io.BytesIO(b"abc"), "copie.dxf"), destination)
+    assert result["size"] == 3 and result["sha256"] == hashlib.sha256(b"abc").hexdigest()
+    assert open(destination, "rb").read() == b"abc"
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".part")] == []
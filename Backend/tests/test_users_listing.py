@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import event, text
+
+from app.models.folder import Folder
+from app.models.user import User
+from app.services.user_service import _bump_listing_version, get_users_with_folders
+
+
+@pytest.fixture
+def users(database):
+    alice = User(nom="Martin", prenom="Alice", email="alice@example.com", password="x", role="user")
+    bob = User(nom="Durand", prenom="Bob", email="bob@example.com", password="x", role="user")
+    admin = User(nom="Admin", prenom="Root", email="admin@example.com", password="x", role="admin")
+    database.session.add_all([alice, bob, admin])
+    database.session.commit()
+    database.session.add_all([Folder(id_user=alice.id, nom_dossier="alice"),
+                              Folder(id_user=alice.id, nom_dossier="alice_2")])
+    database.session.commit()
+    return alice, bob, admin
+
+
+def test_listing_uses_a_single_query(database, users):
+    statements = []
+    engine = database.engine
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        items = get_users_with_folders(role='user', sort='email')
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert [(i["email"], i["nom_dossier"]) for i in items] == [("alice@example.com", "alice"),
+                                                              ("bob@example.com", None)]
+
+
+def test_pagination_and_sorting(database, users):
+    page = get_users_with_folders(role=None, page=2, per_page=2, sort='nom', order='desc')
+    assert page["total"] == 3 and page["page"] == 2 and page["per_page"] == 2
+    assert [i["nom"] for i in page["items"]] == ["Admin"]
+
+
+def test_invalid_sort_is_rejected(database, users):
+    with pytest.raises(ValueError):
+        get_users_with_folders(sort='password')
+    with pytest.raises(ValueError):
+        get_users_with_folders(order='sideways')
+
+
+def test_cache_is_invalidated_by_commits(database, users):
+    alice, bob, _ = users
+    assert get_users_with_folders()[1]["nom_dossier"] is None
+    database.session.add(Folder(id_user=bob.id, nom_dossier="bob"))
+    database.session.commit()
+    assert get_users_with_folders()[1]["nom_dossier"] == "bob"
+
+
+def test_cache_follows_writes_from_other_workers(database, users):
+    _, bob, _ = users
+    assert get_users_with_folders()[1]["nom_dossier"] is None
+    # Écriture sans objet ORM : le cache local de ce processus n'est pas invalidé
+    database.session.execute(text("INSERT INTO folder (id_user, nom_dossier, date_creation) "
+                                  "VALUES (:id, 'bob', CURRENT_TIMESTAMP)"), {"id": bob.id})
+    database.session.commit()
+    assert get_users_with_folders()[1]["nom_dossier"] is None
+
+    # Un autre worker a écrit : il a renouvelé le jeton partagé
+    _bump_listing_version()
+    assert get_users_with_folders()[1]["nom_dossier"] == "bob"
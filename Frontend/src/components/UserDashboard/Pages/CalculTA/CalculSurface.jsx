@@ -9,6 +9,19 @@ import 'primeicons/primeicons.css';
 
 const { Text, Title } = Typography;
 
+// Aire signée du segment circulaire entre la corde start -> end et l'arc porté par le bulge de start
+// (b = tan(θ/4)) : r²/2 (θ - sin θ), à ajouter à la formule du lacet pour une aire exacte
+const bulgeSegmentArea = (start, end) => {
+    const bulge = start.bulge || 0;
+    const chord = Math.hypot(end.x - start.x, end.y - start.y);
+    if (!bulge || !chord) {
+        return 0;
+    }
+    const theta = 4 * Math.atan(Math.abs(bulge));
+    const radius = chord * (1 + bulge * bulge) / (4 * Math.abs(bulge));
+    return Math.sign(bulge) * radius * radius / 2 * (theta - Math.sin(theta));
+};
+
 const CalculSurface = ({ extractedDataProjet, extractedDataExistant, setCalculResults, calculResults, setVisaFilePath }) => {
     const [threshold, setThreshold] = useState('');
     const [floorName, setFloorName] = useState('');
@@ -41,11 +54,12 @@ const CalculSurface = ({ extractedDataProjet, extractedDataExistant, setCalculRe
                 if (polyline.vertices && polyline.vertices.length > 2) {
                     let area = 0;
                     const coords = polyline.vertices;
-                    for (let i = 0; i < coords.length - 1; i++) {
-                        area += coords[i].x * coords[i + 1].y - coords[i + 1].x * coords[i].y;
+                    // Contour refermé sur le premier sommet, comme pour le calcul des surfaces côté serveur
+                    for (let i = 0; i < coords.length; i++) {
+                        const next = coords[(i + 1) % coords.length];
+                        area += (coords[i].x * next.y - next.x * coords[i].y) / 2 + bulgeSegmentArea(coords[i], next);
                     }
-                    area = Math.abs(area) / 2;
-                    totalArea += area;
+                    totalArea += Math.abs(area);
                 }
             });
         }